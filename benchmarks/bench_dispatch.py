@@ -0,0 +1,34 @@
+"""
+Micro-benchmark of the cost of calling an extension through
+the dataframe namespace compared to calling the function directly
+
+    python benchmarks/bench_dispatch.py
+"""
+import tempfile
+
+from common import pd, sym, temporary_repository, write_extension_file, \
+                   best_of
+
+
+def main(number=20000):
+    with temporary_repository() as pd_ext, \
+         tempfile.TemporaryDirectory() as source_dir:
+        package = write_extension_file(source_dir, 'returns_df')
+        pd_ext.import_extension(sym.__import_file_line_spec__\
+                                    .format(package, 'returns_df'))
+        df = pd.DataFrame({'numbers': [1, 2, 3]})
+        # warm the resolved extension cache
+        sym.df_ext(df).returns_df('numbers')
+        returns_df = pd_ext._get_extension_from_collection('returns_df')
+
+        direct = best_of('returns_df(df, "numbers")', number,
+                         globals={'returns_df': returns_df, 'df': df})
+        dispatch = best_of('df.ext.returns_df("numbers")', number,
+                           globals={'df': df})
+        print('direct function call:  {:8.2f} us'.format(direct))
+        print('df.ext dispatch:       {:8.2f} us'.format(dispatch))
+        print('dispatch overhead:     {:8.2f} us'.format(dispatch - direct))
+
+
+if __name__ == '__main__':
+    main()
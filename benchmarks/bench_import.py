@@ -0,0 +1,53 @@
+"""
+Compares the time taken to import pandex with the repository built
+eagerly (the default) and lazily (PANDEX_LAZY=1), using the
+interpreter's own import timing:
+
+    python benchmarks/bench_import.py
+
+The time reported is the cumulative import time of pandex less that
+of pandas, since pandas has to be imported in either mode
+"""
+import os, sys, subprocess, statistics
+
+from common import sym
+
+
+def import_times(statement, lazy):
+    """
+    Returns the cumulative import time in microseconds of each
+    module imported while running the statement
+    """
+    env = dict(os.environ)
+    env[sym.__lazy_env__] = '1' if lazy else '0'
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', statement],
+                            env=env, stderr=subprocess.PIPE,
+                            universal_newlines=True, check=True)
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, package = line[len('import time:'):].split('|')
+        times[package.strip()] = int(cumulative)
+    return times
+
+
+def pandex_overhead(lazy, repeat):
+    overhead = []
+    for _ in range(repeat):
+        times = import_times('import {}'.format(sym.__pdext__), lazy)
+        overhead.append(times[sym.__pdext__] - times['pandas'])
+    return statistics.median(overhead)
+
+
+def main(repeat=7):
+    eager = pandex_overhead(False, repeat)
+    lazy = pandex_overhead(True, repeat)
+    print('pandex import overhead (excluding pandas), median of {}:'\
+                .format(repeat))
+    print('eager:  {:8.1f} ms'.format(eager / 1000))
+    print('lazy:   {:8.1f} ms'.format(lazy / 1000))
+
+
+if __name__ == '__main__':
+    main()
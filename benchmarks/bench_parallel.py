@@ -0,0 +1,61 @@
+"""
+Measures how df.ext.parallel() scales with the number of workers
+for a CPU bound row-wise extension:
+
+    python benchmarks/bench_parallel.py [--executor thread|process]
+
+The extension loops over the rows in pure python, so it only scales
+with processes.  Speedup is relative to running the extension on the
+whole dataframe without parallel()
+"""
+import os, time, argparse, tempfile
+
+from common import pd, sym, temporary_repository
+
+extension = '''
+import math
+
+def row_work(df, column):
+    """CPU bound work on each row"""
+    df['result'] = [sum(math.sqrt(i) for i in range(int(x))) \\
+                        for x in df[column]]
+row_work.pdext_partition = 'rows'
+'''
+
+
+def timed(func):
+    start = time.perf_counter()
+    func()
+    return time.perf_counter() - start
+
+
+def main(rows=4000, executor='process'):
+    with temporary_repository() as pd_ext, \
+            tempfile.TemporaryDirectory() as source_dir:
+        path = os.path.join(source_dir, 'row_work.py')
+        with open(path, 'w') as f:
+            f.write(extension)
+        pd_ext.import_extension(sym.__import_file_line_spec__.format(path,
+                                                                    'row_work'))
+        df = pd.DataFrame({'n': [2000] * rows})
+
+        serial = timed(lambda: df.ext.row_work('n'))
+        print('{} rows, {} executor, {} CPUs'.format(rows, executor,
+                                                      os.cpu_count()))
+        print('serial:      {:8.3f} s'.format(serial))
+        workers = 1
+        while workers <= (os.cpu_count() or 1):
+            parallel = df.ext.parallel(workers=workers, executor=executor)
+            seconds = timed(lambda: parallel.row_work('n'))
+            print('{:2d} workers:  {:8.3f} s  speedup {:5.2f}x'\
+                        .format(workers, seconds, serial / seconds))
+            workers *= 2
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=4000)
+    parser.add_argument('--executor', default='process',
+                        choices=['thread', 'process'])
+    args = parser.parse_args()
+    main(args.rows, args.executor)
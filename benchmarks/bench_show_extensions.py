@@ -0,0 +1,39 @@
+"""
+Measures pd.ext.show_extensions() on a repository with many
+extensions installed:
+
+    python benchmarks/bench_show_extensions.py
+
+The usage of each extension is recorded when it is installed, so
+listing them shouldn't import any of the extension modules
+"""
+import io, sys, tempfile, time
+from contextlib import redirect_stdout
+
+from common import sym, temporary_repository, write_extension_file
+
+
+def main(extensions=500):
+    with temporary_repository() as pd_ext, \
+            tempfile.TemporaryDirectory() as source_dir:
+        spec = []
+        for i in range(extensions):
+            name = 'bench_{}'.format(i)
+            path = write_extension_file(source_dir, name)
+            spec.append(sym.__import_file_line_spec__.format(path, name))
+        pd_ext.import_extension('\n'.join(spec))
+
+        # new extension objects, as they would be in a new session
+        pd_ext._build_extension_collections()
+        modules = len(sys.modules)
+        start = time.perf_counter()
+        with redirect_stdout(io.StringIO()):
+            pd_ext.show_extensions()
+        seconds = time.perf_counter() - start
+        print('show_extensions with {} extensions: {:8.2f} ms'\
+                    .format(extensions, seconds * 1000))
+        print('modules imported: {}'.format(len(sys.modules) - modules))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,68 @@
+"""
+Helpers shared by the benchmark scripts
+
+The benchmarks install extensions into throw-away repositories so
+the user's own repositories are never touched.  The repository
+config file is saved before the benchmark runs and restored afterwards,
+in the same way as the test suite fixtures.
+"""
+import os, shutil, tempfile, timeit
+from contextlib import contextmanager
+from importlib import import_module
+
+import pandex as pd
+sym = import_module('_pandex.symbols')
+
+test_package_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                os.pardir, 'tests', 'fixtures', 'testpackages')
+
+
+@contextmanager
+def temporary_repository():
+    """
+    Yields the pd.ext repository configured with a single empty
+    repository named bench in a temporary directory
+    """
+    pd_ext = sym.pd_ext()
+    config = sym.__installed_extensions__
+    tmp_dir = tempfile.mkdtemp()
+    saved_config = None
+    if os.path.isfile(config):
+        _, saved_config = tempfile.mkstemp()
+        shutil.copy(config, saved_config)
+    try:
+        pd_ext.add_repository('bench', os.path.join(tmp_dir, 'bench'),
+                              default=True)
+        for name in list(pd_ext._search_order):
+            if name != 'bench':
+                pd_ext.remove_repository(name)
+        yield pd_ext
+    finally:
+        if saved_config is not None:
+            shutil.move(saved_config, config)
+        else:
+            os.remove(config)
+        pd_ext._build_extension_collections()
+        shutil.rmtree(tmp_dir)
+
+
+def write_extension_file(directory, name, body='    return df'):
+    """
+    Writes a single py file containing a trivial extension function
+    and returns the path to it
+    """
+    path = os.path.join(directory, name + '.py')
+    with open(path, 'w') as f:
+        f.write('def {}(df, *args, **kwargs):\n'
+                '    """Benchmark extension"""\n'
+                '{}\n'.format(name, body))
+    return path
+
+
+def best_of(stmt, number, repeat=5, globals=None, setup='pass'):
+    """
+    Returns the best time per call in microseconds
+    """
+    times = timeit.repeat(stmt, setup=setup, number=number, repeat=repeat,
+                          globals=globals)
+    return min(times) / number * 1e6
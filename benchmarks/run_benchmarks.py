@@ -0,0 +1,245 @@
+"""
+Runs the benchmark suite on synthetic repositories of increasing
+size, and writes the results as JSON so that regressions can be
+tracked between versions:
+
+    python benchmarks/run_benchmarks.py [--sizes 10,100,1000,10000]
+                                        [--output results.json]
+                                        [--compare baseline.json]
+
+For each size (the total number of extensions, in collections of
+--per-collection extensions) a repository is generated with
+synthetic.py and these are measured:
+
+    import             -- cumulative import time of pandex less that
+                          of pandas, eager and lazy (ms)
+    construct          -- ExtensionRepository() with the index
+                          current, and rebuilt from the files (ms)
+    dispatch           -- df.ext.collection.extension() call, and
+                          its overhead over calling the function (us)
+    show_extensions    -- pd.ext.show_extensions() in a new session (ms)
+    enable_disable     -- disable_extension() and enable_extension()
+                          of one extension (ms)
+    install            -- import_extension() of --batch extensions
+                          from local files and from a github: archive
+                          served locally (extensions per second)
+
+Everything runs offline.  Each result is a record of the form:
+
+    {"benchmark": "dispatch", "extensions": 100, "collections": 10,
+     "value": 4.2, "unit": "us"}
+
+With --compare, each result is compared to the same result in an
+earlier output file, and the exit status is 1 if any is worse by
+more than --threshold
+"""
+import io, os, sys, json, time, argparse, platform, tempfile, \
+       statistics
+from contextlib import redirect_stdout
+from datetime import datetime, timezone
+from importlib import import_module
+
+from common import pd, sym, temporary_repository, best_of
+from bench_import import import_times
+import synthetic
+
+ExtensionRepository = import_module('_pandex.repository').ExtensionRepository
+
+
+def measure_import(repeat):
+    results = []
+    for lazy in (False, True):
+        overhead = []
+        for _ in range(repeat):
+            times = import_times('import {}'.format(sym.__pdext__), lazy)
+            overhead.append(times[sym.__pdext__] - times['pandas'])
+        results.append(('import_lazy' if lazy else 'import',
+                        statistics.median(overhead) / 1000, 'ms'))
+    return results
+
+def measure_construct(pd_ext, repeat):
+    index = os.path.join(pd_ext._repository_path(pd_ext.default_repository),
+                         sym.__repository_index__)
+    current = best_of('ExtensionRepository()', 1, repeat,
+                      {'ExtensionRepository': ExtensionRepository})
+    rebuilt = best_of('ExtensionRepository()', 1, repeat,
+                      {'ExtensionRepository': ExtensionRepository,
+                       'os': os, 'index': index},
+                      setup='os.remove(index)')
+    return [('construct', current / 1000, 'ms'),
+            ('construct_rebuild_index', rebuilt / 1000, 'ms')]
+
+def measure_dispatch(pd_ext, number):
+    df = pd.DataFrame({'numbers': [1, 2, 3]})
+    # warm the resolved extension cache
+    df.ext.coll_0000.ext_0000()
+    extension = pd_ext._get_extension_from_collection('coll_0000.ext_0000')
+    direct = best_of('extension(df)', number,
+                     globals={'extension': extension, 'df': df})
+    dispatch = best_of('df.ext.coll_0000.ext_0000()', number,
+                       globals={'df': df})
+    return [('dispatch', dispatch, 'us'),
+            ('dispatch_overhead', dispatch - direct, 'us')]
+
+def measure_show_extensions(pd_ext, repeat):
+    with redirect_stdout(io.StringIO()):
+        shown = best_of('pd_ext.show_extensions()', 1, repeat,
+                        {'pd_ext': pd_ext},
+                        setup='pd_ext._build_extension_collections()')
+    return [('show_extensions', shown / 1000, 'ms')]
+
+def measure_enable_disable(pd_ext, number):
+    name = 'coll_0000.ext_0000'
+    toggle = best_of('pd_ext.disable_extension(name); pd_ext.enable_extension(name)',
+                     number, globals={'pd_ext': pd_ext, 'name': name})
+    return [('enable_disable', toggle / 1000, 'ms')]
+
+def measure_install(pd_ext, work_dir, batch, repeat):
+    """
+    Installs batch new extensions repeat times from each source,
+    and returns the best rate.  Every github: install downloads the
+    archive again into an empty download cache
+    """
+    results = []
+    saved = {k: os.environ.get(k) for k in (sym.__github_url_env__,
+                                            sym.__download_cache_env__)}
+    with synthetic.LocalGitHub() as github:
+        os.environ[sym.__github_url_env__] = github.url
+        try:
+            for source in ('local', 'github'):
+                rates = []
+                for attempt in range(repeat):
+                    prefix = '{}{}'.format(source, attempt)
+                    source_dir = os.path.join(work_dir, prefix)
+                    generated = synthetic.generate_sources(source_dir, 1, batch,
+                                                           prefix=prefix)
+                    if source == 'github':
+                        github.add_archive('bench', prefix, 'master',
+                                           synthetic.make_archive(source_dir,
+                                                                  prefix, 'master'))
+                        os.environ[sym.__download_cache_env__] = \
+                                os.path.join(work_dir, prefix + '_cache')
+                        root = 'github:bench/{}'.format(prefix)
+                    else:
+                        root = source_dir
+                    spec = synthetic.import_spec(generated, root)
+                    start = time.perf_counter()
+                    pd_ext.import_extension(spec)
+                    rates.append(batch / (time.perf_counter() - start))
+                results.append(('install_' + source, max(rates), 'extensions/s'))
+        finally:
+            for k, v in saved.items():
+                if v is None:
+                    os.environ.pop(k, None)
+                else:
+                    os.environ[k] = v
+    return results
+
+
+def run(sizes, per_collection, batch, repeat, number, benchmarks):
+    records = []
+    for size in sizes:
+        collections = max(1, size // per_collection)
+        extensions = min(size, per_collection)
+        total = collections * extensions
+        print('{} extensions in {} collections'.format(total, collections))
+        with temporary_repository() as pd_ext, \
+                tempfile.TemporaryDirectory() as work_dir:
+            synthetic.populate_repository(pd_ext, os.path.join(work_dir, 'sources'),
+                                          collections, extensions)
+            measurements = {
+                'import': lambda: measure_import(repeat),
+                'construct': lambda: measure_construct(pd_ext, repeat),
+                'dispatch': lambda: measure_dispatch(pd_ext, number),
+                'show_extensions': lambda: measure_show_extensions(pd_ext, repeat),
+                'enable_disable': lambda: measure_enable_disable(pd_ext,
+                                                                 max(1, number // 1000)),
+                # last, as it adds extensions to the repository
+                'install': lambda: measure_install(pd_ext, work_dir,
+                                                   min(batch, total), repeat),
+            }
+            for benchmark, measure in measurements.items():
+                if benchmark not in benchmarks:
+                    continue
+                for name, value, unit in measure():
+                    print('    {:26} {:12.3f} {}'.format(name, value, unit))
+                    records.append({'benchmark': name,
+                                    'extensions': total,
+                                    'collections': collections,
+                                    'value': value,
+                                    'unit': unit})
+    return records
+
+def environment():
+    return {'time': datetime.now(timezone.utc).strftime(sym.__install_timestamp_fmt__),
+            'python': platform.python_version(),
+            'pandas': pd.__version__,
+            sym.__pdext__: import_module('_pandex._build_info').__version__,
+            'platform': platform.platform(),
+            'cpus': os.cpu_count()}
+
+def compare(records, baseline_file, threshold):
+    """
+    Prints the ratio of each result to the baseline, and returns
+    the number which are worse by more than the threshold
+    """
+    with open(baseline_file) as f:
+        baseline = {(r['benchmark'], r['extensions']): r \
+                        for r in json.load(f)['results']}
+    regressions = 0
+    print('\ncompared to {}:'.format(baseline_file))
+    for record in records:
+        before = baseline.get((record['benchmark'], record['extensions']))
+        if before is None or not before['value'] or not record['value']:
+            continue
+        # rates are better when higher, times when lower
+        if record['unit'].endswith('/s'):
+            slowdown = before['value'] / record['value']
+        else:
+            slowdown = record['value'] / before['value']
+        regressed = slowdown > 1 + threshold
+        regressions += regressed
+        print('    {:26} {:6} {:8.2f}x{}'.format(record['benchmark'],
+                                                record['extensions'], slowdown,
+                                                '  REGRESSION' if regressed else ''))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--sizes', default='10,100,1000,10000',
+                        help='comma separated numbers of extensions')
+    parser.add_argument('--per-collection', type=int, default=10,
+                        help='extensions in each collection')
+    parser.add_argument('--batch', type=int, default=50,
+                        help='extensions installed by the install benchmarks')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--number', type=int, default=20000,
+                        help='calls timed by the dispatch benchmark')
+    parser.add_argument('--benchmarks', default='import,construct,dispatch,'
+                            'show_extensions,enable_disable,install',
+                        help='comma separated benchmarks to run')
+    parser.add_argument('--output', default='benchmark_results.json')
+    parser.add_argument('--compare', help='earlier output file to compare with')
+    parser.add_argument('--threshold', type=float, default=0.2,
+                        help='fraction slower than the baseline that is '
+                             'reported as a regression')
+    args = parser.parse_args()
+
+    sizes = [int(s) for s in args.sizes.split(',')]
+    records = run(sizes, args.per_collection, args.batch, args.repeat,
+                  args.number, args.benchmarks.split(','))
+    results = {'environment': environment(),
+               'parameters': {k: v for k, v in vars(args).items() \
+                                if k not in ('output', 'compare', 'threshold')},
+               'results': records}
+    with open(args.output, 'w') as f:
+        json.dump(results, f, indent=2)
+    print('results written to {}'.format(args.output))
+
+    if args.compare and compare(records, args.compare, args.threshold):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,250 @@
+"""
+Generates synthetic extension sources for the benchmarks, laid out
+the way extensions are usually written:
+
+    <directory>/
+        coll_0000/                  a package for most collections
+            __init__.py             imports each extension
+            common.py               helpers shared by the extensions
+            ext_0000.py             one extension per module
+            ext_0001.py
+            ...
+        coll_0004.py                every fifth collection is a single
+                                    module holding all its extensions
+
+It also populates a repository with them much faster than
+installing every extension, and serves them as a GitHub archive
+from a local server, so that installs from github: locations can be
+measured without a network connection:
+
+    python benchmarks/synthetic.py <directory> <collections> <extensions>
+
+writes the sources and prints the import spec for them
+"""
+import os, io, sys, shutil, hashlib, zipfile, threading
+from http.server import HTTPServer, BaseHTTPRequestHandler
+
+from common import sym
+
+common_module = '''\
+"""
+Helpers shared by the extensions in {collection}
+"""
+import numpy as np
+
+# module constant
+scale = {index} + 1
+
+def scaled(values, factor=1):
+    return np.asarray(values) * scale * factor
+'''
+
+extension_module = '''\
+from .common import scaled
+
+def {name}(df, column='numbers', factor=1, result=None):
+    """
+    Synthetic extension {index} of {collection}
+    Input:
+        df -- dataframe
+        column -- column name containing the values to scale
+        factor -- multiplier applied to the values
+        result -- column to store the scaled values in, if any
+    """
+    values = scaled(df[column], factor)
+    if result is not None:
+        df[result] = values
+    return df
+'''
+
+single_module_extension = '''
+def {name}(df, column='numbers', factor=1):
+    """
+    Synthetic extension {index} of {collection}
+    Input:
+        df -- dataframe
+        column -- column name containing the values to scale
+        factor -- multiplier applied to the values
+    """
+    return df[column] * factor
+'''
+
+
+def collection_name(index, prefix='coll'):
+    return '{}_{:04d}'.format(prefix, index)
+
+def extension_name(index):
+    return 'ext_{:04d}'.format(index)
+
+
+def generate_sources(directory, collections, extensions, prefix='coll'):
+    """
+    Writes the sources of the given number of collections, each
+    with the given number of extensions, into directory.  Returns
+    a list of (location relative to directory, collection, extension)
+    for each extension
+    """
+    os.makedirs(directory, exist_ok=True)
+    generated = []
+    for c in range(collections):
+        collection = collection_name(c, prefix)
+        names = [extension_name(e) for e in range(extensions)]
+        if c % 5 == 4:
+            location = collection + '.py'
+            with open(os.path.join(directory, location), 'w') as f:
+                f.write('"""\nExtensions of {}\n"""\n'.format(collection))
+                for e, name in enumerate(names):
+                    f.write(single_module_extension.format(
+                                name=name, index=e, collection=collection))
+        else:
+            location = collection
+            package = os.path.join(directory, collection)
+            os.makedirs(package, exist_ok=True)
+            with open(os.path.join(package, 'common.py'), 'w') as f:
+                f.write(common_module.format(collection=collection, index=c))
+            with open(os.path.join(package, '__init__.py'), 'w') as f:
+                for name in names:
+                    f.write('from .{0} import {0}\n'.format(name))
+            for e, name in enumerate(names):
+                with open(os.path.join(package, name + '.py'), 'w') as f:
+                    f.write(extension_module.format(name=name, index=e,
+                                                    collection=collection))
+        generated.extend((location, collection, name) for name in names)
+    return generated
+
+
+def import_spec(generated, root):
+    """
+    Returns the import spec to install the generated extensions from
+    root, which is either the directory they were written to or a
+    github: location
+    """
+    separator = '/' if root.startswith('github:') else os.sep
+    return '\n'.join(sym.__import_file_line_spec__.format(
+                        root + separator + location,
+                        '{}.{}'.format(collection, name))
+                     for location, collection, name in generated)
+
+
+def populate_repository(pd_ext, directory, collections, extensions):
+    """
+    Generates sources in directory and installs them into the default
+    repository.  The first five collections (which cover both layouts)
+    are installed with import_extension, and the others are copies of
+    them with the collection name changed, so that large repositories
+    can be made quickly.  Returns the generated extensions as for
+    generate_sources()
+    """
+    generated = generate_sources(directory, collections, extensions)
+    templates = min(collections, 5)
+    pd_ext.import_extension(import_spec(generated[:templates * extensions],
+                                        directory))
+    repository = pd_ext._repository_path(pd_ext.default_repository)
+    for c in range(templates, collections):
+        for e in range(extensions):
+            _copy_extension(repository, directory, collection_name(c % 5),
+                            collection_name(c), extension_name(e))
+    pd_ext._build_extension_collections()
+    return generated
+
+def _copy_extension(repository, directory, template, collection, name):
+    """
+    Installs an extension by copying the installed extension of the
+    same name from the template collection, which has the same layout
+    """
+    template_path = os.path.join(repository, template, name)
+    # leaving out the hidden versions of the module
+    template_module, = [m for m in os.listdir(template_path) \
+                            if not m.startswith('.')]
+    with open(os.path.join(template_path, template_module, '__init__.py')) as f:
+        init_py = f.read().replace(template, collection)
+
+    path = os.path.join(repository, collection, name)
+    module_path = os.path.join(path, hashlib.sha1(bytes(path, 'utf-8')).hexdigest())
+    os.makedirs(module_path)
+    source = os.path.join(directory, collection)
+    if os.path.isdir(source):
+        files = [os.path.join(source, f) for f in os.listdir(source) \
+                    if f != '__init__.py']
+    else:
+        files = [source + '.py']
+    for file in files:
+        destination = os.path.join(module_path, os.path.basename(file))
+        # hard linked, as import_extension(link='hard') would
+        try:
+            os.link(file, destination)
+        except OSError:
+            shutil.copy2(file, destination)
+    with open(os.path.join(module_path, '__init__.py'), 'w') as f:
+        f.write(init_py)
+
+
+def make_archive(directory, repo, ref):
+    """
+    Returns the bytes of a zip file of the directory laid out like
+    a GitHub archive
+    """
+    buffer = io.BytesIO()
+    root = '{}-{}'.format(repo, ref)
+    with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as zip:
+        for dirpath, dirs, files in os.walk(directory):
+            dirs.sort()
+            for file in sorted(files):
+                path = os.path.join(dirpath, file)
+                name = os.path.relpath(path, directory)
+                zip.write(path, '/'.join([root] + name.split(os.sep)))
+    return buffer.getvalue()
+
+
+class LocalGitHub(object):
+    """
+    Serves /<username>/<repo>/archive/<ref>.zip from the archives
+    dictionary, as a stand in for GitHub.  Set the PANDEX_GITHUB_URL
+    environment variable to its url for github: locations to be
+    downloaded from it
+    """
+    def __init__(self):
+        self.archives = {}
+        github = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                archive = github.archives.get(self.path)
+                if archive is None:
+                    self.send_error(404)
+                    return
+                self.send_response(200)
+                self.send_header('Content-Length', str(len(archive)))
+                self.end_headers()
+                self.wfile.write(archive)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = HTTPServer(('127.0.0.1', 0), Handler)
+        self.url = 'http://127.0.0.1:{}'.format(self.server.server_port)
+        self.thread = threading.Thread(target=self.server.serve_forever,
+                                       daemon=True)
+        self.thread.start()
+
+    def add_archive(self, username, repo, ref, archive):
+        self.archives['/{}/{}/archive/{}.zip'.format(username, repo, ref)] = archive
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def main(directory, collections, extensions):
+    generated = generate_sources(directory, int(collections), int(extensions))
+    print(import_spec(generated, os.path.abspath(directory)))
+
+
+if __name__ == '__main__':
+    main(*sys.argv[1:])
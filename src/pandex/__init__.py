@@ -11,15 +11,20 @@ A new extension function func can be added via
     pd.ext.import_extension('path/to/extension -> ext_name')
 """
 # Import libraries as standard shortcuts
-import sys
+import os, sys
 import pandas as pd
 
 # get module constants
-from .symbols import __pd_ext__, __pdext__
-
-# Configure the repository at the pandas level
-from .repository import ExtensionRepository
-setattr(pd, __pd_ext__, ExtensionRepository())
+from .symbols import __pd_ext__, __pdext__, __lazy_env__
+
+# Configure the repository at the pandas level.  In lazy mode
+# the repository isn't built until it is first used
+if os.environ.get(__lazy_env__, '0') != '0':
+    from .repository import LazyExtensionRepository
+    setattr(pd, __pd_ext__, LazyExtensionRepository())
+else:
+    from .repository import ExtensionRepository
+    setattr(pd, __pd_ext__, ExtensionRepository())
 
 # configure extensions on dataframes
 from .extensions import ExtensionManager
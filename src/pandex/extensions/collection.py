@@ -2,35 +2,137 @@
 A container object to manage a group of extensions under the
 same namespace (called a collection) for a particular dataframe
 """
-from functools import wraps
+from functools import partial
+
+from ..symbols import repository
 
 class ExtensionCollection(object):
-    def __init__(self, df, extensions):
+    def __init__(self, df, collection, repo):
         """
         This class is instantiated with a particular dataframe and
-        a set of extension functions
+        the collection of extension functions it gives access to
         Input:
             df -- the dataframe object that the extensions will operate
                   on
-            extensions -- a dictionary of the form:
-                            {extension_name: Extension instance}
+            collection -- name of the collection
+            repo -- the ExtensionRepository instance which resolves
+                    the extension functions
         """
         # Save the dataframe that the collection was instantiated with
         self.df = df
-        self.extensions = extensions
+        self._collection = collection
+        self._repo = repo
+        # extension callables already bound to the dataframe, keyed
+        # by extension name, for the repository generation they were
+        # bound in
+        self._bound = {}
+        self._generation = repo._generation
        
     def __getattr__(self, func):
         """
         Any attribute call to this object is to retrieve an extension
         """
-        if func in self.extensions:
-            ext = self.extensions[func].get_extension()
-            enabled = self.extensions[func].enabled
-            @wraps(ext)
-            def extension(*args, **kwargs):
-                if enabled:
-                    return ext(self.df, *args, **kwargs)
-                return None
+        if self._repo._generation != self._generation:
+            # everything bound before the extensions changed
+            self._bound = {}
+            self._generation = self._repo._generation
+        extension = self._bound.get(func)
+        if extension is not None:
             return extension
-        else:
-            raise AttributeError('{} is not a valid extension'.format(func))
\ No newline at end of file
+        try:
+            ext, enabled = self._repo._resolve_extension(self._collection, func)
+        except KeyError:
+            raise AttributeError('{} is not a valid extension'.format(func))
+        extension = BoundExtension(self.df, self._collection, func, ext, 
+                                   enabled, self._repo)
+        self._bound[func] = extension
+        return extension
+
+
+class BoundExtension(object):
+    """
+    A callable which executes the extension function on a dataframe.
+
+    It can be pickled, so it can be sent to a process pool.  It is
+    pickled as the dataframe and the name of the extension, along
+    with the repository it was installed in and a hash of the
+    install, and the function is looked up again by name when it
+    is unpickled.  The installed module can't be pickled as it is
+    imported under a name made from its path.
+
+    The repository can wrap each call, for example to cache its
+    result.  The wrappers are fixed when the extension is bound, and
+    the repository rebinds the extension when they change.
+
+    The wrapper attributes are copied by hand rather than with 
+    functools.wraps because this sits on the hot path of every 
+    extension call
+    """
+    def __init__(self, df, collection, name, ext, enabled, repo):
+        """
+        Input:
+            df -- the dataframe to call the extension with
+            collection -- collection name
+            name -- extension name
+            ext -- the extension function
+            enabled -- False if the extension does nothing
+            repo -- the ExtensionRepository the extension was resolved from
+        """
+        self.df = df
+        self._collection = collection
+        self.name = name
+        self.ext = ext
+        self.enabled = enabled
+        self._repo = repo
+        self.__name__ = getattr(ext, '__name__', name)
+        self.__qualname__ = self.__name__
+        self.__doc__ = ext.__doc__
+        self.__wrapped__ = ext
+        # Each wrapper is called with this object, a function to
+        # make the call (which may itself be wrapped) and the args
+        # and kwargs of the call
+        self._wrapped_call = None
+        for wrapper in reversed(repo._call_wrappers(collection, name)):
+            self._wrapped_call = partial(wrapper, self, 
+                                         self._wrapped_call or self._call)
+
+    def __call__(self, *args, **kwargs):
+        if self._wrapped_call is not None:
+            return self._wrapped_call(args, kwargs)
+        if self.enabled:
+            return self.ext(self.df, *args, **kwargs)
+        return None
+
+    def _call(self, args, kwargs):
+        if self.enabled:
+            return self.ext(self.df, *args, **kwargs)
+        return None
+
+    def __repr__(self):
+        return '<extension {}>'.format(self.__name__)
+
+    def __reduce__(self):
+        repository_name, install_hash = \
+                self._repo._extension_identity(self._collection, self.name)
+        return (_rebind_extension, (self.df, self._collection, self.name,
+                                    repository_name, install_hash))
+
+
+def _rebind_extension(df, collection, name, repository_name, install_hash):
+    """
+    Looks up an extension by name in the repository of this process
+    when a BoundExtension is unpickled, and checks that it is the
+    same install that was pickled
+    """
+    repo = repository()
+    try:
+        identity = repo._extension_identity(collection, name)
+    except KeyError:
+        raise ValueError('Extension {} is not installed'.format(name))
+    if identity != (repository_name, install_hash):
+        raise ValueError('Extension {} is installed in repository {} with hash {}, '
+                         'but was pickled from repository {} with hash {}'\
+                            .format(name, identity[0], identity[1], 
+                                    repository_name, install_hash))
+    ext, enabled = repo._resolve_extension(collection, name)
+    return BoundExtension(df, collection, name, ext, enabled, repo)
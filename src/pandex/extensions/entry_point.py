@@ -0,0 +1,147 @@
+"""
+Find the function an extension is named after in the extension
+files, without importing them.
+
+Each file is first checked for the text 'def <name>' as a whole
+word, which is cheap and rules out almost every file.  Candidate
+files are then parsed, and only a function defined at the top level
+of the file counts as a match, so a name that appears in a comment,
+a string, a nested function or as the start of a longer name is
+not mistaken for the extension.
+
+The libraries imported by the extension are found the same way,
+following the imports of the extension's own modules from the file
+it is defined in, so that an extension whose dependencies are missing
+can be reported without importing it.
+"""
+import os, re, ast
+
+def find_entry_point(module_path, name):
+    """
+    Returns a dictionary describing where the function is defined:
+        {'file': dotted module name relative to module_path,
+         'line': line number of the def statement,
+         'params': list of parameter names}
+    Input:
+        module_path -- directory holding the extension files
+        name -- name of the function to find
+    Raises ValueError if no file defines the function
+    """
+    pattern = re.compile(rb'\bdef\s+' + re.escape(name.encode('utf-8')) + rb'\b')
+    for file in _python_files(module_path):
+        with open(file, 'rb') as f:
+            source = f.read()
+        if pattern.search(source) is None:
+            continue
+        try:
+            tree = ast.parse(source, filename=file)
+        except SyntaxError:
+            continue
+        for node in tree.body:
+            if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)) and \
+                    node.name == name:
+                return {'file': _dotted_name(module_path, file),
+                        'line': node.lineno,
+                        'params': parameter_names(node.args)}
+    raise ValueError('{} is not defined in extension files'.format(name))
+
+def imported_libraries(module_path, entry_file):
+    """
+    Returns the sorted names of the top level packages imported at the
+    top level of the entry file, and of the extension's own modules
+    which it imports in turn.  Imports inside functions, or inside a
+    try statement (which usually handles the library being missing),
+    don't stop the extension being imported, so they aren't included
+    Input:
+        module_path -- directory holding the extension files
+        entry_file -- dotted module name of the file the extension
+                      function is defined in (see find_entry_point)
+    """
+    libraries = set()
+    followed = set()
+    modules = [entry_file]
+    while modules:
+        module = modules.pop()
+        if module in followed:
+            continue
+        followed.add(module)
+        file = _module_file(module_path, module)
+        if file is None:
+            continue
+        with open(file, 'rb') as f:
+            try:
+                tree = ast.parse(f.read(), filename=file)
+            except SyntaxError:
+                continue
+        # the package that relative imports are from
+        package = module.split('.')
+        if os.path.basename(file) != '__init__.py':
+            package = package[:-1]
+        for node in tree.body:
+            if isinstance(node, ast.Import):
+                imported = [a.name for a in node.names]
+            elif isinstance(node, ast.ImportFrom) and node.level == 0:
+                imported = [node.module] + ['{}.{}'.format(node.module, a.name) \
+                                                for a in node.names]
+            elif isinstance(node, ast.ImportFrom) and node.level <= len(package) + 1:
+                base = package[:len(package) + 1 - node.level]
+                if node.module:
+                    base = base + node.module.split('.')
+                imported = ['.'.join(base + [a.name]) for a in node.names]
+                if base:
+                    imported.append('.'.join(base))
+            else:
+                continue
+            for name in imported:
+                top = name.split('.')[0]
+                if _module_file(module_path, top) is not None or \
+                        os.path.isdir(os.path.join(module_path, top)):
+                    # one of the extension's own modules, along with
+                    # the packages it is in
+                    parts = name.split('.')
+                    modules.extend('.'.join(parts[:i + 1]) \
+                                        for i in range(len(parts)))
+                elif isinstance(node, ast.Import) or node.level == 0:
+                    libraries.add(top)
+    return sorted(libraries)
+
+def parameter_names(args):
+    """
+    Returns the names of the parameters of a function from its
+    ast.arguments node, in the order that inspect.signature
+    would list them
+    """
+    names = [a.arg for a in getattr(args, 'posonlyargs', [])]
+    names += [a.arg for a in args.args]
+    if args.vararg is not None:
+        names.append('*' + args.vararg.arg)
+    names += [a.arg for a in args.kwonlyargs]
+    if args.kwarg is not None:
+        names.append('**' + args.kwarg.arg)
+    return names
+
+def _python_files(module_path):
+    """
+    Yields the py files below module_path in a fixed order, with
+    the files in a directory before those in its sub directories
+    """
+    for root, dirs, files in os.walk(module_path):
+        dirs[:] = sorted(d for d in dirs if d != '__pycache__')
+        for file in sorted(files):
+            if file.endswith('.py'):
+                yield os.path.join(root, file)
+
+def _module_file(module_path, module):
+    """
+    Returns the py file of a dotted module name below module_path,
+    or None if there isn't one
+    """
+    path = os.path.join(module_path, *module.split('.'))
+    for file in (path + '.py', os.path.join(path, '__init__.py')):
+        if os.path.isfile(file):
+            return file
+    return None
+
+def _dotted_name(module_path, file):
+    relative = os.path.relpath(os.path.splitext(file)[0], module_path)
+    return '.'.join(relative.split(os.sep))
@@ -18,42 +18,61 @@ extension/
                                     extension_file_2.py
                                     etc .....
 
+Where symbolic links are available, <hash of extension path> is a link
+to a hidden directory holding the installed version, so that a new
+version can be swapped in with one rename (see swap_in())
+
 The __init__.py is auto generated to find the correct function 
 call, for example:
     from .extension_file_2 import extension
 
-The extension can then be imported from module <hash of extension path>
-and the sys.path needs to be aware of the original filesystem path
+The extension is then imported as module
+_pandex_ext.<hash of extension path>, which extension_loader.py finds
+in the directory above without changing sys.path
 
 No object outside this class needs to be concerned with this internal
 layout and access mechanism
 """
-import os, shutil, sys, inspect
-from pathlib import Path
+import os, shutil, sys, time, uuid, inspect
 
-from importlib import import_module, invalidate_caches, reload
+from importlib import import_module
+from importlib.util import find_spec
 
-from ..symbols import __df_ext__, __pdext__
+from ..symbols import __df_ext__, __pdext__, __replaced_version_lifetime__, \
+                       __repository_staging__
 from .extension_info import ExtensionInfo
+from .entry_point import find_entry_point, imported_libraries
+from .extension_loader import extension_module_finder
 
 class Extension(object):
 
-    def __init__(self, extension_path):
+    def __init__(self, extension_path, init_values=None):
         """
         Input:
             extension_path -- string of the form:
                                 /path/to/repo/collection/extension
+            init_values -- the init_values of the installed extension
+                           if already known (e.g. from the repository
+                           index), so that its details are available
+                           without importing it
         """
         self.ext_info = ExtensionInfo(extension_path)
+        if init_values is not None:
+            self.ext_info.initialise_from_init_values(init_values)
 
         # These attributes are not set until import
         self._imported_module = None
         self._enabled = None
         self._func_doc = None
         self._extension_signature = None
+        self.imported_ok = None
     
     def remove(self):
-        shutil.rmtree(self.ext_info.path)
+        # renamed out of the way first, so a reader sees the whole
+        # extension go at once
+        removed = self._hidden_sibling(self.ext_info.path, 'removed')
+        os.rename(self.ext_info.path, removed)
+        shutil.rmtree(removed)
 
     @property
     def enabled(self):
@@ -64,30 +83,130 @@ class Extension(object):
         self.ext_info.enabled = value
 
     def remove_module_path(self):
-        if os.path.exists(self.ext_info.module_path):
-            shutil.rmtree(self.ext_info.module_path)
-
-    def find_extension_file(self):
-        """
-        Looks for a py file with that contains a function name the
-        same as the extension name
-        """
-        search_string = 'def {}'.format(self.ext_info.name)
-        matched_file = None
-        search_files = Path(self.ext_info.module_path).rglob('*.py')
-        for file in search_files:
-            with open(file, 'r') as f:
-                if search_string in f.read():
-                    # Need to get the parts of the filename that are
-                    # relative to the module directory (ie after the
-                    # module path)
-                    d = list(file.parts[len(Path(self.ext_info.module_path).parts):])
-                    d = d[:-1] + [os.path.splitext(os.path.basename(d[-1]))[0]]
-                    matched_file = '.'.join(d)
-                    break
-        if matched_file is None:
-            raise ValueError('{} is not defined in extension files')
-        self.ext_info.matched_file = matched_file
+        module_path = self.ext_info.module_path
+        if os.path.islink(module_path):
+            os.remove(module_path)
+            self._remove_versions(lifetime=0)
+        elif os.path.exists(module_path):
+            shutil.rmtree(module_path)
+
+    def stage(self, extension_location, link='copy'):
+        """
+        Installs the extension files into a new directory in the
+        hidden staging directory of the repository, which isn't seen by
+        readers until swap_in() is called.  Returns the staged directory
+        Input:
+            extension_location -- ExtensionLocation to install from
+            link -- how local files are installed (see
+                    ExtensionLocation.install_into)
+        """
+        # nothing is created in the collection yet, as the directory
+        # of the extension would be taken as it being installed
+        staging = os.path.join(os.path.dirname(os.path.dirname(self.ext_info.path)),
+                               __repository_staging__)
+        os.makedirs(staging, exist_ok=True)
+        staged = self._hidden_sibling(os.path.join(staging, self.ext_info.module),
+                                      'staged')
+        try:
+            extension_location.install_into(staged, link)
+            self.find_extension_file(staged)
+            # the enabled flag is written into the __init__.py
+            self.ext_info._enabled = True
+            self.ext_info._create_init_py(staged)
+        except:
+            shutil.rmtree(staged, ignore_errors=True)
+            raise
+        return staged
+
+    def swap_in(self, staged):
+        """
+        Makes a staged directory the module of the extension.  The
+        module path is a symbolic link to the current version, which
+        is replaced in one rename, so a reader sees either the old
+        version or the new one and never a partly installed module.
+
+        A replaced version is kept for a while, in case a reader is
+        still importing it, and removed by a later swap.  Must be
+        called holding the repository lock
+        Input:
+            staged -- directory returned by stage()
+        """
+        module_path = self.ext_info.module_path
+        previous = os.path.realpath(module_path) \
+                        if os.path.islink(module_path) else None
+        os.makedirs(self.ext_info.path, exist_ok=True)
+        version = self._hidden_sibling(module_path, 'version')
+        os.rename(staged, version)
+        tmp_link = self._hidden_sibling(module_path, 'link')
+        try:
+            # relative, so the repository can be moved
+            os.symlink(os.path.basename(version), tmp_link)
+        except (OSError, NotImplementedError):
+            # symbolic links aren't available (e.g. on Windows without
+            # the privilege to make them), so the old module is moved
+            # out of the way first
+            self.remove_module_path()
+            os.rename(version, module_path)
+            return
+        if os.path.isdir(module_path) and previous is None:
+            # a directory installed by an earlier version can't be
+            # replaced by a link in one rename
+            shutil.rmtree(module_path)
+        os.replace(tmp_link, module_path)
+        if previous is not None and os.path.isdir(previous):
+            # the time it was replaced, for _remove_versions()
+            os.utime(previous)
+        self._remove_versions(keep=version)
+
+    def _remove_versions(self, keep=None, lifetime=None):
+        """
+        Removes the versions of the module, apart from keep, which
+        were replaced more than lifetime seconds ago
+        """
+        if lifetime is None:
+            lifetime = __replaced_version_lifetime__
+        expired = time.time() - lifetime
+        prefix = '.{}.version.'.format(self.ext_info.module)
+        for name in os.listdir(self.ext_info.path):
+            path = os.path.join(self.ext_info.path, name)
+            if not name.startswith(prefix) or path == keep:
+                continue
+            try:
+                if os.stat(path).st_mtime <= expired:
+                    shutil.rmtree(path, ignore_errors=True)
+            except FileNotFoundError:
+                pass
+
+    @staticmethod
+    def _hidden_sibling(path, kind):
+        """
+        Returns a new hidden path in the same directory as path,
+        which is on the same filesystem so can be renamed onto it
+        """
+        directory, name = os.path.split(path)
+        return os.path.join(directory, '.{}.{}.{}'.format(name, kind,
+                                                          uuid.uuid4().hex))
+
+    def find_extension_file(self, module_path=None):
+        """
+        Looks for the py file which defines a top level function
+        with the same name as the extension, and records where it
+        is in the extension info so that it is only searched for
+        once, at install time.  The usage of the function and the
+        libraries the files import are recorded too, so the extension
+        can be listed without importing it
+        Input:
+            module_path -- directory holding the extension files, if
+                           not the module of the extension
+        """
+        module_path = module_path or self.ext_info.module_path
+        entry_point = find_entry_point(module_path, self.ext_info.name)
+        self.ext_info.matched_file = entry_point['file']
+        self.ext_info.extension_line = entry_point['line']
+        self.ext_info.extension_params = entry_point['params']
+        self.ext_info.extension_signature = self._usage(entry_point['params'])
+        self.ext_info.extension_imports = imported_libraries(module_path, 
+                                                            entry_point['file'])
     
     def get_extension(self):
         try:
@@ -123,17 +242,42 @@ class Extension(object):
             self.imported_ok = False
         return func
     
+    def dependency_advice(self):
+        """
+        Returns advice on the library to install if the extension
+        can't be imported because a library it imports is missing, or
+        None.  The libraries recorded at install time are looked for,
+        so the extension itself isn't imported unless it was installed
+        by an earlier version
+        """
+        if self.imported_ok is None:
+            libraries = self.ext_info.extension_imports
+            if libraries is None:
+                self.get_extension()
+            else:
+                for library in libraries:
+                    if not _library_installed(library):
+                        return 'module:  ' + library + '  needs to be installed\n'
+                return None
+        return self.pdext_fix_advice if self.imported_ok is False else None
+
     @property
     def imported_module(self):
         if self._imported_module is None:
-            sys_path = sys.path
-            sys.path.append(self.ext_info.path)
-            # need to invalidate the import cache 
-            # when dynamically creating new modules since
-            # the interpreter started
-            invalidate_caches()
             try:
-                self._imported_module = import_module(self.ext_info.module)
+                module_name = extension_module_finder.register(
+                                    self.ext_info.module, self.ext_info.module_path)
+                # take the fingerprint before importing so that any
+                # change made during the import is picked up next time
+                fingerprint = self._module_fingerprint()
+                module = sys.modules.get(module_name)
+                if module is not None and \
+                        getattr(module, '__pdext_fingerprint__', None) != fingerprint:
+                    # imported previously, but the files have changed since
+                    self._unload_module()
+                module = import_module(module_name)
+                module.__pdext_fingerprint__ = fingerprint
+                self._imported_module = module
             except AttributeError:
                 raise AttributeError('Extension {} not installed'.format(self.ext_info.name))
             except ModuleNotFoundError as e:
@@ -141,17 +285,53 @@ class Extension(object):
                                 .format(__pdext__, self._full_extension_name(), e.name)
                 e.args += (getattr(e, 'pdext_err'),)
                 raise e
-            finally:
-                sys.path = sys_path
+            self._func_doc = None
             self.ext_info.initialise_from_imported_module(self._imported_module)
         return self._imported_module
 
     def reload(self):
-        if self._imported_module is None:
-            self.imported_module
-        else:
-            reload(self._imported_module)
-            self.ext_info.initialise_from_imported_module(self._imported_module)
+        """
+        Makes sure the imported module matches the files on disk.  The
+        module is only imported again if any of the files have been
+        changed since it was last imported
+        """
+        if self._imported_module is not None and self.is_stale:
+            self._imported_module = None
+        self.imported_module
+
+    @property
+    def is_stale(self):
+        """
+        True if the installed files have changed since the module
+        was imported
+        """
+        return getattr(self._imported_module, '__pdext_fingerprint__', None) \
+                    != self._module_fingerprint()
+
+    def _module_fingerprint(self):
+        """
+        Returns the modification time and size of each py file in
+        the installed module.  This only needs a stat call per file
+        rather than reading or importing them
+        """
+        fingerprint = {}
+        for root, _, files in os.walk(self.ext_info.module_path):
+            for file in files:
+                if file.endswith('.py'):
+                    stat = os.stat(os.path.join(root, file))
+                    fingerprint[os.path.join(root, file)] = \
+                                    (stat.st_mtime_ns, stat.st_size)
+        return fingerprint
+
+    def _unload_module(self):
+        """
+        Removes the module and all its sub modules from sys.modules
+        so that the next import reads them from disk again
+        """
+        module = extension_module_finder.prefix + self.ext_info.module
+        for name in list(sys.modules):
+            if name == module or name.startswith(module + '.'):
+                del sys.modules[name]
         
     # Some properties required outside the class
     @property
@@ -168,7 +348,7 @@ class Extension(object):
         extension to show how the user should call it
         """
         if self._func_doc is None:
-            self._func_doc = func.__doc__
+            self._func_doc = func.__doc__ or ''
 
             self._func_doc += '\nUSAGE: {}'\
                                 .format(self.extension_signature)
@@ -182,18 +362,34 @@ class Extension(object):
     
     @property
     def extension_signature(self):
+        if self._extension_signature is None:
+            if self.ext_info.extension_signature is not None:
+                self._extension_signature = self.ext_info.extension_signature
+            else:
+                # installed by an earlier version which didn't record
+                # the signature, so the function has to be inspected
+                self.get_extension()
         return self._extension_signature
 
     @extension_signature.setter
     def extension_signature(self,func):
-        sig = inspect.signature(func)
-        params = list(sig.parameters)
-        other_args = ', '.join(params[1:])
-        
-        self._extension_signature = 'df.{ext_name}({other_args})'\
-                .format(ext_name=self._full_extension_name(include_ext=True),
-                        other_args=other_args)
+        if self.ext_info.extension_signature is not None:
+            self._extension_signature = self.ext_info.extension_signature
+        else:
+            params = list(inspect.signature(func).parameters)
+            self._extension_signature = self._usage(params)
         self._update_func_doc(func)
+
+    def _usage(self, params):
+        """
+        Returns how the extension is called from a dataframe
+        Input:
+            params -- parameter names of the function, the first of
+                      which is the dataframe
+        """
+        return 'df.{ext_name}({other_args})'\
+                .format(ext_name=self._full_extension_name(include_ext=True),
+                        other_args=', '.join(params[1:]))
     
     def _full_extension_name(self, include_ext=False):
         name = ''
@@ -203,3 +399,10 @@ class Extension(object):
             name += '{collection}.'.format(collection=self.ext_info.collection)
         return name + '{func_name}'.format(func_name=self.ext_info.name)
 
+
+def _library_installed(library):
+    # find_spec of a top level name finds the library without importing it
+    try:
+        return library in sys.modules or find_spec(library) is not None
+    except (ImportError, ValueError):
+        return False
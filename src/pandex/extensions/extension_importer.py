@@ -1,6 +1,9 @@
-import os, sys, types
+import os, hashlib, threading
+from importlib.util import spec_from_loader
 
-from ..symbols import __import_file_ext__, repository, __pdext__
+from ..symbols import __import_file_ext__, __import_file_line_spec__, \
+                      __lock_file_ext__, repository, __pdext__
+from .extension_info import ExtensionInfo
 
 class ExtensionImporter(object):
     """
@@ -36,63 +39,115 @@ class ExtensionImporter(object):
         # call the extension
         |df.ext|.extension_function1()
 
-
+    Each time one of these files is imported, it is only read and
+    parsed again if it has changed, and nothing is installed if all
+    its extensions already are.  An extension which was installed from
+    a different location to the one in the file is installed again.
+    Imports which don't match a file are remembered for the directory
+    they were made from, so later attempts don't look for the file
+    again; call ``importlib.invalidate_caches()`` if an extension file
+    is created after an import of it has failed.
+
+    If the file has a lock file written by ``lock()`` next to it (with
+    ``.lock`` added to its name), the extensions are kept as they are
+    recorded in the lock file instead.
     """
-
-    def find_module(self, fullname, path=None):
+    def __init__(self):
+        # (cwd, fullname) of imports with no extension file
+        self._missing = set()
+        # path of extension file -> (mtime, size, content, hash of the
+        # content, parsed lines)
+        self._parsed = {}
+        self._lock = threading.Lock()
+
+    def find_spec(self, fullname, path=None, target=None):
         """
-        If an extension file is found, then the extensions are loaded 
-        at this point
+        Returns a spec for the module if there is an extension file
+        for it in the current directory
         """
-        import_file = os.path.join(*(fullname.split('.'))) + __import_file_ext__
-        if os.path.exists(import_file):
-            with open(import_file) as stream:
-                import_content = stream.read()
-                pd_ext = repository()
-                pd_ext.import_extension(import_content)
-            return self
-
-    def load_module(self, fullname):
+        key = (os.getcwd(), fullname)
+        if key in self._missing:
+            return None
+        import_file = os.path.join(key[0], *(fullname.split('.'))) + __import_file_ext__
+        if not os.path.isfile(import_file):
+            with self._lock:
+                self._missing.add(key)
+            return None
+        return spec_from_loader(fullname, self, origin=import_file)
+
+    def invalidate_caches(self):
         """
-        Create an empty module in sys modules to comply with
-        the import protocol
-
-        Credit to Anhad Jai Singh blog post:
-             https://blog.ffledgling.com/python-imports-i.html
+        Forgets the imports which didn't match an extension file.  This
+        is called by importlib.invalidate_caches()
         """
+        with self._lock:
+            self._missing.clear()
 
-        # If the module already exists in `sys.modules` we *must* use that
-        # module, it's a mandatory part of the importer protcol
-        if fullname in sys.modules:
-            return
-        
-        try:
-            # The importer protocol requires the loader create a new module
-            # object, set certain attributes on it, then add it to
-            # `sys.modules` before executing the code inside the module (which
-            # is when the "module" actually gets code inside it)
-
-            m = types.ModuleType(fullname, '{} extension import'.format(__pdext__))
-            m.__file__ = '<{} import>'.format(__pdext__)
-            m.__name__ = fullname
-            m.__loader__ = self
-            sys.modules[fullname] = m
-
-            # Return empty module
-            return m
-
-        except Exception as e:
-            # If it fails, we need to reset sys.modules to it's old state. This
-            # is good practice in general, but also a mandatory part of the
-            # spec, likely to keep the import statement idempotent and free of
-            # side-effects across imports.
-
-            # Delete the entry we might've created; use LBYL to avoid nested
-            # exception handling
-            if sys.modules.get(fullname):
-                del sys.modules[fullname]
-            raise e
+    def create_module(self, spec):
+        # the default empty module
         return None
 
-
-
+    def exec_module(self, module):
+        """
+        The extensions in the file are installed when the module
+        is executed
+        """
+        import_file = module.__spec__.origin
+        module.__doc__ = '{} extension import'.format(__pdext__)
+        module.__file__ = '<{} import>'.format(__pdext__)
+
+        content, lines = self._read_import_file(import_file)
+        pd_ext = repository()
+        lock_file = import_file + __lock_file_ext__
+        if os.path.isfile(lock_file):
+            # written by pd.ext.lock()
+            pd_ext._import_locked(content, lock_file)
+        else:
+            # extensions installed from a location which is no longer
+            # the one in the file are installed again
+            pd_ext._lock_reinstall(self._changed_lines(pd_ext, lines))
+
+    def _read_import_file(self, import_file):
+        """
+        Returns the content of the extension file and its parsed lines,
+        which are reused if the file hasn't changed
+        """
+        # imported here as the repository package imports this one
+        from ..repository.extension_spec import parse_spec_lines
+
+        stat = os.stat(import_file)
+        with self._lock:
+            parsed = self._parsed.get(import_file)
+        if parsed is not None and parsed[:2] == (stat.st_mtime_ns, stat.st_size):
+            return parsed[2], parsed[4]
+
+        with open(import_file) as stream:
+            content = stream.read()
+        digest = hashlib.sha1(content.encode('utf-8')).hexdigest()
+        if parsed is not None and parsed[3] == digest:
+            lines = parsed[4]
+        else:
+            lines = parse_spec_lines(content)
+        with self._lock:
+            self._parsed[import_file] = (stat.st_mtime_ns, stat.st_size,
+                                         content, digest, lines)
+        return content, lines
+
+    @staticmethod
+    def _changed_lines(pd_ext, lines):
+        """
+        Returns the lines whose extensions are not installed in the
+        default repository from the location in the line, which are
+        the ones import_extension() would need to install
+        """
+        repo = pd_ext._repository_path(pd_ext.default_repository)
+        changed = []
+        for location, name in lines:
+            line = __import_file_line_spec__.format(location, name)
+            collection, ext_name = pd_ext._parse_extension_name(name)
+            init_values = ExtensionInfo(os.path.join(repo, collection, ext_name))\
+                                .read_init_values()
+            if (init_values is None or init_values['install_location'] != line) \
+                    and line not in changed:
+                changed.append(line)
+        return changed
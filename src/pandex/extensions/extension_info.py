@@ -1,4 +1,4 @@
-import os, hashlib
+import os, ast, uuid, hashlib
 from datetime import datetime
 from pathlib import Path
 
@@ -21,6 +21,10 @@ enabled = {enabled}
 init_values = {{
     'extension_file': '{extension_file}',
     'extension_name': '{extension_name}',
+    'extension_line': {extension_line},
+    'extension_params': {extension_params!r},
+    'extension_signature': {extension_signature!r},
+    'extension_imports': {extension_imports!r},
     'enabled': {enabled},
     'install_location': '{install_location}',
     'install_collection': '{install_collection}',
@@ -54,23 +58,41 @@ init_values = {{
         self.module = hashlib.sha1(bytes(self.path, 'utf-8')).hexdigest()
         self.module_path = os.path.join(self.path, self.module)
         self.matched_file = None
+        self.extension_line = None
+        self.extension_params = None
+        self.extension_signature = None
+        self.extension_imports = None
         self.install_location = None
         self.install_repository = None
         self.install_files = None
         self._install_time = None
 
-    def _create_init_py(self):
+    def _create_init_py(self, module_path=None):
         """
         set up an __init__.py file to import the extension and 
         manage other settings
+        Input:
+            module_path -- directory to write it in, if not the
+                           module of the extension
         """
-        with open(self.init_py_location, 'w+') as f:
+        init_py_location = self.init_py_location if module_path is None \
+                                else os.path.join(module_path, '__init__.py')
+        # write a new file and rename it over the old one, so that
+        # any link to another file is replaced rather than written
+        # through, and a reader never sees a partly written file
+        tmp_file = '{}.{}.tmp'.format(init_py_location, uuid.uuid4().hex)
+        with open(tmp_file, 'w') as f:
             f.write(self._rendered_init_py)
+        os.replace(tmp_file, init_py_location)
 
     @property
     def _rendered_init_py(self):
         return self.init_py.format(extension_file=self.matched_file, 
                               extension_name=self.name,
+                              extension_line=self.extension_line,
+                              extension_params=self.extension_params,
+                              extension_signature=self.extension_signature,
+                              extension_imports=self.extension_imports,
                               enabled=self.enabled,
                               install_location=self.install_location,
                               install_collection=self.collection,
@@ -83,12 +105,51 @@ init_values = {{
         return os.path.join(self.module_path, '__init__.py')
 
     def initialise_from_imported_module(self, module):
-        self._enabled = getattr(module, 'init_values')['enabled']
-        self.matched_file = getattr(module, 'init_values')['extension_file']
-        self.install_location = getattr(module, 'init_values')['install_location']
-        self.install_repository = getattr(module, 'init_values')['install_repository']
-        self.install_files = getattr(module, 'init_values')['install_files']
-        self.install_time = getattr(module, 'init_values')['install_time']
+        self.initialise_from_init_values(getattr(module, 'init_values'))
+
+    def initialise_from_init_values(self, init_values):
+        """
+        Set the attributes from an init_values dictionary, either
+        from the imported module or read from the repository index
+        """
+        self._enabled = init_values['enabled']
+        self.matched_file = init_values['extension_file']
+        self.install_location = init_values['install_location']
+        self.install_repository = init_values['install_repository']
+        self.install_files = init_values['install_files']
+        self.install_time = init_values['install_time']
+        # not recorded by earlier versions
+        self.extension_line = init_values.get('extension_line')
+        self.extension_params = init_values.get('extension_params')
+        self.extension_signature = init_values.get('extension_signature')
+        self.extension_imports = init_values.get('extension_imports')
+
+    def read_init_values(self):
+        """
+        Returns the init_values dictionary from the __init__.py file
+        by parsing it rather than importing it, or None if the
+        extension is not fully installed
+        """
+        try:
+            with open(self.init_py_location) as f:
+                tree = ast.parse(f.read())
+        except (FileNotFoundError, SyntaxError):
+            return None
+        for node in tree.body:
+            if isinstance(node, ast.Assign) and \
+                    any(getattr(t, 'id', None) == 'init_values' for t in node.targets):
+                return ast.literal_eval(node.value)
+        return None
+
+    @property
+    def install_hash(self):
+        """
+        Identifies a particular install of the extension, independent
+        of where the repository is on the filesystem
+        """
+        install = '{}|{}|{}'.format(self.install_location, self._install_time,
+                                    self.matched_file)
+        return hashlib.sha1(bytes(install, 'utf-8')).hexdigest()
 
     @property
     def enabled(self):
@@ -0,0 +1,115 @@
+"""
+Imports installed extension modules under a namespace reserved for
+them, without touching sys.path:
+
+    _pandex_ext                       (an empty package)
+    _pandex_ext.<hash of extension path>
+    _pandex_ext.<hash of extension path>.<extension file>
+
+The finder maps each hash straight to the module directory of the
+installed extension, which the Extension registers before importing
+it.  A module which isn't registered (for example when an extension
+function is unpickled in a worker process) is looked up in the
+extensions of the repository, which come from its index.
+
+Only the finder of the module directory is refreshed when a module
+is imported, rather than calling importlib.invalidate_caches(), which
+would clear the caches of every finder in the process.  Threads can
+import different extensions at the same time, as each module has
+its own import lock.
+"""
+import os, sys, threading
+from importlib.machinery import ModuleSpec
+from importlib.util import spec_from_file_location
+
+from ..symbols import __extension_modules__, repository
+
+class ExtensionModuleFinder(object):
+    def __init__(self):
+        self.prefix = __extension_modules__ + '.'
+        # module name -> module directory
+        self._paths = {}
+        self._lock = threading.Lock()
+
+    def register(self, module, module_path):
+        """
+        Records the directory of an extension module, and returns the
+        full name to import it by
+        Input:
+            module -- the module name (the hash of the extension path)
+            module_path -- the directory holding the module
+        """
+        with self._lock:
+            self._paths[module] = module_path
+        return self.prefix + module
+
+    def find_spec(self, fullname, path=None, target=None):
+        if fullname == __extension_modules__:
+            spec = ModuleSpec(fullname, self, is_package=True)
+            spec.submodule_search_locations = []
+            return spec
+        if not fullname.startswith(self.prefix):
+            return None
+        module = fullname[len(self.prefix):]
+        # sub modules are found by the usual path finder, from the
+        # package's __path__
+        if '.' in module:
+            return None
+        module_path = self._module_path(module)
+        if module_path is None:
+            return None
+        # the module directory may be a link to the installed version,
+        # which is followed here so that the whole module is imported
+        # from the one version, even if a new one is swapped in
+        module_path = os.path.realpath(module_path)
+        init_py = os.path.join(module_path, '__init__.py')
+        if not os.path.isfile(init_py):
+            return None
+        self._refresh_finders(module_path)
+        return spec_from_file_location(fullname, init_py,
+                                       submodule_search_locations=[module_path])
+
+    # the empty _pandex_ext package is created and loaded here too
+    def create_module(self, spec):
+        return None
+
+    def exec_module(self, module):
+        pass
+
+    def _module_path(self, module):
+        with self._lock:
+            module_path = self._paths.get(module)
+        if module_path is not None:
+            return module_path
+        try:
+            collections = repository().extension_collections
+        except AttributeError:
+            # pandex hasn't set up a repository
+            return None
+        for extensions in collections.values():
+            for ext in extensions.values():
+                if ext.ext_info.module == module:
+                    self.register(module, ext.ext_info.module_path)
+                    return ext.ext_info.module_path
+        return None
+
+    @staticmethod
+    def _refresh_finders(module_path):
+        """
+        Clears the cached directory listings of the module directory
+        and any sub directories, which may be out of date if the
+        extension was reinstalled within the resolution of the
+        directory modification time
+        """
+        for path, finder in list(sys.path_importer_cache.items()):
+            if path.startswith(module_path) and \
+                    hasattr(finder, 'invalidate_caches'):
+                finder.invalidate_caches()
+
+
+# the finder used by every Extension, put at the start of sys.meta_path
+# as soon as this module is imported.  Each copy of the module (such as
+# _pandex.extensions.extension_loader, used by the test suite) has its
+# own finder, which only finds the modules of its own Extensions
+extension_module_finder = ExtensionModuleFinder()
+sys.meta_path.insert(0, extension_module_finder)
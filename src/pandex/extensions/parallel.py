@@ -0,0 +1,144 @@
+"""
+Run extensions on a dataframe split into chunks of rows, using
+a pool of threads or processes:
+
+    df.ext.parallel(workers=8, chunks='auto').collection.extension(...)
+
+An extension declares whether it can be split up by setting the
+partition attribute on its function (see symbols.py).  Extensions
+which don't declare one need the whole dataframe, so they are run
+on it as normal in the calling thread.
+
+The results from each chunk are put back together in the order of
+the rows:
+    - if the extension returns a dataframe or series for each chunk,
+      they are concatenated
+    - if the extension returns None (because it changes the dataframe
+      it is given), the columns of the changed chunks are copied back
+      into the original dataframe
+    - a reducible extension's results are passed, as a list, to the
+      combine function it declares
+"""
+import os
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+
+import pandas as pd
+
+from ..symbols import repository, __default_collection__, \
+                      __partition_attr__, __combine_attr__, \
+                      __partition_rows__, __partition_frame__, \
+                      __partition_reduce__
+from .collection import BoundExtension
+
+executors = {'thread': ThreadPoolExecutor,
+             'process': ProcessPoolExecutor}
+partitions = (__partition_rows__, __partition_frame__, __partition_reduce__)
+
+
+class ParallelExtensionManager(object):
+    def __init__(self, df, workers=None, chunks='auto', executor='thread'):
+        """
+        Input:
+            df -- the dataframe the extensions operate on
+            workers -- number of threads or processes to use (the
+                       number of CPUs if None)
+            chunks -- number of chunks to split the rows into, or
+                      'auto' for one chunk per worker
+            executor -- 'thread' or 'process'
+        """
+        if executor not in executors:
+            raise ValueError('executor must be one of {}'\
+                                .format(tuple(executors)))
+        if chunks != 'auto' and (not isinstance(chunks, int) or chunks < 1):
+            raise ValueError("chunks must be a positive integer or 'auto'")
+        self._df = df
+        self._workers = workers or os.cpu_count() or 1
+        self._chunks = self._workers if chunks == 'auto' else chunks
+        self._executor = executor
+
+    def __getattr__(self, collection):
+        if collection.startswith('_'):
+            raise AttributeError(collection)
+        if collection not in repository().extension_collections:
+            return self._bind(__default_collection__, collection)
+        return ParallelExtensionCollection(self, collection)
+
+    def _bind(self, collection, name):
+        """
+        Returns a callable which runs the extension on chunks of
+        the dataframe, if its partition allows it
+        """
+        repo = repository()
+        try:
+            ext, enabled = repo._resolve_extension(collection, name)
+        except KeyError:
+            raise AttributeError('{} is not a valid extension'.format(name))
+        partition = getattr(ext, __partition_attr__, __partition_frame__)
+        if partition not in partitions:
+            raise ValueError('{} has an invalid partition {}, it must be one of {}'\
+                                .format(name, partition, partitions))
+        if partition == __partition_reduce__ and \
+                not callable(getattr(ext, __combine_attr__, None)):
+            raise ValueError('{} is reducible but has no {} function'\
+                                .format(name, __combine_attr__))
+        if not enabled or partition == __partition_frame__:
+            return BoundExtension(self._df, collection, name, ext, enabled, repo)
+
+        def extension(*args, **kwargs):
+            return self._run(ext, collection, name, repo, partition, args, kwargs)
+        extension.__name__ = getattr(ext, '__name__', extension.__name__)
+        extension.__qualname__ = extension.__name__
+        extension.__doc__ = ext.__doc__
+        extension.__wrapped__ = ext
+        return extension
+
+    def _split(self):
+        rows = len(self._df)
+        n = max(1, min(self._chunks, rows))
+        return [self._df.iloc[rows * i // n:rows * (i + 1) // n] \
+                    for i in range(n)]
+
+    def _run(self, ext, collection, name, repo, partition, args, kwargs):
+        chunks = self._split()
+        if len(chunks) == 1 and partition == __partition_rows__:
+            return BoundExtension(self._df, collection, name, ext, True, 
+                                  repo)(*args, **kwargs)
+
+        # the extension is bound to each chunk, which can be pickled
+        # to send it to another process
+        with executors[self._executor](max_workers=self._workers) as pool:
+            futures = [pool.submit(_run_chunk, 
+                                   BoundExtension(chunk, collection, name, 
+                                                  ext, True, repo),
+                                   args, kwargs) for chunk in chunks]
+            results, chunks = zip(*[f.result() for f in futures])
+
+        if partition == __partition_reduce__:
+            return getattr(ext, __combine_attr__)(list(results))
+        if all(result is None for result in results):
+            # the extension changed the chunks, so copy the changes back
+            changed = pd.concat(chunks)
+            for column in changed.columns:
+                self._df[column] = changed[column]
+            return None
+        if all(isinstance(result, (pd.DataFrame, pd.Series)) for result in results):
+            return pd.concat(results)
+        return list(results)
+
+
+class ParallelExtensionCollection(object):
+    def __init__(self, manager, collection):
+        self._manager = manager
+        self._collection = collection
+
+    def __getattr__(self, func):
+        return self._manager._bind(self._collection, func)
+
+
+def _run_chunk(extension, args, kwargs):
+    """
+    Returns the result of the extension bound to a chunk, and the
+    chunk itself if there is no result as the extension has changed it
+    """
+    result = extension(*args, **kwargs)
+    return result, (extension.df if result is None else None)
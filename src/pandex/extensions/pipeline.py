@@ -0,0 +1,178 @@
+"""
+Record a chain of extension calls and run them later, chunk by
+chunk where the extensions allow it:
+
+    df.ext.pipe_lazy().a().b(x=1).collection.c().collect()
+
+Each step is given the result of the step before (or the dataframe
+it changed, if it returns None).  Consecutive steps which declare
+the 'rows' partition (see symbols.py) are fused: each chunk of rows
+is passed through all of them in turn before the next chunk is
+started, so only one chunk of each intermediate result is held in
+memory at a time.  A step which needs the whole dataframe ends the
+fused steps before it, whose chunks are concatenated for it.  A
+reducible extension as the last step is also run on each chunk, and
+its results are combined, so the rows are never put back together.
+
+The dataframe the pipeline is made from is never changed, even by
+steps which change the dataframe they are given, as they are given
+chunks of it or a shallow copy of it, which copy on write.
+"""
+import pandas as pd
+
+from ..symbols import repository, __default_collection__, \
+                      __partition_attr__, __combine_attr__, \
+                      __partition_rows__, __partition_frame__, \
+                      __partition_reduce__
+from .collection import BoundExtension
+from .parallel import partitions
+
+default_chunk_rows = 65536
+
+
+class LazyPipeline(object):
+    def __init__(self, df, chunk_rows=None, steps=()):
+        """
+        Input:
+            df -- the dataframe the pipeline starts from
+            chunk_rows -- number of rows in each chunk
+            steps -- the steps recorded so far
+        """
+        if chunk_rows is None:
+            chunk_rows = default_chunk_rows
+        if not isinstance(chunk_rows, int) or chunk_rows < 1:
+            raise ValueError('chunk_rows must be a positive integer')
+        self._df = df
+        self._chunk_rows = chunk_rows
+        self._steps = tuple(steps)
+
+    def __getattr__(self, collection):
+        if collection.startswith('_'):
+            raise AttributeError(collection)
+        if collection not in repository().extension_collections:
+            return self._step(__default_collection__, collection)
+        return LazyPipelineCollection(self, collection)
+
+    def __repr__(self):
+        names = [step.name if step.collection == __default_collection__ \
+                    else '{}.{}'.format(step.collection, step.name) \
+                        for step in self._steps]
+        return '<lazy pipeline: {}>'.format(' -> '.join(names) or 'no steps')
+
+    def _step(self, collection, name):
+        """
+        Returns a function which records a call of the extension as
+        the next step, and returns the new pipeline
+        """
+        repo = repository()
+        try:
+            ext, enabled = repo._resolve_extension(collection, name)
+        except KeyError:
+            raise AttributeError('{} is not a valid extension'.format(name))
+
+        def step(*args, **kwargs):
+            # a disabled extension does nothing, so it is left out
+            if not enabled:
+                return self
+            return LazyPipeline(self._df, self._chunk_rows, self._steps + \
+                        (PipelineStep(collection, name, ext, repo, args, kwargs),))
+        step.__name__ = getattr(ext, '__name__', name)
+        step.__qualname__ = step.__name__
+        step.__doc__ = ext.__doc__
+        step.__wrapped__ = ext
+        return step
+
+    def collect(self):
+        """
+        Runs the steps, and returns the result of the last one
+        """
+        data = self._df
+        steps = list(self._steps)
+        while steps:
+            fused = []
+            while steps and steps[0].partition == __partition_rows__:
+                fused.append(steps.pop(0))
+            last_reduce = len(steps) == 1 and \
+                            steps[0].partition == __partition_reduce__
+            if last_reduce:
+                fused.append(steps.pop(0))
+            if fused:
+                data = self._run_chunks(data, fused, last_reduce)
+            elif data is self._df:
+                # the step mustn't change the original dataframe
+                data = steps.pop(0).run(data.copy(deep=False))
+            else:
+                data = steps.pop(0).run(data)
+        return data
+
+    def _chunks(self, data):
+        rows = len(data)
+        for start in range(0, max(rows, 1), self._chunk_rows):
+            yield data.iloc[start:start + self._chunk_rows]
+
+    def _run_chunks(self, data, steps, reduce):
+        """
+        Passes each chunk of rows through all the steps in turn,
+        and puts the results back together
+        """
+        results = []
+        for chunk in self._chunks(data):
+            results.append(run_steps(chunk, steps))
+        if reduce:
+            return getattr(steps[-1].ext, __combine_attr__)(results)
+        if len(results) == 1:
+            return results[0]
+        if all(isinstance(result, (pd.DataFrame, pd.Series)) for result in results):
+            return pd.concat(results)
+        return results
+
+
+class LazyPipelineCollection(object):
+    def __init__(self, pipeline, collection):
+        self._pipeline = pipeline
+        self._collection = collection
+
+    def __getattr__(self, func):
+        return self._pipeline._step(self._collection, func)
+
+
+class PipelineStep(object):
+    """
+    A recorded call of an extension
+    """
+    def __init__(self, collection, name, ext, repo, args, kwargs):
+        partition = getattr(ext, __partition_attr__, __partition_frame__)
+        if partition not in partitions:
+            raise ValueError('{} has an invalid partition {}, it must be one of {}'\
+                                .format(name, partition, partitions))
+        if partition == __partition_reduce__ and \
+                not callable(getattr(ext, __combine_attr__, None)):
+            raise ValueError('{} is reducible but has no {} function'\
+                                .format(name, __combine_attr__))
+        self.collection = collection
+        self.name = name
+        self.ext = ext
+        self.repo = repo
+        self.partition = partition
+        self.args = args
+        self.kwargs = kwargs
+
+    def run(self, data):
+        """
+        Returns the result of the extension, or the data it was
+        given if it changed that instead
+        """
+        # bound like any other call, so the repository's wrappers
+        # (such as caching results) are applied
+        result = BoundExtension(data, self.collection, self.name, self.ext,
+                                True, self.repo)(*self.args, **self.kwargs)
+        return data if result is None else result
+
+
+def run_steps(chunk, steps):
+    """
+    Passes a chunk of rows through each step in turn
+    """
+    for step in steps:
+        chunk = step.run(chunk)
+    return chunk
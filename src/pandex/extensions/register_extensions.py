@@ -7,19 +7,75 @@ import inspect
 import pandas as pd
 
 from ..symbols import __df_ext__, repository, __default_collection__
-from .collection import ExtensionCollection
+from .collection import ExtensionCollection, BoundExtension
+from .parallel import ParallelExtensionManager
+from .pipeline import LazyPipeline
 
 @pd.api.extensions.register_dataframe_accessor(__df_ext__)
 class ExtensionManager(object):
     def __init__(self, pandas_obj):
         self._obj = pandas_obj
+        # collections and extensions in the default collection which
+        # have already been looked up, keyed by name, for the
+        # repository generation they were looked up in
+        self._resolved = {}
+        self._generation = None
+
+    def parallel(self, workers=None, chunks='auto', executor='thread'):
+        """
+        Run an extension on the dataframe split into chunks of rows
+        in a pool of threads or processes, for example:
+
+            df.ext.parallel(workers=8).collection.extension(...)
+
+        Only extensions which declare they can be run on part of the
+        dataframe are split up, all others are run as normal.
+        Input:
+            workers -- number of threads or processes to use (the
+                       number of CPUs if None)
+            chunks -- number of chunks to split the rows into, or
+                      'auto' for one chunk per worker
+            executor -- 'thread' or 'process'
+        """
+        return ParallelExtensionManager(self._obj, workers, chunks, executor)
+
+    def pipe_lazy(self, chunk_rows=None):
+        """
+        Record a chain of extension calls to run later, for example:
+
+            df.ext.pipe_lazy().a().b(x=1).collection.c().collect()
+
+        The steps are run when collect() is called.  Consecutive
+        extensions which declare the 'rows' partition are run on one
+        chunk of rows at a time, so the intermediate results are
+        never held in memory in full.  The dataframe itself is never
+        changed.
+        Input:
+            chunk_rows -- number of rows in each chunk (65536 if None)
+        """
+        return LazyPipeline(self._obj, chunk_rows)
        
     def __getattr__(self, collection):
-        if collection not in repository().extension_collections:
-            extensions = ExtensionCollection(self._obj, 
-                        repository().extension_collections[__default_collection__])
-            return getattr(extensions, collection)
-        
-        return ExtensionCollection(self._obj, 
-                        repository().extension_collections[collection])
-    
\ No newline at end of file
+        repo = repository()
+        if repo._generation != self._generation:
+            # everything looked up before the extensions changed
+            self._resolved = {}
+            self._generation = repo._generation
+        resolved = self._resolved.get(collection)
+        if resolved is not None:
+            return resolved
+        if collection not in repo.extension_collections:
+            # an extension in the default collection is bound
+            # directly without creating an intermediate collection
+            try:
+                ext, enabled = repo._resolve_extension(__default_collection__,
+                                                       collection)
+            except KeyError:
+                raise AttributeError('{} is not a valid extension'\
+                                        .format(collection))
+            resolved = BoundExtension(self._obj, __default_collection__,
+                                      collection, ext, enabled, repo)
+        else:
+            resolved = ExtensionCollection(self._obj, collection, repo)
+        self._resolved[collection] = resolved
+        return resolved
@@ -4,13 +4,21 @@ from .config_file_management import config_file_management_mixin
 from .user_repository_methods import user_repository_methods_mixin
 from .user_extension_control_methods import user_extension_control_methods_mixin
 from .user_extension_install_methods import user_extension_install_methods_mixin
+from .user_extension_batch_methods import user_extension_batch_methods_mixin
+from .user_extension_cache_methods import user_extension_cache_methods_mixin
+from .user_extension_instrument_methods import user_extension_instrument_methods_mixin
+from .user_extension_lock_methods import user_extension_lock_methods_mixin
 
 from ..symbols import __pdext__, __pd_ext__, __import_file_ext__
 from ..extensions import ExtensionImporter
 
 class ExtensionRepository(user_repository_methods_mixin,
                           user_extension_install_methods_mixin,
+                          user_extension_lock_methods_mixin,
                           user_extension_control_methods_mixin,
+                          user_extension_batch_methods_mixin,
+                          user_extension_cache_methods_mixin,
+                          user_extension_instrument_methods_mixin,
                           extension_management_mixin,
                           config_file_management_mixin,
                           extension_properties_mixin):
@@ -1 +1,13 @@
-from .ExtensionRepository import ExtensionRepository
\ No newline at end of file
+from .lazy_repository import LazyExtensionRepository
+
+# The repository class (and the modules it depends on) is only
+# imported when first asked for, so that importing pandex in lazy
+# mode doesn't pay for it
+def __getattr__(name):
+    if name == 'ExtensionRepository':
+        from .ExtensionRepository import ExtensionRepository
+        # importing the sub module of the same name sets it as an
+        # attribute of this package, so replace it with the class
+        globals()[name] = ExtensionRepository
+        return ExtensionRepository
+    raise AttributeError("module {} has no attribute {}".format(__name__, name))
@@ -0,0 +1,337 @@
+import os, sys, time, pstats, cProfile, threading
+from collections import Counter
+
+from ..extensions.collection import BoundExtension
+from .call_stats import extension_name
+from .call_wrapper import ExtensionCallWrapper
+
+def _func(code):
+    """
+    Returns the key of a function in pstats statistics
+    """
+    return code.co_filename, code.co_firstlineno, code.co_name
+
+# the dispatch code between the profiler and the extension function,
+# which is left out of the profiles.  It is compared by key rather 
+# than identity, as the package may have been imported more than once
+_dispatch_func = _func(BoundExtension._call.__code__)
+
+class CallProfiler(ExtensionCallWrapper):
+    """
+    Profiles the calls of extensions, aggregating the profile of each
+    extension across all its calls.
+
+    In deterministic mode every function call made by the extension
+    is recorded with cProfile.  Only one call is profiled at a time,
+    as cProfile can't profile more than one thread at once: calls in
+    other threads while one is being profiled, calls of profiled
+    extensions from inside another profiled extension and calls made
+    while another profiler is running aren't profiled themselves
+    (though the nested calls show up in the profile of the outer one).
+
+    In sampling mode a background thread records the stack of each
+    thread running a profiled extension every interval seconds, so
+    the extension runs at nearly full speed and concurrent calls are
+    all profiled, at the cost of only seeing where time is spent
+    approximately.
+    """
+    modes = ('deterministic', 'sampling')
+
+    def __init__(self, repository, mode='deterministic', interval=0.001,
+                 output=None):
+        """
+        Input:
+            repository -- the ExtensionRepository the profiler is
+                          installed in, which it is removed from when
+                          stopped
+            mode -- 'deterministic' or 'sampling'
+            interval -- seconds between samples in sampling mode
+            output -- if given, the path the profile is written to
+                      when the profiler is stopped (see write())
+        """
+        if mode not in self.modes:
+            raise ValueError('Profile mode must be one of {}, not {}'\
+                                .format(', '.join(self.modes), mode))
+        super().__init__()
+        self.repository = repository
+        self.mode = mode
+        self.interval = interval
+        self.output = output
+        self.calls = Counter()
+        self.skipped = 0
+        self._lock = threading.Lock()
+        # deterministic mode: (collection, name) -> cProfile.Profile
+        self._profiles = {}
+        self._profiling = threading.Lock()
+        # sampling mode: (collection, name) -> Counter of stacks, with
+        # the threads running profiled extensions and the frame they
+        # were called from
+        self._samples = {}
+        self._active = {}
+        self._sampler = None
+        self._depth = threading.local()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def stop(self):
+        """
+        Stop profiling, and write the profile if an output path was
+        given
+        """
+        self.repository._remove_call_profiler(self)
+        if self.output is not None:
+            self.write(self.output)
+
+    def wrap_call(self, bound, call, args, kwargs):
+        depth = getattr(self._depth, 'value', 0)
+        if depth:
+            # already inside a profiled extension in this thread
+            return call(args, kwargs)
+        self._depth.value = 1
+        try:
+            if self.mode == 'sampling':
+                return self._sampled_call(bound, call, args, kwargs)
+            return self._profiled_call(bound, call, args, kwargs)
+        finally:
+            self._depth.value = 0
+
+    def _profiled_call(self, bound, call, args, kwargs):
+        if sys.getprofile() is not None or \
+                not self._profiling.acquire(blocking=False):
+            with self._lock:
+                self.skipped += 1
+            return call(args, kwargs)
+        try:
+            extension = (bound._collection, bound.name)
+            profile = self._profiles.get(extension)
+            if profile is None:
+                profile = self._profiles[extension] = cProfile.Profile()
+            try:
+                profile.enable()
+            except ValueError:
+                # another profiler is using sys.monitoring
+                with self._lock:
+                    self.skipped += 1
+                return call(args, kwargs)
+            try:
+                return call(args, kwargs)
+            finally:
+                profile.disable()
+                with self._lock:
+                    self.calls[extension] += 1
+        finally:
+            self._profiling.release()
+
+    def _sampled_call(self, bound, call, args, kwargs):
+        extension = (bound._collection, bound.name)
+        thread = threading.get_ident()
+        with self._lock:
+            self._active[thread] = (extension, sys._getframe())
+            if self._sampler is None:
+                self._sampler = threading.Thread(target=self._sample, daemon=True,
+                                                 name='pandex-profile-sampler')
+                self._sampler.start()
+        try:
+            return call(args, kwargs)
+        finally:
+            with self._lock:
+                del self._active[thread]
+                self.calls[extension] += 1
+
+    def _sample(self):
+        """
+        Records the stacks of the threads running profiled extensions
+        until there are none
+        """
+        while True:
+            with self._lock:
+                if not self._active:
+                    self._sampler = None
+                    return
+                active = list(self._active.items())
+            frames = sys._current_frames()
+            stacks = []
+            for thread, (extension, base) in active:
+                frame = frames.get(thread)
+                stack = []
+                while frame is not None and frame is not base:
+                    stack.append(frame.f_code)
+                    frame = frame.f_back
+                if frame is base:
+                    stacks.append((extension, tuple(
+                        func for func in map(_func, reversed(stack))
+                            if func != _dispatch_func)))
+            del frames
+            with self._lock:
+                for extension, stack in stacks:
+                    if stack:
+                        self._samples.setdefault(extension, Counter())[stack] += 1
+            time.sleep(self.interval)
+
+    def stats(self):
+        """
+        Returns a pstats.Stats of the profile of all the extensions.
+        In sampling mode the times are estimated from the number of
+        samples, and the call counts are the number of samples
+        """
+        stats = pstats.Stats()
+        for extension_stats in self._extension_stats().values():
+            stats.add(_StatsSource(extension_stats))
+        return stats
+
+    def collapsed(self):
+        """
+        Returns the profile as collapsed stacks, one line for each
+        stack with its frames separated by semicolons followed by a
+        count, which flamegraph tools such as flamegraph.pl,
+        speedscope and inferno read.  The first frame of each stack
+        is the name of the extension.
+
+        In sampling mode the count is the number of samples.  In
+        deterministic mode it is microseconds, and as cProfile only
+        records the time of each function for each of its callers
+        the stacks are rebuilt from those, sharing a function's time
+        between the stacks it appears in in proportion to the time
+        spent in each of its callers.
+        """
+        lines = []
+        if self.mode == 'sampling':
+            with self._lock:
+                samples = {e: Counter(s) for e, s in self._samples.items()}
+            for extension, stacks in sorted(samples.items()):
+                root = extension_name(*extension)
+                for stack, count in sorted(stacks.items()):
+                    lines.append('{} {}'.format(
+                        ';'.join([root] + [_label(f) for f in stack]), count))
+        else:
+            for extension, stats in sorted(self._extension_stats().items()):
+                root = extension_name(*extension)
+                for stack, seconds in sorted(_graph_stacks(stats).items()):
+                    microseconds = int(round(seconds * 1e6))
+                    if microseconds:
+                        lines.append('{} {}'.format(';'.join((root,) + stack),
+                                                    microseconds))
+        return ''.join(line + '\n' for line in lines)
+
+    def write(self, path):
+        """
+        Writes the profile to <path>.pstats, which can be read with
+        pstats or tools such as snakeviz, and the collapsed stacks to
+        <path>.collapsed.  Returns the two paths
+        """
+        path = os.path.expanduser(path)
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        pstats_path, collapsed_path = path + '.pstats', path + '.collapsed'
+        self.stats().dump_stats(pstats_path)
+        with open(collapsed_path, 'w') as f:
+            f.write(self.collapsed())
+        return pstats_path, collapsed_path
+
+    def _extension_stats(self):
+        """
+        Returns the profile of each extension in the pstats format:
+
+            {(file, line, function): (primitive calls, calls,
+                                      own time, cumulative time,
+                                      {caller: (primitive calls, calls,
+                                                own time, cumulative time)})}
+        """
+        if self.mode == 'sampling':
+            with self._lock:
+                samples = {e: Counter(s) for e, s in self._samples.items()}
+            return {extension: _sampled_stats(stacks, self.interval)
+                        for extension, stacks in samples.items()}
+        with self._profiling:
+            profiles = dict(self._profiles)
+            extension_stats = {}
+            for extension, profile in profiles.items():
+                profile.create_stats()
+                # leave out the call which turns the profiler off
+                extension_stats[extension] = {
+                    func: stat for func, stat in profile.stats.items()
+                        if not (func[0] == '~' and '_lsprof.Profiler' in func[2])}
+        return extension_stats
+
+
+class _StatsSource(object):
+    """
+    Gives a dictionary of profile statistics to pstats.Stats as if it
+    were a profiler
+    """
+    def __init__(self, stats):
+        self.stats = stats
+
+    def create_stats(self):
+        pass
+
+
+def _sampled_stats(stacks, interval):
+    """
+    Builds statistics in the pstats format from sampled stacks,
+    estimating the time of each sample as the sampling interval
+    """
+    stats = {}
+    def add(func, caller, own, cumulative, count):
+        cc, nc, tt, ct, callers = stats.get(func, (0, 0, 0, 0, {}))
+        stats[func] = (cc + count, nc + count, tt + own, ct + cumulative, callers)
+        if caller is not None:
+            ecc, enc, ett, ect = callers.get(caller, (0, 0, 0, 0))
+            callers[caller] = (ecc + count, enc + count, ett + own,
+                               ect + cumulative)
+
+    for stack, count in stacks.items():
+        seconds = count * interval
+        seen = set()
+        for depth, func in enumerate(stack):
+            leaf = depth == len(stack) - 1
+            # a recursive function's cumulative time is only counted
+            # once in each stack
+            cumulative = seconds if func not in seen else 0
+            seen.add(func)
+            add(func, stack[depth - 1] if depth else None,
+                seconds if leaf else 0, cumulative, count)
+    return stats
+
+def _graph_stacks(stats, min_seconds=1e-6):
+    """
+    Rebuilds approximate stacks from statistics in the pstats format,
+    returning a Counter of the own time spent in each stack
+    """
+    callees = {}
+    for func, (_, _, _, _, callers) in stats.items():
+        for caller, edge in callers.items():
+            callees.setdefault(caller, {})[func] = edge
+    stacks = Counter()
+
+    def walk(func, stack, funcs, share):
+        funcs = funcs | {func}
+        if func != _dispatch_func:
+            stack = stack + (_label(func),)
+            stacks[stack] += stats[func][2] * share
+        for callee, edge in callees.get(func, {}).items():
+            callee_cumulative = stats[callee][3]
+            if callee in funcs or callee_cumulative <= 0:
+                continue
+            callee_share = min(1.0, edge[3] * share / callee_cumulative)
+            if callee_share * callee_cumulative >= min_seconds:
+                walk(callee, stack, funcs, callee_share)
+
+    for func, (_, _, _, _, callers) in stats.items():
+        if not any(caller in stats for caller in callers):
+            walk(func, (), frozenset(), 1.0)
+    return stacks
+
+def _label(func):
+    filename, line, name = func
+    if filename == '~':
+        # built in function
+        label = name
+    else:
+        label = '{} ({}:{})'.format(name, os.path.basename(filename), line)
+    # semicolons separate the frames
+    return label.replace(';', ',')
@@ -0,0 +1,242 @@
+import os, time, tempfile, threading, tracemalloc
+
+import pandas as pd
+
+from ..symbols import __default_collection__, __pdext__
+from .call_wrapper import ExtensionCallWrapper
+from .result_cache import result_bytes
+from .file_mode import default_file_mode
+
+class LatencyHistogram(object):
+    """
+    Counts of latencies in nanoseconds, in buckets whose width is a
+    fixed fraction of their value as in an HDR histogram.  Values
+    below 2**(sub_bits+1) have a bucket each, and each power of two
+    above that is split into 2**sub_bits buckets, so a percentile is
+    accurate to about 1/2**sub_bits of its value however large it is,
+    while only a few hundred buckets are ever needed.
+    """
+    sub_bits = 4
+
+    def __init__(self):
+        self.counts = {}
+        self.count = 0
+        self.max = 0
+
+    def record(self, value):
+        shift = value.bit_length() - self.sub_bits - 1
+        if shift <= 0:
+            index = value
+        else:
+            index = (shift << self.sub_bits) + (value >> shift)
+        self.counts[index] = self.counts.get(index, 0) + 1
+        self.count += 1
+        if value > self.max:
+            self.max = value
+
+    def percentile(self, percent):
+        """
+        Returns the value below which the given percentage of the
+        recorded values fall (the middle of the bucket it is in, which
+        is the value itself for small values)
+        """
+        if self.count == 0:
+            return None
+        rank = percent / 100 * self.count
+        seen = 0
+        for index in sorted(self.counts):
+            seen += self.counts[index]
+            if seen >= rank:
+                break
+        low, width = self._bucket(index)
+        return min(low + (width - 1) / 2, self.max)
+
+    def _bucket(self, index):
+        """
+        Returns the lowest value and the width of a bucket
+        """
+        if index < 2 << self.sub_bits:
+            return index, 1
+        shift = (index >> self.sub_bits) - 1
+        return (index - (shift << self.sub_bits)) << shift, 1 << shift
+
+
+class ExtensionStats(object):
+    """
+    The statistics recorded for the calls of one extension
+    """
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.total_ns = 0
+        self.latency = LatencyHistogram()
+        self.rows_in = 0
+        self.bytes_in = 0
+        self.rows_out = 0
+        self.bytes_out = 0
+        self.peak_memory = None
+
+
+class CallStats(ExtensionCallWrapper):
+    """
+    Records the number of calls of extensions, how long they take,
+    the size of the dataframes they are given and return and, if
+    asked, the peak memory they allocate (traced with tracemalloc,
+    which slows the calls down considerably)
+    """
+    percentiles = (50, 90, 99)
+
+    def __init__(self, memory=False):
+        super().__init__()
+        self.memory = memory
+        self._stats = {}
+        self._lock = threading.Lock()
+        self._started_tracing = False
+
+    def wrap_call(self, bound, call, args, kwargs):
+        memory = self.memory and tracemalloc.is_tracing()
+        if memory:
+            tracemalloc.reset_peak()
+            before = tracemalloc.get_traced_memory()[0]
+        result, peak = None, None
+        raised = True
+        start = time.perf_counter_ns()
+        try:
+            result = call(args, kwargs)
+            raised = False
+            return result
+        finally:
+            # a call which raises is recorded too
+            elapsed = time.perf_counter_ns() - start
+            if memory:
+                peak = tracemalloc.get_traced_memory()[1] - before
+            self._record(bound, elapsed, result, raised, peak)
+
+    def _record(self, bound, elapsed, result, raised, peak):
+        df = bound.df
+        rows_in, bytes_in = len(df), result_bytes(df)
+        if isinstance(result, (pd.DataFrame, pd.Series)):
+            rows_out, bytes_out = len(result), result_bytes(result)
+        else:
+            rows_out, bytes_out = 0, 0
+        with self._lock:
+            stats = self._stats.get((bound._collection, bound.name))
+            if stats is None:
+                stats = self._stats[(bound._collection, bound.name)] = ExtensionStats()
+            stats.calls += 1
+            if raised:
+                stats.errors += 1
+            stats.total_ns += elapsed
+            stats.latency.record(elapsed)
+            stats.rows_in += rows_in
+            stats.bytes_in += bytes_in
+            stats.rows_out += rows_out
+            stats.bytes_out += bytes_out
+            if peak is not None:
+                stats.peak_memory = max(peak, stats.peak_memory or 0)
+
+    def start_tracing(self):
+        if self.memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracing = True
+
+    def stop_tracing(self):
+        # only if it was started here, rather than by the user
+        if self._started_tracing:
+            tracemalloc.stop()
+            self._started_tracing = False
+
+    def reset(self):
+        with self._lock:
+            self._stats = {}
+
+    def to_frame(self):
+        """
+        Returns the statistics as a dataframe with a row for each
+        extension that has been called
+        """
+        rows = []
+        with self._lock:
+            for (collection, name), stats in sorted(self._stats.items()):
+                row = {'extension': extension_name(collection, name),
+                       'calls': stats.calls,
+                       'errors': stats.errors,
+                       'total_ms': stats.total_ns / 1e6,
+                       'mean_ms': stats.total_ns / stats.calls / 1e6}
+                for percent in self.percentiles:
+                    row['p{}_ms'.format(percent)] = \
+                            stats.latency.percentile(percent) / 1e6
+                row.update({'max_ms': stats.latency.max / 1e6,
+                            'rows_in': stats.rows_in,
+                            'bytes_in': stats.bytes_in,
+                            'rows_out': stats.rows_out,
+                            'bytes_out': stats.bytes_out,
+                            'peak_memory_bytes': stats.peak_memory})
+                rows.append(row)
+        columns = ['extension', 'calls', 'errors', 'total_ms', 'mean_ms'] + \
+                  ['p{}_ms'.format(p) for p in self.percentiles] + \
+                  ['max_ms', 'rows_in', 'bytes_in', 'rows_out', 'bytes_out',
+                   'peak_memory_bytes']
+        return pd.DataFrame(rows, columns=columns).set_index('extension')
+
+    def to_prometheus(self):
+        """
+        Returns the statistics in the Prometheus text exposition format
+        """
+        prefix = '{}_extension'.format(__pdext__)
+        metrics = [
+            ('calls_total', 'counter', 'Number of calls of the extension',
+                lambda s: [('', s.calls)]),
+            ('errors_total', 'counter', 'Number of calls of the extension which raised an exception',
+                lambda s: [('', s.errors)]),
+            ('latency_seconds', 'summary', 'Time taken by calls of the extension',
+                lambda s: [('{{quantile="{}"}}'.format(p / 100),
+                            s.latency.percentile(p) / 1e9) for p in self.percentiles] + \
+                          [('_sum', s.total_ns / 1e9), ('_count', s.calls)]),
+            ('rows_in_total', 'counter', 'Rows of the dataframes passed to the extension',
+                lambda s: [('', s.rows_in)]),
+            ('bytes_in_total', 'counter', 'Bytes of the dataframes passed to the extension',
+                lambda s: [('', s.bytes_in)]),
+            ('rows_out_total', 'counter', 'Rows of the results returned by the extension',
+                lambda s: [('', s.rows_out)]),
+            ('bytes_out_total', 'counter', 'Bytes of the results returned by the extension',
+                lambda s: [('', s.bytes_out)]),
+            ('peak_memory_bytes', 'gauge', 'Largest memory allocated during a call',
+                lambda s: [('', s.peak_memory)] if s.peak_memory is not None else []),
+        ]
+        lines = []
+        with self._lock:
+            for metric, kind, help, samples in metrics:
+                name = '{}_{}'.format(prefix, metric)
+                lines.append('# HELP {} {}'.format(name, help))
+                lines.append('# TYPE {} {}'.format(name, kind))
+                for (collection, ext_name), stats in sorted(self._stats.items()):
+                    label = 'extension="{}"'.format(extension_name(collection, ext_name))
+                    for suffix, value in samples(stats):
+                        if suffix.startswith('{'):
+                            sample = '{}{{{},{}'.format(name, label, suffix[1:])
+                        else:
+                            sample = '{}{}{{{}}}'.format(name, suffix, label)
+                        lines.append('{} {}'.format(sample, value))
+        return '\n'.join(lines) + '\n'
+
+    def export(self, path):
+        """
+        Writes the statistics to a Prometheus text file.  The file is
+        written under a temporary name and renamed, so that a collector
+        reading the directory never sees a partly written file
+        """
+        path = os.path.expanduser(path)
+        fd, tmp_file = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)),
+                                        suffix='.tmp')
+        with os.fdopen(fd, 'w') as f:
+            f.write(self.to_prometheus())
+        # readable by the collector, as mkstemp only allows the owner
+        os.chmod(tmp_file, default_file_mode())
+        os.replace(tmp_file, path)
+
+
+def extension_name(collection, name):
+    if collection == __default_collection__:
+        return name
+    return '{}.{}'.format(collection, name)
@@ -0,0 +1,101 @@
+import abc, pickle, hashlib
+
+import pandas as pd
+
+class ExtensionCallWrapper(abc.ABC):
+    """
+    Base class for the objects which the repository wraps around
+    each call of the extensions selected by the user (for example to
+    cache their results).  The repository passes the wrap_call()
+    method of each wrapper which applies to an extension when it
+    binds the extension to a dataframe.
+    """
+    def __init__(self):
+        # extensions selected, as (collection, name) with name None
+        # for every extension in the collection
+        self.targets = set()
+        self.all_extensions = False
+        # (collection, name) -> (install hash, function) of each
+        # extension called so far
+        self._identities = {}
+
+    def applies_to(self, collection, name):
+        return self.all_extensions or (collection, name) in self.targets \
+                    or (collection, None) in self.targets
+
+    def select(self, targets):
+        """
+        Apply to the targets given, or to all extensions if there
+        are none
+        """
+        if targets:
+            self.targets.update(targets)
+        else:
+            self.all_extensions = True
+
+    def deselect(self, targets):
+        for target in targets:
+            self.targets.discard(target)
+
+    @abc.abstractmethod
+    def wrap_call(self, bound, call, args, kwargs):
+        """
+        Called instead of the extension
+        Input:
+            bound -- the BoundExtension being called
+            call -- function which calls the extension (or the next
+                    wrapper), passed the args and kwargs
+        """
+
+    def _install_hash(self, bound):
+        """
+        Returns the install hash of the extension being called.  It
+        is only looked up again when the function changes, which is
+        when the extension has been reinstalled or reloaded
+        """
+        extension = (bound._collection, bound.name)
+        identity = self._identities.get(extension)
+        if identity is None or identity[1] is not bound.ext:
+            self._extension_changed(*extension)
+            identity = (bound._repo._extension_identity(*extension)[1], bound.ext)
+            self._identities[extension] = identity
+        return identity[0]
+
+    def _extension_changed(self, collection, name):
+        """
+        Called when an extension is first called, or is called after
+        it has been reinstalled or reloaded
+        """
+        pass
+
+
+def frame_hash(df, sample_rows=None):
+    """
+    Returns a hash of the content of a dataframe, including its
+    index, columns and dtypes
+    Input:
+        df -- the dataframe
+        sample_rows -- if set, only this many evenly spaced rows of
+                       a larger dataframe are hashed
+    """
+    rows = len(df)
+    if sample_rows is not None and rows > sample_rows:
+        step = rows / sample_rows
+        df = df.iloc[[int(i * step) for i in range(sample_rows)]]
+    h = hashlib.blake2b(digest_size=16)
+    h.update(repr((rows, list(df.columns),
+                   [str(d) for d in df.dtypes])).encode('utf-8'))
+    h.update(pd.util.hash_pandas_object(df, index=True).values.tobytes())
+    return h.hexdigest()
+
+def arguments_hash(args, kwargs):
+    """
+    Returns a hash of the arguments of a call, which must be
+    picklable
+    """
+    arguments = pickle.dumps((args, sorted(kwargs.items())),
+                             pickle.HIGHEST_PROTOCOL)
+    return hashlib.blake2b(arguments, digest_size=16).hexdigest()
+
+# errors raised when a dataframe or arguments can't be hashed
+unhashable_errors = (TypeError, ValueError, AttributeError, pickle.PicklingError)
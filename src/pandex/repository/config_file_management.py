@@ -1,13 +1,26 @@
-import os, yaml
+import os, copy, tempfile
 
 from ..symbols import __installed_extensions__
+from .file_mode import default_file_mode
 
 
 class config_file_management_mixin(object):
     """
     All the extension repository information is stored in 
     a YAML file in the package folder for pdext
+
+    The parsed file is cached, and only parsed again when the file
+    is replaced or modified.  Inside transaction() the file isn't
+    read or written at all until the transaction ends
     """
+    # (inode, mtime, size) of the config file and the config parsed
+    # from it, shared by all the repository instances
+    _config_cache = None
+    # depth of nested transactions, and whether the config has been
+    # changed inside them
+    _config_transaction = 0
+    _config_changed = False
+
     def _read_config_file(self):
         """
         Read in YAML config file and set up internal
@@ -21,20 +34,25 @@ class config_file_management_mixin(object):
             - name: shared
             location: /opt/data/.pdext
             default_repository: user
+            result_store: /opt/data/.pdext_results
 
-        which parses into the following python object:
+        (result_store is optional) which parses into the following python object:
             {'repositories': 
                 [{'name': 'user', 
                   'location': '~/.pdext'}, 
                  {'name': 'shared', 
                   'location': '/opt/data/.pdext'}], 
-             'default_repository': 'user'}
+             'default_repository': 'user',
+             'result_store': '/opt/data/.pdext_results'}
         """
+        if self._config_transaction:
+            # keep the changes made in the transaction so far
+            for directory in self._search_path:
+                self._create_directory(directory)
+            return
         try:
             no_config_file = False
-            with open(__installed_extensions__, 'r') as stream:
-                config = yaml.safe_load(stream)        
-
+            config = self._load_config_file()
         except FileNotFoundError:
             # create a default configuration
             config =  {'repositories': 
@@ -45,6 +63,7 @@ class config_file_management_mixin(object):
 
         self.repositories = config['repositories']
         self.default_repository = config['default_repository']
+        self.result_store_location = config.get('result_store')
 
         # ensure that all the locations exist and create if not
         for directory in self._search_path:
@@ -57,9 +76,73 @@ class config_file_management_mixin(object):
         if not os.path.exists(directory):
             os.makedirs(directory)
     
+    @classmethod
+    def _load_config_file(cls):
+        """
+        Returns a copy of the parsed config file, which is only parsed
+        again if the file has changed since it was last read
+        """
+        stat = os.stat(__installed_extensions__)
+        key = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+        cached = cls._config_cache
+        if cached is None or cached[0] != key:
+            # yaml is imported here so that it isn't loaded until
+            # the repository is first used in lazy mode
+            import yaml
+            with open(__installed_extensions__, 'r') as stream:
+                config = yaml.load(stream, Loader=_yaml_loader(yaml))
+            cached = (key, config)
+            config_file_management_mixin._config_cache = cached
+        # the repositories list is changed in place by the
+        # repository methods, so the cached config mustn't be shared
+        return copy.deepcopy(cached[1])
+
     def _write_config_file(self):
+        """
+        Writes the config file and rebuilds the extension collections,
+        unless in a transaction, when this is done once at the end
+        """
+        if self._config_transaction:
+            self._config_changed = True
+            return
+        import yaml
         config = {'repositories': self.repositories,
                   'default_repository': self.default_repository}
-        with open(__installed_extensions__, 'w') as outfile:
-            yaml.dump(config, outfile, default_flow_style=False)
+        if self.result_store_location is not None:
+            config['result_store'] = self.result_store_location
+        # write to a temporary file and rename so that a reader
+        # never sees a partly written config file
+        directory = os.path.dirname(__installed_extensions__)
+        fd, tmp_file = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        try:
+            # keep the permissions of the file being replaced
+            try:
+                mode = os.stat(__installed_extensions__).st_mode & 0o777
+            except FileNotFoundError:
+                mode = default_file_mode()
+            os.chmod(tmp_file, mode)
+            with os.fdopen(fd, 'w') as outfile:
+                yaml.dump(config, outfile, Dumper=_yaml_dumper(yaml),
+                          default_flow_style=False)
+                outfile.flush()
+                # taken before the rename, which keeps the inode and
+                # mtime, as another process could replace the file
+                # straight afterwards
+                stat = os.fstat(outfile.fileno())
+            os.replace(tmp_file, __installed_extensions__)
+        except BaseException:
+            if os.path.exists(tmp_file):
+                os.remove(tmp_file)
+            raise
+        config_file_management_mixin._config_cache = \
+                ((stat.st_ino, stat.st_mtime_ns, stat.st_size), copy.deepcopy(config))
         self._build_extension_collections()
+
+
+# the C versions of the yaml loader and dumper are used when
+# libyaml is available, as they are much faster
+def _yaml_loader(yaml):
+    return getattr(yaml, 'CSafeLoader', yaml.SafeLoader)
+
+def _yaml_dumper(yaml):
+    return getattr(yaml, 'CSafeDumper', yaml.SafeDumper)
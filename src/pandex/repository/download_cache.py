@@ -0,0 +1,183 @@
+import os, re, json, time, hashlib, tempfile, threading, logging
+import urllib.request, urllib.error
+
+from ..symbols import __download_cache__, __download_cache_env__, \
+                      __github_url__, __github_url_env__
+
+class DownloadCache(object):
+    """
+    A local cache of archives downloaded from GitHub, so that an
+    archive is only downloaded once however many extension locations
+    refer to it, and not at all on repeated installs.
+
+    Archives are stored by the hash of their content, with a small
+    reference file for each username/repo/ref pointing at the
+    archive it last resolved to:
+
+        <cache_dir>/objects/<sha256 of archive>.zip
+        <cache_dir>/refs/<sha1 of username/repo@ref>.json
+
+    A reference to a commit sha never changes, so it is always used
+    as is.  A reference to a branch or tag is revalidated each time
+    it is used, with a conditional request using the ETag returned by
+    the server, so the archive is only downloaded again if the branch
+    or tag has moved.  If the server can't be reached the cached
+    archive is used anyway.
+
+    When the total size of the archives exceeds max_bytes, the least
+    recently used ones are removed.
+    """
+    max_bytes = 512 * 1024 * 1024
+
+    # one lock per archive so that concurrent installs in this
+    # process share a single download
+    _locks = {}
+    _locks_lock = threading.Lock()
+
+    def __init__(self, cache_dir=None, github_url=None):
+        """
+        Input:
+            cache_dir -- directory to hold the cache.  Defaults to the
+                         environment variable PANDEX_CACHE_DIR if set,
+                         otherwise ~/.cache/pandex/downloads
+            github_url -- server to download archives from.  Defaults
+                          to the environment variable PANDEX_GITHUB_URL
+                          if set, otherwise https://github.com
+        """
+        if cache_dir is None:
+            cache_dir = os.environ.get(__download_cache_env__, __download_cache__)
+        if github_url is None:
+            github_url = os.environ.get(__github_url_env__, __github_url__)
+        self.github_url = github_url
+        self.cache_dir = os.path.expanduser(cache_dir)
+        self.objects_dir = os.path.join(self.cache_dir, 'objects')
+        self.refs_dir = os.path.join(self.cache_dir, 'refs')
+
+    def github_archive(self, username, repo, ref):
+        """
+        Returns the path of a local copy of the zip archive of
+        a GitHub repo at a branch, tag or commit
+        """
+        url = '{github}/{username}/{repo}/archive/{ref}.zip'\
+                .format(github=self.github_url, username=username,
+                        repo=repo, ref=ref)
+        key = hashlib.sha1(bytes('{}/{}@{}'.format(username, repo, ref),
+                                 'utf-8')).hexdigest()
+        with self._lock(key):
+            entry = self._read_ref(key)
+            if entry is None:
+                entry = self._download(url, key)
+            elif not self._is_commit(ref):
+                entry = self._download(url, key, entry)
+            archive = self._object_path(entry['sha256'])
+            # the modification time of an archive records when it
+            # was last used
+            os.utime(archive)
+            self._evict(keep=archive)
+        return archive
+
+    @classmethod
+    def _lock(cls, key):
+        with cls._locks_lock:
+            return cls._locks.setdefault(key, threading.Lock())
+
+    def _object_path(self, sha256):
+        return os.path.join(self.objects_dir, sha256 + '.zip')
+
+    def _ref_path(self, key):
+        return os.path.join(self.refs_dir, key + '.json')
+
+    def _read_ref(self, key):
+        """
+        Returns the reference entry, or None if there isn't one or
+        the archive it points to has been evicted
+        """
+        try:
+            with open(self._ref_path(key)) as f:
+                entry = json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+        if not os.path.exists(self._object_path(entry['sha256'])):
+            return None
+        return entry
+
+    def _write_ref(self, key, entry):
+        os.makedirs(self.refs_dir, exist_ok=True)
+        fd, tmp_file = tempfile.mkstemp(dir=self.refs_dir, suffix='.tmp')
+        with os.fdopen(fd, 'w') as f:
+            json.dump(entry, f)
+        os.replace(tmp_file, self._ref_path(key))
+
+    @staticmethod
+    def _is_commit(ref):
+        return re.match('^[0-9a-f]{40}$', ref) is not None
+
+    def _download(self, url, key, entry=None):
+        """
+        Downloads the archive, or if there is already an entry,
+        only downloads it if it has changed on the server
+        """
+        request = urllib.request.Request(url)
+        if entry is not None and entry.get('etag'):
+            request.add_header('If-None-Match', entry['etag'])
+        try:
+            response = urllib.request.urlopen(request)
+        except urllib.error.HTTPError as e:
+            if e.code == 304 and entry is not None:
+                entry['checked'] = time.time()
+                self._write_ref(key, entry)
+                return entry
+            raise
+        except urllib.error.URLError as e:
+            if entry is None:
+                raise
+            logging.warning('Unable to revalidate {}, using cached copy: {}'\
+                                .format(url, e.reason))
+            return entry
+
+        # stream the archive into the cache, hashing as it goes
+        os.makedirs(self.objects_dir, exist_ok=True)
+        sha256 = hashlib.sha256()
+        fd, tmp_file = tempfile.mkstemp(dir=self.objects_dir, suffix='.tmp')
+        try:
+            with response, os.fdopen(fd, 'wb') as f:
+                for chunk in iter(lambda: response.read(1024 * 1024), b''):
+                    sha256.update(chunk)
+                    f.write(chunk)
+            os.replace(tmp_file, self._object_path(sha256.hexdigest()))
+        except BaseException:
+            if os.path.exists(tmp_file):
+                os.remove(tmp_file)
+            raise
+        logging.info('Extension archive downloaded from {url}'.format(url=url))
+
+        entry = {'url': url,
+                 'etag': response.headers.get('ETag'),
+                 'sha256': sha256.hexdigest(),
+                 'checked': time.time()}
+        self._write_ref(key, entry)
+        return entry
+
+    def _evict(self, keep):
+        """
+        Remove the least recently used archives until the cache is
+        within its size limit
+        Input:
+            keep -- path of an archive which must not be removed
+        """
+        archives = []
+        for entry in os.scandir(self.objects_dir):
+            if entry.name.endswith('.zip'):
+                stat = entry.stat()
+                archives.append((stat.st_mtime, stat.st_size, entry.path))
+        total = sum(size for _, size, _ in archives)
+        for _, size, path in sorted(archives):
+            if total <= self.max_bytes:
+                break
+            if path == keep:
+                continue
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
@@ -1,63 +1,159 @@
-import os, re, urllib, shutil, tempfile, logging
+import os, re, shutil, hashlib
+from bisect import bisect_left
 from zipfile import ZipFile
 
+from .download_cache import DownloadCache
+from .lock_file import tree_hash
+
 class ExtensionLocation(object):
     """
-    Provides a temporary place on the filesystem where the
-    relevant extension files can be copied from during an import
+    Provides the files for an extension from the location given
+    in an extension spec, so they can be installed
 
-    Exposes methods and attributes to the 
+    Exposes methods and attributes to the
     ExtensionSpecificationLine object
-        install_from_dir -- path where extension files can be found
-        .remove_install_from_dir()  -- removes this temporary directory
-                                       when called
+        .prepare()  -- fetches the files so they are ready to install
+        .install_into(target_dir, link)  -- puts the extension files
+                                            into the target directory
+        .source_hash()  -- identifies the version of the files
+
+    Files on GitHub are extracted straight from the downloaded archive
+    into the target directory.  Files on the local filesystem are
+    copied, hard linked or symbolically linked from where they are
     """
+    link_modes = ('copy', 'hard', 'sym')
+
     def __init__(self, extension_location):
         self.extension_location = extension_location
-        self._install_from_dir = None
-        self.tmp_install_root = None
+        # set for github locations by prepare()
+        self._archive = None
+        self._archive_members = None
+
+    @property
+    def is_github(self):
+        return self.extension_location.startswith('github:')
+
+    @property
+    def local_path(self):
+        return os.path.expanduser(self.extension_location)
 
-    def remove_install_from_dir(self):
+    def prepare(self):
         """
-        Called at the end of the import process to clean up
+        Fetch the files for this location.  Called once per location
+        before any extensions are installed from it
         """
-        if self.tmp_install_root is not None:
-            shutil.rmtree(self.tmp_install_root)
-    
-    @property
-    def install_from_dir(self):
-        # returns a local directory containing the files
-        if self._install_from_dir is None:
-            self.tmp_install_root = tempfile.mkdtemp()
-            tmp_install_dir = os.path.join(self.tmp_install_root, 'files')
+        if self.is_github:
+            if self._archive is None:
+                self._archive, self._archive_members = self.get_files_from_github()
+        elif not os.path.exists(self.local_path):
+            raise ValueError('Invalid location of extension files: {}'\
+                            .format(self.local_path))
 
-            location = self.extension_location
-            location_type = 'local_directory'
-            
-            if location.startswith('github:'):
-                extension_files = self.get_files_from_github(self.tmp_install_root)
-            else:
-                # location is on the filesystem
-                extension_files = os.path.expanduser(location)
-                if os.path.exists(extension_files) and extension_files.endswith('.py'):
-                    location_type = 'single_py_file'
-                if not os.path.exists(extension_files):
-                    location_type = 'unsupported' 
-
-            if location_type == 'local_directory':
-                shutil.copytree(extension_files, tmp_install_dir) 
-            if location_type == 'single_py_file':
-                os.makedirs(tmp_install_dir)
-                shutil.copy(extension_files, tmp_install_dir)
-            if location_type == 'unsupported':
-                raise ValueError('Invalid location of extension files: {}'\
-                                .format(extension_files))
-
-            self._install_from_dir = tmp_install_dir
-
-        return self._install_from_dir
-
-    def get_files_from_github(self,temp_dir):
+    def install_into(self, target_dir, link='copy'):
+        """
+        Put the extension files into target_dir, which must
+        not already exist
+        Input:
+            target_dir -- directory to install into
+            link -- how files from a local location are installed:
+                        'copy' -- copy the files
+                        'hard' -- hard link the files, or copy them if
+                                  they are on a different filesystem
+                        'sym' -- symbolically link the files, so changes
+                                 to the originals are picked up
+                    GitHub files are always extracted from the archive
+        """
+        if link not in self.link_modes:
+            raise ValueError('link must be one of {}'.format(self.link_modes))
+        self.prepare()
+        if self.is_github:
+            self._extract_archive_members(target_dir)
+            return
+        
+        source = self.local_path
+        os.makedirs(target_dir)
+        if os.path.isfile(source):
+            self._install_file(source, 
+                               os.path.join(target_dir, os.path.basename(source)),
+                               link)
+            return
+        # linked sub directories are installed as well, as copytree
+        # did, except for a link back to a directory above it
+        for root, dirs, files in os.walk(source, followlinks=True):
+            if self._links_to_parent(source, root):
+                dirs[:] = []
+                continue
+            dirs[:] = [d for d in dirs if d != '__pycache__']
+            relative_root = os.path.relpath(root, source)
+            destination_root = os.path.normpath(os.path.join(target_dir, 
+                                                             relative_root))
+            os.makedirs(destination_root, exist_ok=True)
+            for file in files:
+                destination = os.path.join(destination_root, file)
+                # the top level __init__.py is regenerated during the
+                # install, so must never be a link to the original
+                if relative_root == os.curdir and file == '__init__.py':
+                    file_link = 'copy'
+                else:
+                    file_link = link
+                self._install_file(os.path.join(root, file), destination,
+                                   file_link)
+
+    @staticmethod
+    def _links_to_parent(source, directory):
+        """
+        True if directory, below source, is the same directory as
+        one of the directories above it, so walking it would loop
+        """
+        real = os.path.realpath(directory)
+        parent = directory
+        while parent != source:
+            parent = os.path.dirname(parent)
+            if os.path.realpath(parent) == real:
+                return True
+        return False
+
+    @staticmethod
+    def _install_file(source, destination, link):
+        if link == 'hard':
+            try:
+                os.link(source, destination)
+                return
+            except OSError:
+                # different filesystem or links not supported
+                pass
+        if link == 'sym':
+            os.symlink(os.path.abspath(source), destination)
+            return
+        shutil.copy2(source, destination)
+
+    def source_hash(self):
+        """
+        Returns the commit sha of a GitHub location (from the comment
+        GitHub adds to its archives) or, failing that, a hash of the
+        files at the location
+        """
+        self.prepare()
+        if not self.is_github:
+            return tree_hash(self.local_path)
+        with ZipFile(self._archive) as zip:
+            comment = zip.comment.decode('utf-8', 'replace').strip()
+        if re.match('^[0-9a-f]{40}$', comment):
+            return comment
+        # the checksum of each file is recorded in the archive, so
+        # they don't need to be extracted
+        tree = hashlib.sha1()
+        for member, relative_path in self._archive_members:
+            tree.update('{}\0{:08x}\0{}\n'.format(relative_path, member.CRC,
+                                                  member.file_size).encode('utf-8'))
+        return tree.hexdigest()
+
+    def get_files_from_github(self):
+        """
+        Returns the path of the downloaded archive and a list of
+        the archive members under the requested directory, each
+        paired with its path relative to that directory
+        """
         # location format: github:username/repo[@branch/tag][/path/to/directory]
         try:
             location = self.extension_location
@@ -65,11 +161,7 @@ class ExtensionLocation(object):
                                             location).groups()
         except AttributeError:
             raise ValueError('Unable to parse github location: {}'.format(location))
-        
-        github_root = os.path.join(temp_dir, 'github')
-        os.makedirs(github_root)
-        zip_file = os.path.join(github_root, 'download.zip')
-        extract_dir = os.path.join(github_root, 'extract')
+
         repo = repo.split('@')
         if len(repo)==1:
             repo = repo[0]
@@ -78,17 +170,53 @@ class ExtensionLocation(object):
             branch = repo[1]
             repo = repo[0]
 
-        # bug #75 from windows user - this path needs to be in
-        # unix form in order for ZipFile to extract properly
-        path = '{repo}-{branch}'.format(repo=repo, branch=branch) +'/' + path[1:]
-        url='https://github.com/{username}/{repo}/archive/{branch}.zip'\
-                .format(username=username, repo=repo, branch=branch)
-        urllib.request.urlretrieve(url, zip_file)
-        logging.info('Extension repo {username}/{repo} downloaded from {url}'\
-                .format(username=username, repo=repo, url=url))
+        # the archive is shared with any other locations in the same
+        # repo and only downloaded if not already cached
+        zip_file = DownloadCache().github_archive(username, repo, branch)
 
         with ZipFile(zip_file) as zip:
-            for f in zip.namelist():
-                if path in f:
-                    zip.extract(f, extract_dir)
-        return os.path.join(extract_dir, path)
\ No newline at end of file
+            members = sorted(zip.infolist(), key=lambda m: m.filename)
+        if not members:
+            raise ValueError('Archive for {} is empty'.format(location))
+
+        # bug #75 from windows user - this path needs to be in
+        # unix form in order for ZipFile to extract properly.
+        # Everything in a GitHub archive is under a single top level
+        # directory, whose name depends on the branch or tag
+        root = members[0].filename.split('/')[0]
+        path = '/'.join([root] + [p for p in path.split('/') if p])
+
+        # Member names are sorted, so all the members under the
+        # directory are found together without scanning the archive
+        names = [m.filename for m in members]
+        selected = []
+        for i in range(bisect_left(names, path), len(members)):
+            name = names[i]
+            if not name.startswith(path):
+                break
+            if name == path:
+                # a single file rather than a directory
+                selected.append((members[i], os.path.basename(name)))
+            elif name[len(path)] == '/' and not name.endswith('/'):
+                selected.append((members[i], name[len(path)+1:]))
+        if not selected:
+            raise ValueError('Invalid location of extension files: {}'\
+                                .format(location))
+        return zip_file, selected
+
+    def _extract_archive_members(self, target_dir):
+        """
+        Stream the selected archive members into the target directory
+        """
+        os.makedirs(target_dir)
+        with ZipFile(self._archive) as zip:
+            for member, relative_path in self._archive_members:
+                parts = relative_path.split('/')
+                if '..' in parts or os.path.isabs(relative_path):
+                    raise ValueError('Unsafe path in archive: {}'\
+                                        .format(member.filename))
+                destination = os.path.join(target_dir, *parts)
+                os.makedirs(os.path.dirname(destination), exist_ok=True)
+                with zip.open(member) as source, \
+                     open(destination, 'wb') as f:
+                    shutil.copyfileobj(source, f, 1024 * 1024)
@@ -1,7 +1,15 @@
 import os, sys
+from itertools import count
 
 from ..symbols import __default_collection__
 from ..extensions import Extension
+from .repository_index import RepositoryIndex
+from .repository_lock import RepositoryLock
+
+# Generation numbers are unique across all repository instances so
+# that callables resolved against one repository are never mistaken
+# for those of another
+_generations = count(1)
 
 
 class extension_management_mixin(object):
@@ -16,30 +24,113 @@ class extension_management_mixin(object):
             self.extension_collections[collection_name][extension_name]=Extension
         """
         self._read_config_file()
+        # Read the collections in each repository from its index
+        # rather than walking the directories
+        indexes = [RepositoryIndex(path).collections \
+                        for path in self._search_path]
+
         # Get all collection names from all the repositories
         # and initialise
         ext = {__default_collection__: {}}
-        for path in self._search_path:
-            for collection in next(os.walk(path))[1]:
+        for collections in indexes:
+            for collection in collections:
                 ext[collection] = {}
         
         # find the first occurence of each extension on the
         # search path of each collection
         for collection in ext:
-            for path in self._search_path:
-                extensions = os.path.join(path, collection)
-                try:
-                    for extension in next(os.walk(extensions))[1]:
-                        if extension not in ext[collection]:
-                            extension_location = os.path.join(extensions,
-                                                              extension)
-                            ext[collection][extension] = \
-                                Extension(extension_location)
-                except StopIteration:
-                    # If there are no extensions in the collection,
-                    # carry on
-                    continue
+            for path, collections in zip(self._search_path, indexes):
+                for extension, entry in collections.get(collection, {}).items():
+                    if extension not in ext[collection]:
+                        extension_location = os.path.join(path, collection,
+                                                          extension)
+                        ext[collection][extension] = \
+                            Extension(extension_location, entry['init_values'])
         self.extension_collections = ext  
+        self._invalidate_extension_cache()
+
+    def _update_repository_index(self, ext):
+        """
+        Record a change to an installed extension in the index of
+        the repository it is installed in
+        Input:
+            ext -- the Extension instance which has changed
+        """
+        collection_path, name = os.path.split(ext.ext_info.path)
+        repository_path, collection = os.path.split(collection_path)
+        RepositoryIndex(repository_path).update_extension(collection, name)
+
+    def _repository_lock(self, ext):
+        """
+        Returns the lock on the repository the extension is
+        installed in, to be held while it is changed
+        """
+        return RepositoryLock(os.path.dirname(os.path.dirname(ext.ext_info.path)))
+
+    def _invalidate_extension_cache(self):
+        """
+        Discard every resolved extension callable.  Called whenever
+        extensions are installed, removed, enabled or disabled so that
+        the next call through the dataframe namespace picks up the change
+        """
+        self._generation = next(_generations)
+        self._resolved_extensions = {}
+
+    def _resolve_extension(self, collection, name):
+        """
+        Returns the extension function and its enabled flag, using the
+        resolved extension cache where possible so that repeated calls
+        don't re-import the module or re-inspect the function signature
+        Input:
+            collection -- collection name
+            name -- extension name
+        Output:
+            tuple of (extension function, enabled)
+        A KeyError is raised if the extension doesn't exist
+        """
+        key = (collection, name, self._generation)
+        resolved = self._resolved_extensions.get(key)
+        if resolved is None:
+            ext = self.extension_collections[collection][name]
+            resolved = (ext.get_extension(), ext.enabled)
+            self._resolved_extensions[key] = resolved
+        return resolved
+
+    def _extension_identity(self, collection, name):
+        """
+        Returns the name of the repository that the extension is
+        installed in, and the hash of its install.  These identify
+        the extension when it is pickled, so that the same install
+        is found when it is unpickled in another process
+        A KeyError is raised if the extension doesn't exist
+        """
+        ext = self.extension_collections[collection][name]
+        repository_path = os.path.dirname(os.path.dirname(ext.ext_info.path))
+        names = [n for n in self._search_order \
+                    if self._repository_path(n) == repository_path]
+        return (names[0] if names else None), ext.ext_info.install_hash
+
+    # Call statistics, in-memory and on disk caches of extension
+    # results, and the profiler, set up by instrument(), memoize(),
+    # persist() and profile()
+    _call_stats = None
+    _result_cache = None
+    _result_store = None
+    _call_profiler = None
+
+    def _call_wrappers(self, collection, name):
+        """
+        Returns the functions which each call of an extension is
+        made through, outermost first.  The extension cache must be
+        invalidated when these change, so that the extension is
+        bound again with the new ones
+        """
+        wrappers = []
+        for wrapper in (self._call_stats, self._result_cache, 
+                        self._result_store, self._call_profiler):
+            if wrapper is not None and wrapper.applies_to(collection, name):
+                wrappers.append(wrapper.wrap_call)
+        return wrappers
 
     def _get_extension_from_collection(self, name):
         collection, name=self._parse_extension_name(name)
@@ -1,8 +1,10 @@
-import os, shutil
+import os, time, shutil
+from concurrent.futures import ThreadPoolExecutor
 
 from ..extensions import Extension
 from ..symbols import __import_file_sep__, __import_file_line_spec__
 from .extension_location import ExtensionLocation
+from .repository_lock import RepositoryLock
 # This is a bit messy, but the parse function is embedded into 
 # the repository class, so just extract this function out
 from .extension_management import extension_management_mixin
@@ -15,9 +17,7 @@ class ExtensionSpecification(object):
 
         .get_lines()  -- returns an ExtensionSpecificationLine() instance
                          for each valid line of the spec
-        .import_completed() -- signals the end of the import process
-                               so that temporary install directorys can
-                               be deleted
+        .install(lines)  -- installs a number of lines concurrently
     """
     def __init__(self, spec, repo):
         """
@@ -41,21 +41,60 @@ class ExtensionSpecification(object):
         for line in self.lines:
             yield line
 
-    def import_completed(self):
-        for line in self.extension_locations.values():
-            line.remove_install_from_dir()
-    
+    def install(self, lines, workers=None, link='copy'):
+        """
+        Installs the lines using a pool of threads.  The files for 
+        each distinct location are fetched once (downloaded from 
+        GitHub or checked on the filesystem), then each extension is
+        installed from them.  
+        
+        A failure doesn't stop the other lines being installed - the
+        outcome is recorded against each line instead
+        Input:
+            lines -- list of ExtensionSpecificationLine instances
+            workers -- maximum number of threads to use (the 
+                       ThreadPoolExecutor default if None)
+            link -- how files from local locations are installed
+                    (see ExtensionLocation.install_into)
+        """
+        locations = {}
+        for line in lines:
+            locations.setdefault(line.extension_location.extension_location,
+                                 line.extension_location)
+        with ThreadPoolExecutor(workers) as pool:
+            fetched = dict(zip(locations, 
+                               pool.map(self._fetch, locations.values())))
+            def install(line):
+                seconds, error = fetched[line.extension_location.extension_location]
+                line.seconds += seconds
+                if error is not None:
+                    line.failed(error)
+                    return
+                try:
+                    line.install(link)
+                except Exception as e:
+                    line.failed(e)
+            list(pool.map(install, lines))
+
+    @staticmethod
+    def _fetch(extension_location):
+        """
+        Makes the files for a location available locally and returns
+        the time taken and any error raised
+        """
+        start = time.perf_counter()
+        try:
+            extension_location.prepare()
+            error = None
+        except Exception as e:
+            error = e
+        return time.perf_counter() - start, error
+
     def _parse_extension_spec(self):
-        lines = self.spec.splitlines()
-        # remove comments and return only lines with two arguments
-        lines = [l for l in lines if not l.startswith('#')]
-        lines = [l.split(__import_file_sep__)\
-                     for l in lines if len(l.split(__import_file_sep__))==2]
         self.lines = []
-        for line in lines:
+        for loc, name in parse_spec_lines(self.spec):
             # Get or create the ExtensionLocation object from the first
             # item in the line
-            loc = line[0].strip()
             if loc in self.extension_locations:
                 extension_location = self.extension_locations[loc]
             else:
@@ -63,7 +102,6 @@ class ExtensionSpecification(object):
                 self.extension_locations[loc] = extension_location 
             
             # Create the Extension object from the second item in the line
-            name = line[1].strip()
             collection, ext_name=_parse_extension_name(name)
             extension_path = os.path.join(self.repo,collection,ext_name)
             extension = Extension(extension_path)
@@ -73,6 +111,19 @@ class ExtensionSpecification(object):
             # Save the spec as extension_info
             extension.ext_info.install_location = __import_file_line_spec__.format(loc,name)
 
+def parse_spec_lines(spec):
+    """
+    Returns a (location, name) tuple for each line of an extension
+    spec, leaving out comments and lines which aren't of the form
+    location -> name
+    """
+    lines = spec.splitlines()
+    # remove comments and return only lines with two arguments
+    lines = [l for l in lines if not l.startswith('#')]
+    lines = [l.split(__import_file_sep__)\
+                 for l in lines if len(l.split(__import_file_sep__))==2]
+    return [(loc.strip(), name.strip()) for loc, name in lines]
+
 class ExtensionSpecificationLine(object):
     """
     Exposes methods and attributes to the 
@@ -82,6 +133,9 @@ class ExtensionSpecificationLine(object):
         .ext_name -- name of extension
         .collection -- name of collection
         .ext_spec -- original spec entered by user
+        .status -- outcome of the import for this line
+        .error -- exception raised if the line couldn't be imported
+        .seconds -- time spent installing this line
     """
     def __init__(self, extension_location, extension):
         """
@@ -92,6 +146,9 @@ class ExtensionSpecificationLine(object):
         """
         self.extension_location = extension_location
         self.extension = extension
+        self.status = None
+        self.error = None
+        self.seconds = 0.0
 
     @property
     def ext_name(self):
@@ -104,17 +161,62 @@ class ExtensionSpecificationLine(object):
     @property
     def ext_spec(self):
         return self.extension.ext_info.install_location
+
+    @property
+    def repository_path(self):
+        return os.path.dirname(os.path.dirname(self.extension.ext_info.path))
     
-    def install(self):
-        # remove any old extension files and copy new ones in
-        self.extension.remove_module_path()
-        extension_files = self.extension_location.install_from_dir
-        shutil.copytree(extension_files, self.extension.ext_info.module_path)
+    def install(self, link='copy'):
+        start = time.perf_counter()
         try:
-            self.extension.find_extension_file()
-            # setting the enabled property causes the __init__.py
-            # to be created
-            self.extension.enabled=True
-        except:
-            self.extension.remove_module_path()
-            raise
\ No newline at end of file
+            # the new files are put in a directory of their own, which
+            # then replaces any old ones in one step, holding the
+            # repository lock so that other installers wait
+            staged = self.extension.stage(self.extension_location, link)
+            try:
+                with RepositoryLock(self.repository_path):
+                    self.extension.swap_in(staged)
+            except:
+                shutil.rmtree(staged, ignore_errors=True)
+                raise
+            self.status = 'installed'
+        finally:
+            self.seconds += time.perf_counter() - start
+
+    def failed(self, error):
+        self.status = 'failed'
+        self.error = error
+
+
+class ImportReport(object):
+    """
+    Summary of an ExtensionRepository.import_extension() call
+    with the outcome of each line and the total time taken
+    """
+    def __init__(self, lines, seconds):
+        """
+        Input:
+            lines -- the ExtensionSpecificationLine instances
+            seconds -- end to end time of the import
+        """
+        self.lines = [{'extension': line.ext_spec,
+                       'status': line.status,
+                       'error': line.error,
+                       'seconds': line.seconds} for line in lines]
+        self.seconds = seconds
+
+    @property
+    def failed(self):
+        return [line for line in self.lines if line['status'] == 'failed']
+
+    def __str__(self):
+        report = ''
+        for line in self.lines:
+            report += '{:<18} {:8.3f}s  {}\n'.format(line['status'],
+                                                    line['seconds'],
+                                                    line['extension'])
+            if line['error'] is not None:
+                report += '{:<29}{}\n'.format('', line['error'])
+        report += '{} lines imported in {:.3f}s'.format(len(self.lines),
+                                                       self.seconds)
+        return report
\ No newline at end of file
@@ -0,0 +1,28 @@
+"""
+Files which are written to a temporary file and renamed into place
+are made with tempfile.mkstemp(), which only lets the owner read
+them.  Files which are shared with other users, such as the index of
+a repository or the output of a pipeline, are given the mode that
+open() would have given them instead
+"""
+import os
+
+def default_file_mode():
+    """
+    Returns the mode of a new file allowed by the umask of the process
+    """
+    return 0o666 & ~_umask()
+
+def _umask():
+    # the umask can be read without changing it on linux, which
+    # matters as another thread could create a file in the meantime
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('Umask:'):
+                    return int(line.split()[1], 8)
+    except (OSError, ValueError):
+        pass
+    umask = os.umask(0o022)
+    os.umask(umask)
+    return umask
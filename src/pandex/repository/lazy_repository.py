@@ -0,0 +1,38 @@
+from ..symbols import __pd_ext__
+
+class LazyExtensionRepository(object):
+    """
+    Stands in for the ExtensionRepository at the pandas level when
+    lazy loading is switched on.  Reading the config file and the 
+    repository indexes is deferred until an attribute is first
+    accessed, at which point the real repository is created and
+    replaces this object in the pandas namespace.
+
+    Any references already held to this object keep working by
+    passing attribute access through to the real repository.
+    """
+    def __init__(self):
+        object.__setattr__(self, '_repository', None)
+
+    def _load(self):
+        if self._repository is None:
+            import pandas as pd
+            from . import ExtensionRepository
+            repository = ExtensionRepository()
+            object.__setattr__(self, '_repository', repository)
+            setattr(pd, __pd_ext__, repository)
+        return self._repository
+
+    def __getattr__(self, name):
+        return getattr(self._load(), name)
+
+    def __setattr__(self, name, value):
+        setattr(self._load(), name, value)
+
+    def __dir__(self):
+        return dir(self._load())
+
+    def __repr__(self):
+        if self._repository is None:
+            return '<{} (not yet loaded)>'.format(type(self).__name__)
+        return repr(self._repository)
@@ -0,0 +1,131 @@
+import os, json, hashlib, tempfile
+
+from ..symbols import __lock_file_version__
+from .file_mode import default_file_mode
+
+class LockFile(object):
+    """
+    Records exactly what was installed for each line of an extension
+    spec, so that the installs can be checked quickly and repeated:
+
+        {'version': 1,
+         'spec': <hash of the spec>,
+         'repository': <name of the repository installed into>,
+         'state': <hash of the spec, repository and each install>,
+         'lines': [{'extension': 'location -> name',
+                    'source': <GitHub commit sha, or hash of the files
+                               at the location when it was installed>,
+                    'module': <hash of the installed files>,
+                    'install_time': <install timestamp>}]}
+
+    The state hash can be compared with the installs recorded in the
+    repository, without reading any extension files, to tell whether
+    anything has changed since the lock file was written
+    """
+    def __init__(self, path):
+        """
+        Reads the lock file if it exists
+        Input:
+            path -- the lock file
+        """
+        self.path = path
+        self.spec = None
+        self.repository = None
+        self.state = None
+        # extension spec line -> line entry
+        self.lines = {}
+        try:
+            with open(path) as f:
+                lock = json.load(f)
+        except (FileNotFoundError, ValueError):
+            return
+        if lock.get('version') != __lock_file_version__:
+            return
+        self.spec = lock['spec']
+        self.repository = lock['repository']
+        self.state = lock['state']
+        self.lines = {line['extension']: line for line in lock['lines']}
+
+    def matches(self, spec, repository, installs):
+        """
+        True if nothing has changed since the lock file was written
+        Input:
+            spec -- the extension spec
+            repository -- name of the repository installed into
+            installs -- dictionary of the install time of each line
+                        of the spec (None if it isn't installed)
+        """
+        return self.state is not None and \
+                    self.state == install_state(spec, repository, installs)
+
+    def write(self, spec, repository, installs):
+        """
+        Writes the lock file for the lines in installs, which must all
+        have an entry in lines
+        """
+        lock = {'version': __lock_file_version__,
+                'spec': spec_hash(spec),
+                'repository': repository,
+                'state': install_state(spec, repository, installs),
+                'lines': [self.lines[line] for line in installs]}
+        # write to a temporary file and rename so that a reader
+        # never sees a partially written lock file
+        directory = os.path.dirname(os.path.abspath(self.path))
+        fd, tmp_file = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w') as f:
+                # shared with the project, like the spec next to it
+                os.chmod(tmp_file, default_file_mode())
+                json.dump(lock, f, indent=2)
+            os.replace(tmp_file, self.path)
+        except OSError:
+            if os.path.exists(tmp_file):
+                os.remove(tmp_file)
+            raise
+        self.spec = lock['spec']
+        self.repository = repository
+        self.state = lock['state']
+
+
+def spec_hash(spec):
+    return hashlib.sha1(spec.encode('utf-8')).hexdigest()
+
+def install_state(spec, repository, installs):
+    """
+    Returns a hash of the spec, the repository and the install time
+    of each line of the spec
+    """
+    state = hashlib.sha1(spec_hash(spec).encode('utf-8'))
+    state.update(str(repository).encode('utf-8'))
+    for line, install_time in installs.items():
+        state.update('\0{}\0{}'.format(line, install_time).encode('utf-8'))
+    return state.hexdigest()
+
+def tree_hash(path):
+    """
+    Returns a hash of the names and contents of the python files and
+    any other files at path, which is either a single file or a
+    directory.  The __init__.py at the top of a directory is left
+    out, as it is replaced when an extension is installed, so the
+    hash of a local location is the same as that of the module
+    installed from it
+    """
+    files = []
+    if os.path.isfile(path):
+        files.append((os.path.basename(path), path))
+    else:
+        for root, dirs, names in os.walk(path):
+            dirs[:] = sorted(d for d in dirs if d != '__pycache__')
+            relative_root = os.path.relpath(root, path)
+            for name in sorted(names):
+                if relative_root == os.curdir and name == '__init__.py':
+                    continue
+                relative = os.path.normpath(os.path.join(relative_root, name))
+                files.append((relative.replace(os.sep, '/'),
+                              os.path.join(root, name)))
+    tree = hashlib.sha1()
+    for name, file in files:
+        with open(file, 'rb') as f:
+            content = hashlib.sha1(f.read()).hexdigest()
+        tree.update('{}\0{}\n'.format(name, content).encode('utf-8'))
+    return tree.hexdigest()
@@ -0,0 +1,212 @@
+import os, json, time, errno, tempfile
+
+from ..symbols import __repository_index__, __repository_index_version__
+from ..extensions.extension_info import ExtensionInfo
+from .repository_lock import RepositoryLock
+from .file_mode import default_file_mode
+
+class RepositoryIndex(object):
+    """
+    Keeps a record of the collections and extensions installed in
+    a repository in a single file in a hidden directory of the
+    repository:
+
+        /path/to/repository/.pdext_index/index.json
+
+    This saves walking every directory in the repository each time
+    the extension collections are built.  The index stores the
+    modification time of the repository and collection directories
+    when it was written, and is rebuilt from the filesystem if any
+    of them have changed since.
+
+    Structure of the index file:
+
+        {'version': 1,
+         'path': '/path/to/repository',
+         'written': <time index was written>,
+         'mtimes': {'': <repository directory mtime>,
+                    'collection': <collection directory mtime>},
+         'collections': {'collection': {'extension': {entry}}}}
+
+    where an entry holds the module name and the init_values of the
+    extension (if it is fully installed)
+    """
+    # Directory modification times closer than this to the time the
+    # index was written can't be relied on, as a coarse grained
+    # filesystem clock might not register a later change
+    racy_seconds = 2
+
+    def __init__(self, path):
+        """
+        Input:
+            path -- the repository directory
+        """
+        self.path = path
+        self.index_file = os.path.join(path, __repository_index__)
+
+    @property
+    def collections(self):
+        """
+        Returns a dictionary of the form:
+            {collection_name: {extension_name: entry}}
+        reading it from the index file if it is still valid
+        """
+        index = self._read()
+        if index is None or not self._is_valid(index):
+            # scanned without the lock, so readers don't wait for
+            # installers, and only written if nobody else is writing
+            mtimes, collections = self._scan()
+            try:
+                with RepositoryLock(self.path, blocking=False):
+                    self._write(collections, mtimes)
+            except BlockingIOError:
+                pass
+            except OSError as e:
+                # a shared repository may be read only for this user,
+                # in which case the directories are scanned every time
+                if e.errno not in _read_only_errors:
+                    raise
+            return collections
+        return index['collections']
+
+    def rebuild(self):
+        """
+        Walk the repository directory and write a new index
+        """
+        with RepositoryLock(self.path):
+            return self._write(self._scan()[1])
+
+    def _scan(self):
+        """
+        Returns the modification times of the directories, taken
+        before each is scanned so that a change made during the scan
+        makes the index out of date, and the collections found
+        """
+        try:
+            # made first, as this changes the repository mtime
+            os.makedirs(os.path.dirname(self.index_file), exist_ok=True)
+        except OSError as e:
+            if e.errno not in _read_only_errors:
+                raise
+        mtimes = {'': self._mtime(self.path)}
+        collections = {}
+        for collection in self._subdirectories(self.path):
+            mtimes[collection] = self._mtime(os.path.join(self.path, collection))
+            collections[collection] = self._scan_collection(collection)
+        return mtimes, collections
+
+    def update_extension(self, collection, name):
+        """
+        Refresh the entry for a single extension after it has been
+        installed, removed, enabled or disabled.  The index is read
+        and written holding the repository lock, so that a change
+        made by another process at the same time isn't lost
+        """
+        with RepositoryLock(self.path):
+            return self._update_extension(collection, name)
+
+    def _update_extension(self, collection, name):
+        index = self._read()
+        if index is None or not self._is_valid(index, ignore=collection):
+            return self.rebuild()
+        collections = index['collections']
+        collection_path = os.path.join(self.path, collection)
+        if not os.path.isdir(collection_path):
+            collections.pop(collection, None)
+        else:
+            extensions = collections.setdefault(collection, {})
+            if os.path.isdir(os.path.join(collection_path, name)):
+                extensions[name] = self._entry(collection, name)
+            else:
+                extensions.pop(name, None)
+        return self._write(collections)
+
+    def _read(self):
+        try:
+            with open(self.index_file) as f:
+                index = json.load(f)
+        except (FileNotFoundError, PermissionError, ValueError):
+            return None
+        if index.get('version') != __repository_index_version__ or \
+                index.get('path') != self.path:
+            return None
+        return index
+
+    def _is_valid(self, index, ignore=None):
+        """
+        The index is valid if none of the directories have been
+        modified since it was written
+        Input:
+            index -- the parsed index file
+            ignore -- a collection name whose modification time
+                      should not be checked
+        """
+        racy = index['written'] - self.racy_seconds
+        for collection, mtime in index['mtimes'].items():
+            if collection == ignore:
+                continue
+            if mtime is None or mtime >= racy or \
+                    mtime != self._mtime(os.path.join(self.path, collection)):
+                return False
+        return True
+
+    def _write(self, collections, mtimes=None):
+        # create the index directory first as this changes the
+        # modification time of the repository directory
+        index_dir = os.path.dirname(self.index_file)
+        os.makedirs(index_dir, exist_ok=True)
+        if mtimes is None:
+            mtimes = {c: self._mtime(os.path.join(self.path, c)) \
+                            for c in collections}
+            mtimes[''] = self._mtime(self.path)
+        index = {'version': __repository_index_version__,
+                 'path': self.path,
+                 'written': time.time(),
+                 'mtimes': mtimes,
+                 'collections': collections}
+        # write to a temporary file and rename so that a reader
+        # never sees a partially written index
+        fd, tmp_file = tempfile.mkstemp(dir=index_dir, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w') as f:
+                # readable by the other users of a shared repository
+                os.chmod(tmp_file, default_file_mode())
+                json.dump(index, f)
+            os.replace(tmp_file, self.index_file)
+        except OSError:
+            if os.path.exists(tmp_file):
+                os.remove(tmp_file)
+            raise
+        return index
+
+    def _scan_collection(self, collection):
+        collection_path = os.path.join(self.path, collection)
+        return {e: self._entry(collection, e) \
+                    for e in self._subdirectories(collection_path)}
+
+    def _entry(self, collection, name):
+        ext_info = ExtensionInfo(os.path.join(self.path, collection, name))
+        return {'module': ext_info.module,
+                'init_values': ext_info.read_init_values()}
+
+    @staticmethod
+    def _subdirectories(path):
+        # hidden directories (such as the one holding the index)
+        # are not collections or extensions
+        try:
+            return [d for d in next(os.walk(path))[1] \
+                        if not d.startswith('.')]
+        except StopIteration:
+            return []
+
+    @staticmethod
+    def _mtime(path):
+        try:
+            return os.stat(path).st_mtime
+        except FileNotFoundError:
+            return None
+
+
+# errors writing the index which mean that this user can only read
+# the repository
+_read_only_errors = (errno.EACCES, errno.EPERM, errno.EROFS)
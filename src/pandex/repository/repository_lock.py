@@ -0,0 +1,79 @@
+import os, errno, threading
+try:
+    import fcntl
+except ImportError:
+    # not available on Windows, where writers in different processes
+    # aren't locked against each other
+    fcntl = None
+
+from ..symbols import __repository_lock__
+
+class RepositoryLock(object):
+    """
+    An advisory lock on a repository, which is held while extensions
+    are installed, removed, enabled or disabled and while the index
+    is written, so that processes sharing a repository don't change
+    it at the same time:
+
+        with RepositoryLock('/path/to/repository'):
+            ...
+
+    Only writers take the lock.  Readers never wait for it, as every
+    change they can see is made by renaming a complete file or
+    directory into place.  A reader which finds the index out of date
+    only writes a new one if it can take the lock without waiting.
+
+    The lock is re-entrant within a process, so a writer can call
+    another which takes the same lock.  Threads in the same process
+    wait for each other as well as for other processes
+    """
+    # lock file path -> [thread lock, open lock file, depth]
+    _held = {}
+    _held_lock = threading.Lock()
+
+    def __init__(self, repository_path, blocking=True):
+        """
+        Input:
+            repository_path -- the repository directory
+            blocking -- if False, BlockingIOError is raised instead of
+                        waiting when the lock is held by someone else
+        """
+        self.lock_file = os.path.join(repository_path, __repository_lock__)
+        self.blocking = blocking
+
+    def __enter__(self):
+        with self._held_lock:
+            held = self._held.setdefault(self.lock_file,
+                                         [threading.RLock(), None, 0])
+        if not held[0].acquire(self.blocking):
+            raise BlockingIOError(errno.EWOULDBLOCK,
+                                  'repository is locked', self.lock_file)
+        try:
+            if held[2] == 0:
+                os.makedirs(os.path.dirname(self.lock_file), exist_ok=True)
+                f = open(self.lock_file, 'a')
+                if fcntl is not None:
+                    operation = fcntl.LOCK_EX
+                    if not self.blocking:
+                        operation |= fcntl.LOCK_NB
+                    try:
+                        fcntl.flock(f.fileno(), operation)
+                    except BaseException:
+                        f.close()
+                        raise
+                held[1] = f
+            held[2] += 1
+        except BaseException:
+            held[0].release()
+            raise
+        return self
+
+    def __exit__(self, *exc_info):
+        held = self._held[self.lock_file]
+        held[2] -= 1
+        if held[2] == 0:
+            f, held[1] = held[1], None
+            if fcntl is not None:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+            f.close()
+        held[0].release()
@@ -0,0 +1,156 @@
+import sys, threading
+from collections import OrderedDict
+
+import pandas as pd
+
+from .call_wrapper import ExtensionCallWrapper, frame_hash, arguments_hash, \
+                          unhashable_errors
+
+class ResultCache(ExtensionCallWrapper):
+    """
+    An in-memory cache of the results of extension calls, so that a
+    pure extension called again with the same dataframe and arguments
+    returns the earlier result without running.
+
+    Results are keyed by:
+        - the extension (collection and name)
+        - the hash of the install of the extension
+        - a hash of the content of the dataframe
+        - a hash of the other arguments
+
+    The least recently used results are evicted when there are more
+    than max_entries of them, or they take up more than max_bytes.
+    The results of an extension are discarded when it is reinstalled
+    or reloaded, which is noticed when the function being called
+    changes.
+
+    Only results other than None are cached, since an extension which
+    returns None changes the dataframe it is given instead.  Calls
+    whose dataframe or arguments can't be hashed are passed straight
+    through to the extension.
+    """
+    def __init__(self, max_entries=1024, max_bytes=256 * 1024 * 1024,
+                 sample_rows=None):
+        """
+        Input:
+            max_entries -- maximum number of results to keep
+            max_bytes -- maximum total size of the results to keep
+            sample_rows -- if set, only this many rows (evenly spaced)
+                           of a larger dataframe are hashed, along with
+                           its shape, columns and dtypes.  This is much
+                           faster for big dataframes, but a change to
+                           a row that isn't sampled won't be noticed
+        """
+        super().__init__()
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.sample_rows = sample_rows
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.uncacheable = 0
+        self.bytes = 0
+
+    def wrap_call(self, bound, call, args, kwargs):
+        """
+        Returns the cached result of the call if there is one,
+        otherwise makes the call and caches its result
+        Input:
+            bound -- the BoundExtension being called
+            call -- function which calls the extension, passed the
+                    args and kwargs
+        """
+        key = self._key(bound, args, kwargs)
+        if key is None:
+            with self._lock:
+                self.uncacheable += 1
+            return call(args, kwargs)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._copy(entry[0])
+            self.misses += 1
+        result = call(args, kwargs)
+        if result is not None:
+            self._store(key, self._copy(result))
+        return result
+
+    def clear(self, collection=None, name=None):
+        """
+        Discard the cached results of an extension, all the
+        extensions in a collection (name None), or everything
+        """
+        with self._lock:
+            for key in list(self._entries):
+                if collection is None or (key[0] == collection and \
+                                          name in (None, key[1])):
+                    self._discard(key)
+
+    def info(self):
+        with self._lock:
+            return {'hits': self.hits,
+                    'misses': self.misses,
+                    'uncacheable': self.uncacheable,
+                    'entries': len(self._entries),
+                    'bytes': self.bytes,
+                    'max_entries': self.max_entries,
+                    'max_bytes': self.max_bytes}
+
+    def _key(self, bound, args, kwargs):
+        install_hash = self._install_hash(bound)
+        try:
+            return (bound._collection, bound.name, install_hash,
+                    frame_hash(bound.df, self.sample_rows),
+                    arguments_hash(args, kwargs))
+        except unhashable_errors:
+            return None
+
+    def _extension_changed(self, collection, name):
+        # the cached results are from an earlier install
+        self.clear(collection, name)
+
+    def _store(self, key, result):
+        nbytes = result_bytes(result)
+        if nbytes > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._discard(key)
+            self._entries[key] = (result, nbytes)
+            self.bytes += nbytes
+            self._evict()
+
+    def set_limits(self, max_entries, max_bytes):
+        with self._lock:
+            self.max_entries = max_entries
+            self.max_bytes = max_bytes
+            self._evict()
+
+    def _evict(self):
+        # the least recently used entry is the first one
+        while len(self._entries) > self.max_entries or \
+                self.bytes > self.max_bytes:
+            self._discard(next(iter(self._entries)))
+
+    def _discard(self, key):
+        _, nbytes = self._entries.pop(key)
+        self.bytes -= nbytes
+
+    @staticmethod
+    def _copy(result):
+        # a shallow copy, so that changes made to the result by the
+        # caller don't change the cached one (with copy on write)
+        if isinstance(result, (pd.DataFrame, pd.Series)):
+            return result.copy(deep=False)
+        return result
+
+
+def result_bytes(result):
+    if isinstance(result, pd.DataFrame):
+        return int(result.memory_usage(index=True, deep=False).sum())
+    if isinstance(result, pd.Series):
+        return int(result.memory_usage(index=True, deep=False))
+    return sys.getsizeof(result)
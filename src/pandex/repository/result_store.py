@@ -0,0 +1,347 @@
+import os, uuid, json, shutil, hashlib, threading
+
+import numpy as np
+import pandas as pd
+
+from .call_wrapper import ExtensionCallWrapper, frame_hash, arguments_hash, \
+                          unhashable_errors
+from .lock_file import tree_hash
+
+# types of the values which are saved in meta.json
+json_types = (str, int, float, bool, type(None))
+
+class ResultStore(ExtensionCallWrapper):
+    """
+    A cache of the results of extension calls on disk, so that the
+    results are reused by other processes and later sessions.
+
+    Each result is stored in its own directory:
+
+        <location>/<collection>/<extension>/<install>/<call hash>/
+                                                    meta.json
+                                                    0.npy
+                                                    3.npy
+                                                    ...
+
+    where the install is made from the install hash of the extension
+    and a hash of its files (which can change without it being
+    installed again if they are linked to the originals), and the call
+    hash is made from the content of the dataframe and the other
+    arguments.  Columns of a dataframe or series result with a plain
+    numpy dtype are saved as .npy files, and are memory mapped when
+    they are loaded, so a large result costs nothing until it is used.
+    Everything else (the index, the column labels and any other
+    columns, or a result which isn't a dataframe or series) is saved
+    in meta.json.  The store may be shared with other users, so
+    nothing in it is unpickled: a result which can't be saved in these
+    formats (for example a column of python objects other than
+    strings, numbers and bools) isn't stored.
+
+    Results from an earlier install of an extension are removed when a
+    result from a new install is stored.  The least recently used
+    results are removed when the total size is more than max_bytes.
+    The total is kept as results are stored, and only found by walking
+    the store when it goes over max_bytes, or every reconcile_every
+    results in case other processes are storing results too.
+    """
+    meta_file = 'meta.json'
+    reconcile_every = 100
+
+    def __init__(self, location, max_bytes=2 * 1024 ** 3):
+        """
+        Input:
+            location -- directory to store the results in
+            max_bytes -- maximum total size of the stored results
+        """
+        super().__init__()
+        self.location = os.path.expanduser(location)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.uncacheable = 0
+        # total bytes stored (None until the store has been walked),
+        # and the number of results stored since it was walked
+        self._stored_bytes = None
+        self._stored_since_walk = 0
+        # (collection, name) -> (modification times and sizes of the
+        # files of the extension module, hash of the files)
+        self._module_hashes = {}
+
+    def wrap_call(self, bound, call, args, kwargs):
+        entry = self._entry_path(bound, args, kwargs)
+        if entry is None:
+            with self._lock:
+                self.uncacheable += 1
+            return call(args, kwargs)
+        try:
+            result = self._load(entry)
+        except (OSError, ValueError, KeyError, TypeError):
+            # not stored, or removed while being read
+            result = None
+        if result is not None:
+            with self._lock:
+                self.hits += 1
+            return result
+        with self._lock:
+            self.misses += 1
+        result = call(args, kwargs)
+        if result is not None:
+            self._evict(self._save(entry, result))
+        return result
+
+    def info(self):
+        """
+        Returns a dictionary of the location, size limit, counts of
+        hits, misses and uncacheable calls in this process, and the
+        number of entries and bytes stored for each extension
+        """
+        extensions = {}
+        for collection, name, _, _, nbytes in self._entries():
+            stored = extensions.setdefault('{}.{}'.format(collection, name),
+                                           {'entries': 0, 'bytes': 0})
+            stored['entries'] += 1
+            stored['bytes'] += nbytes
+        with self._lock:
+            return {'location': self.location,
+                    'hits': self.hits,
+                    'misses': self.misses,
+                    'uncacheable': self.uncacheable,
+                    'entries': sum(e['entries'] for e in extensions.values()),
+                    'bytes': sum(e['bytes'] for e in extensions.values()),
+                    'max_bytes': self.max_bytes,
+                    'extensions': extensions}
+
+    def clear(self, collection=None, name=None):
+        """
+        Remove the stored results of an extension, all the extensions
+        in a collection (name None), or everything
+        """
+        path = self.location
+        if collection is not None:
+            path = os.path.join(path, collection)
+            if name is not None:
+                path = os.path.join(path, name)
+        shutil.rmtree(path, ignore_errors=True)
+        with self._lock:
+            self._stored_bytes = None
+
+    def _entry_path(self, bound, args, kwargs):
+        install = '{}-{}'.format(self._install_hash(bound), 
+                                 self._module_hash(bound))
+        try:
+            call = frame_hash(bound.df) + arguments_hash(args, kwargs)
+        except unhashable_errors:
+            return None
+        return os.path.join(self.location, bound._collection, bound.name,
+                            install,
+                            hashlib.sha1(call.encode('utf-8')).hexdigest())
+
+    def _module_hash(self, bound):
+        """
+        Returns a hash of the files of the extension module.  The
+        files are only read again when the modification time or size
+        of one of them changes
+        """
+        extension = (bound._collection, bound.name)
+        ext = bound._repo.extension_collections[bound._collection][bound.name]
+        module_path = os.path.realpath(ext.ext_info.module_path)
+        files = []
+        for root, dirs, names in os.walk(module_path):
+            dirs[:] = [d for d in dirs if d != '__pycache__']
+            for name in names:
+                # the files linked to, if they are links
+                stat = os.stat(os.path.join(root, name))
+                files.append((root, name, stat.st_ino, stat.st_mtime_ns,
+                              stat.st_size))
+        files.sort()
+        module_hash = self._module_hashes.get(extension)
+        if module_hash is None or module_hash[0] != files:
+            module_hash = (files, tree_hash(module_path))
+            self._module_hashes[extension] = module_hash
+        return module_hash[1]
+
+    def _load(self, entry):
+        with open(os.path.join(entry, self.meta_file)) as f:
+            meta = json.load(f)
+        # the modification time of the entry records when it was
+        # last used
+        os.utime(entry)
+        if meta['kind'] == 'object':
+            return meta['result']
+        columns = []
+        for position, column in enumerate(meta['columns']):
+            if column is None:
+                columns.append(np.load(os.path.join(entry, '{}.npy'.format(position)),
+                                       mmap_mode='c'))
+            else:
+                columns.append(pd.array(column['values'], dtype=column['dtype']))
+        # copy=False keeps the memory mapped arrays rather than copying
+        # them into memory
+        df = pd.DataFrame(dict(enumerate(columns)), 
+                          index=_load_index(entry, meta['index']), copy=False)
+        df.columns = _load_index(entry, meta['labels'])
+        if meta['kind'] == 'series':
+            return df.iloc[:, 0].rename(meta['name'])
+        return df
+
+    def _save(self, entry, result):
+        """
+        Stores the result, returning the number of bytes stored
+        """
+        if isinstance(result, pd.Series):
+            meta = {'kind': 'series', 'name': _json_value(result.name)}
+            result = result.to_frame()
+        elif isinstance(result, pd.DataFrame):
+            meta = {'kind': 'frame'}
+        else:
+            try:
+                meta = {'kind': 'object', 'result': _json_value(result)}
+            except TypeError:
+                # can't be stored
+                return 0
+
+        # write to a temporary directory and rename it, so that a
+        # partly written entry is never read
+        tmp_entry = '{}.{}.tmp'.format(entry, uuid.uuid4().hex)
+        os.makedirs(tmp_entry)
+        try:
+            if meta['kind'] != 'object':
+                meta.update(index=_save_index(tmp_entry, 'index', result.index),
+                            labels=_save_index(tmp_entry, 'labels', result.columns),
+                            columns=[])
+                for position in range(result.shape[1]):
+                    column = result.iloc[:, position]
+                    if _mapped(column):
+                        np.save(os.path.join(tmp_entry, '{}.npy'.format(position)),
+                                column.to_numpy(copy=False), allow_pickle=False)
+                        meta['columns'].append(None)
+                    else:
+                        meta['columns'].append(_json_column(column.array))
+            with open(os.path.join(tmp_entry, self.meta_file), 'w') as f:
+                json.dump(meta, f)
+            nbytes = sum(os.path.getsize(os.path.join(tmp_entry, f)) \
+                            for f in os.listdir(tmp_entry))
+            self._remove_other_installs(entry)
+            os.rename(tmp_entry, entry)
+        except (OSError, TypeError, ValueError):
+            # already stored by another process, or can't be stored
+            shutil.rmtree(tmp_entry, ignore_errors=True)
+            return 0
+        return nbytes
+
+    def _remove_other_installs(self, entry):
+        install_dir = os.path.dirname(entry)
+        extension_dir = os.path.dirname(install_dir)
+        for other in os.listdir(extension_dir):
+            if other != os.path.basename(install_dir):
+                shutil.rmtree(os.path.join(extension_dir, other),
+                              ignore_errors=True)
+                # the size of what was removed isn't known
+                with self._lock:
+                    self._stored_bytes = None
+
+    def _entries(self):
+        """
+        Yields (collection, name, entry path, last used, bytes)
+        for each stored result
+        """
+        for path, dirs, files in os.walk(self.location):
+            if self.meta_file not in files:
+                continue
+            dirs[:] = []
+            relative = os.path.relpath(path, self.location).split(os.sep)
+            if len(relative) != 4 or path.endswith('.tmp'):
+                continue
+            try:
+                nbytes = sum(os.path.getsize(os.path.join(path, f)) for f in files)
+                yield relative[0], relative[1], path, os.stat(path).st_mtime, nbytes
+            except OSError:
+                # removed while being read
+                continue
+
+    def _evict(self, nbytes):
+        """
+        Removes the least recently used results if the total size is
+        more than max_bytes
+        Input:
+            nbytes -- the size of the result just stored
+        """
+        with self._lock:
+            if self._stored_bytes is not None and \
+                    self._stored_since_walk < self.reconcile_every:
+                self._stored_bytes += nbytes
+                self._stored_since_walk += 1
+                if self._stored_bytes <= self.max_bytes:
+                    return
+        entries = sorted(self._entries(), key=lambda e: e[3])
+        total = sum(e[4] for e in entries)
+        for _, _, path, _, size in entries:
+            if total <= self.max_bytes:
+                break
+            shutil.rmtree(path, ignore_errors=True)
+            total -= size
+        with self._lock:
+            self._stored_bytes = total
+            self._stored_since_walk = 0
+
+
+def _mapped(values):
+    """
+    True if the values have a plain numpy dtype, so they are saved in
+    a .npy file which can be memory mapped
+    """
+    return isinstance(values.dtype, np.dtype) and values.dtype.kind in 'biufcmM'
+
+def _json_value(value):
+    """
+    Returns a value which is saved in meta.json as it is, raising a
+    TypeError if it would be changed
+    """
+    if isinstance(value, np.generic):
+        value = value.item()
+    if type(value) not in json_types:
+        raise TypeError('{!r} cannot be stored'.format(value))
+    return value
+
+def _json_column(values):
+    """
+    Returns the values of a column, or of an index, to save in
+    meta.json, raising a TypeError if they wouldn't be loaded the same
+    """
+    saved = {'values': [None if value is pd.NA and values.dtype != object \
+                            else _json_value(value) for value in values],
+             'dtype': str(values.dtype)}
+    if pd.array(saved['values'], dtype=saved['dtype']).dtype != values.dtype:
+        raise TypeError('a column of {} cannot be stored'.format(values.dtype))
+    return saved
+
+def _save_index(directory, name, index):
+    """
+    Saves an index (or the column labels) of a result, returning what
+    to put in meta.json to load it again
+    """
+    names = [_json_value(n) for n in index.names]
+    if isinstance(index, pd.RangeIndex):
+        return {'range': [index.start, index.stop, index.step], 'names': names}
+    levels = []
+    for level in range(index.nlevels):
+        values = index.get_level_values(level)
+        if _mapped(values):
+            file = '{}.{}.npy'.format(name, level)
+            np.save(os.path.join(directory, file), values.to_numpy(), 
+                    allow_pickle=False)
+            levels.append({'file': file})
+        else:
+            levels.append(_json_column(values.array))
+    return {'levels': levels, 'names': names}
+
+def _load_index(directory, saved):
+    if 'range' in saved:
+        return pd.RangeIndex(*saved['range'], name=saved['names'][0])
+    levels = [np.load(os.path.join(directory, level['file'])) if 'file' in level \
+                else pd.array(level['values'], dtype=level['dtype']) \
+                    for level in saved['levels']]
+    if len(levels) == 1:
+        return pd.Index(levels[0], name=saved['names'][0])
+    return pd.MultiIndex.from_arrays(levels, names=saved['names'])
@@ -0,0 +1,174 @@
+import os, bz2, gzip, lzma, tempfile
+
+import pandas as pd
+
+from .file_mode import default_file_mode
+
+# suffixes of compressed files, which pandas decompresses itself
+compression_suffixes = ('.gz', '.bz2', '.zip', '.xz', '.zst', '.tar')
+
+# file formats known from the suffix of the file name
+file_formats = {'.csv': 'csv', '.tsv': 'tsv', '.txt': 'csv',
+                '.json': 'jsonl', '.jsonl': 'jsonl', '.ndjson': 'jsonl',
+                '.parquet': 'parquet', '.pq': 'parquet'}
+
+def file_format(path):
+    """
+    Returns the format of a file from its name, ignoring any
+    compression suffix
+    """
+    name = os.fspath(path).lower()
+    for suffix in compression_suffixes:
+        if name.endswith(suffix):
+            name = name[:-len(suffix)]
+            break
+    try:
+        return file_formats[os.path.splitext(name)[1]]
+    except KeyError:
+        raise ValueError('Unable to tell the format of {} from its name; it must '
+                         'end in one of {}, or pass an iterable of dataframes '
+                         'instead'.format(path, ', '.join(file_formats)))
+
+# how compressed files are opened for writing
+compressed_writers = {'.gz': gzip.open, '.bz2': bz2.open, '.xz': lzma.open}
+
+def _pyarrow_parquet():
+    try:
+        import pyarrow.parquet
+    except ImportError:
+        raise ImportError('Streaming parquet files needs pyarrow to be installed')
+    return pyarrow.parquet
+
+
+def chunk_reader(source, chunksize, **read_kwargs):
+    """
+    Returns an iterator of dataframes of up to chunksize rows read
+    from a csv, json lines or parquet file.  The file isn't opened
+    until the first chunk is asked for.
+    Input:
+        source -- path of the file, or an iterable of dataframes
+                  which is returned as it is
+        chunksize -- number of rows in each chunk
+        read_kwargs -- passed to the pandas reader (pd.read_csv or
+                       pd.read_json) or, for parquet, the columns to
+                       read
+    """
+    if not isinstance(source, (str, os.PathLike)):
+        return iter(source)
+    format = file_format(source)
+    if format == 'parquet':
+        parquet = _pyarrow_parquet()
+        return _read_parquet(parquet, source, chunksize, **read_kwargs)
+    if format == 'jsonl':
+        return _read_pandas(pd.read_json, source, lines=True,
+                            chunksize=chunksize, **read_kwargs)
+    if format == 'tsv':
+        read_kwargs.setdefault('sep', '\t')
+    return _read_pandas(pd.read_csv, source, chunksize=chunksize, **read_kwargs)
+
+def _read_pandas(reader, source, **read_kwargs):
+    with reader(source, **read_kwargs) as chunks:
+        for chunk in chunks:
+            yield chunk
+
+def _read_parquet(parquet, source, chunksize, columns=None):
+    with parquet.ParquetFile(source) as parquet_file:
+        for batch in parquet_file.iter_batches(batch_size=chunksize,
+                                               columns=columns):
+            yield batch.to_pandas()
+
+
+def write_chunks(chunks, sink):
+    """
+    Writes each dataframe (or series) from chunks to the sink as it
+    arrives, and returns the total number of rows written.  The index
+    isn't written.
+
+    A file is written under a temporary name and renamed when all
+    the chunks have been written, so a partly written file is never
+    left behind if a chunk fails.
+    Input:
+        chunks -- iterable of dataframes or series
+        sink -- path of a csv, json lines or parquet file (csv and
+                json lines can be compressed with gzip, bz2 or xz), 
+                or a function which is called with each chunk
+    """
+    if callable(sink):
+        rows = 0
+        for chunk in chunks:
+            sink(chunk)
+            rows += len(chunk)
+        return rows
+
+    format = file_format(sink)
+    path = os.path.expanduser(os.fspath(sink))
+    if format == 'parquet':
+        write = _parquet_writer(_pyarrow_parquet())
+    else:
+        opener = compressed_writers.get(os.path.splitext(path)[1].lower(), open)
+        if opener is open and path.lower().endswith(compression_suffixes):
+            raise ValueError('Unable to write compressed file {}, only {} '
+                             'compression is supported'\
+                                .format(path, ', '.join(compressed_writers)))
+        write = _text_writer(opener, format)
+
+    directory, name = os.path.split(os.path.abspath(path))
+    fd, tmp_file = tempfile.mkstemp(dir=directory, prefix='.' + name, suffix='.tmp')
+    os.close(fd)
+    try:
+        # readable by the other users of the output, as a file made
+        # by open() would be
+        os.chmod(tmp_file, default_file_mode())
+        rows = write(tmp_file, _frames(chunks))
+        os.replace(tmp_file, path)
+    except BaseException:
+        os.remove(tmp_file)
+        raise
+    return rows
+
+def _frames(chunks):
+    for chunk in chunks:
+        if isinstance(chunk, pd.Series):
+            chunk = chunk.to_frame()
+        if not isinstance(chunk, pd.DataFrame):
+            raise TypeError('Only dataframes and series can be written, '
+                            'not {}'.format(type(chunk).__name__))
+        yield chunk
+
+def _text_writer(opener, format):
+    def write(path, frames):
+        rows = 0
+        header = True
+        with opener(path, 'wt', newline='') as f:
+            for frame in frames:
+                if format == 'jsonl':
+                    if len(frame):
+                        # older versions of pandas leave out the last
+                        # line ending
+                        lines = frame.to_json(orient='records', lines=True)
+                        f.write(lines if lines.endswith('\n') else lines + '\n')
+                else:
+                    frame.to_csv(f, header=header, index=False,
+                                 sep='\t' if format == 'tsv' else ',')
+                    header = False
+                rows += len(frame)
+        return rows
+    return write
+
+def _parquet_writer(parquet):
+    import pyarrow
+    def write(path, frames):
+        rows = 0
+        writer = None
+        try:
+            for frame in frames:
+                table = pyarrow.Table.from_pandas(frame, preserve_index=False)
+                if writer is None:
+                    writer = parquet.ParquetWriter(path, table.schema)
+                writer.write_table(table)
+                rows += len(frame)
+        finally:
+            if writer is not None:
+                writer.close()
+        return rows
+    return write
@@ -0,0 +1,240 @@
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, \
+                               wait, FIRST_COMPLETED
+
+from ..symbols import repository, __partition_rows__, __partition_reduce__, \
+                      __combine_attr__
+from ..extensions.pipeline import PipelineStep, run_steps
+from .stream_io import chunk_reader, write_chunks
+
+class user_extension_batch_methods_mixin(object):
+    """
+    Methods which a user can call to run extensions over
+    many dataframes, or dataframes too big for memory, in one go
+    """
+    def map(self, name, frames, workers=None, ordered=True, args=(),
+            kwargs=None, executor='process', max_in_flight=None):
+        """
+        Applies an extension to each of a number of dataframes using
+        a pool of worker processes (or threads), and yields the
+        results as they become available.
+
+        The extension is imported once in each worker when it
+        starts, rather than once per dataframe.  Dataframes are
+        taken from ``frames`` only as workers become free, so it can
+        be a generator which reads them one at a time from files.
+
+        *Input Parameters:*
+
+            **name:**
+
+                Name of the extension (including collection if required)
+
+            **frames:**
+
+                An iterable of dataframes
+
+            **workers:**
+
+                Number of worker processes or threads.  Defaults to the
+                number of CPUs available.
+
+            **ordered:**
+
+                If ``True`` (the default) the results are yielded in the
+                same order as ``frames``.  Otherwise each result is
+                yielded as soon as it is ready.
+
+            **args, kwargs:**
+
+                Any other positional and keyword arguments to call the
+                extension with.
+
+            **executor:**
+
+                ``'process'`` (the default) or ``'thread'``
+
+            **max_in_flight:**
+
+                The maximum number of dataframes sent to the workers but
+                not yet yielded, which bounds the memory used.  Defaults
+                to twice the number of workers.
+
+        Yields the value returned by the extension for each dataframe,
+        or the dataframe itself if the extension returns ``None``
+        (because it changes the dataframe it is given).  An exception
+        raised by the extension stops the map and is raised to the
+        caller.
+        """
+        executors = {'process': ProcessPoolExecutor, 'thread': ThreadPoolExecutor}
+        if executor not in executors:
+            raise ValueError('executor must be one of {}'.format(tuple(executors)))
+        collection, extension_name = self._parse_extension_name(name)
+        if extension_name not in self.extension_collections.get(collection, {}):
+            raise KeyError('{} is not an installed extension'.format(name))
+        # import the extension here first, so that any problem with it
+        # is found before starting the workers, and forked workers
+        # start with it already imported
+        self._resolve_extension(collection, extension_name)
+
+        workers = workers or os.cpu_count() or 1
+        # the pool is only started when the first result is asked for
+        key = (collection, extension_name)
+        def make_pool():
+            return executors[executor](max_workers=workers,
+                                       initializer=_init_map_worker,
+                                       initargs=key)
+        return _map_results(make_pool, key, frames, args, kwargs or {}, 
+                            ordered, max_in_flight or 2 * workers)
+
+    def stream(self, source, steps, chunksize=100000, sink=None, **read_kwargs):
+        """
+        Applies extensions to a file which is too big to fit in memory,
+        by reading it in chunks of rows and passing each chunk through
+        the extensions in turn.  Only one chunk is held in memory at a
+        time.
+
+        The extensions must declare that they work on any chunk of
+        rows, by setting their ``pdext_partition`` attribute to
+        ``'rows'``.  The last one can instead aggregate the rows, by
+        setting ``pdext_partition`` to ``'reduce'``: it is called with
+        each chunk to give a partial result, and the partial results 
+        are passed as a list to the function set as its 
+        ``pdext_combine`` attribute, whose result is returned.
+
+        Otherwise the chunks returned by the last extension (or the
+        chunks themselves, if it changes them) are written to
+        ``sink`` as they are produced.  If there is no sink, a 
+        generator of them is returned, and nothing is read until the
+        first chunk is asked for.
+
+        *Input Parameters:*
+
+            **source:**
+
+                Path of a csv, tsv, json lines or parquet file (which
+                needs pyarrow) to read, the format being known from its
+                name.  Compressed csv and json lines files can be read.
+                Alternatively, any iterable of dataframes, such as
+                the reader returned by ``pd.read_csv(..., chunksize=...)``
+
+            **steps:**
+
+                The extensions to apply, in order.  Each is the name of
+                an extension (including collection if required), or a
+                tuple of the name and a dictionary of keyword arguments
+                to call it with, or a tuple of the name, a tuple of
+                positional arguments and a dictionary of keyword 
+                arguments.  Disabled extensions are skipped.
+
+            **chunksize:**
+
+                Number of rows read at a time
+
+            **sink:**
+
+                Path of a csv, tsv, json lines or parquet file to write
+                the result to (without the index), or a function which
+                is called with each chunk of the result.  A file is
+                written under a temporary name and renamed once it is
+                complete.  The number of rows written is returned.
+
+            **read_kwargs:**
+
+                Passed to ``pd.read_csv`` or ``pd.read_json`` when 
+                reading the source, for example ``usecols`` or
+                ``dtype``.  For parquet files, ``columns`` can be given.
+        """
+        steps = self._stream_steps(steps)
+        reduce = bool(steps) and steps[-1].partition == __partition_reduce__
+        if reduce and sink is not None:
+            raise ValueError('The result of {} is returned, it can\'t be '
+                             'written to a sink'.format(steps[-1].name))
+        chunks = chunk_reader(source, chunksize, **read_kwargs)
+        results = (run_steps(chunk, steps) for chunk in chunks)
+        if reduce:
+            return getattr(steps[-1].ext, __combine_attr__)(list(results))
+        if sink is None:
+            return results
+        return write_chunks(results, sink)
+
+    def _stream_steps(self, steps):
+        """
+        Returns a PipelineStep for each enabled extension in the steps
+        given to stream()
+        """
+        if isinstance(steps, str):
+            steps = [steps]
+        stream_steps = []
+        for position, step in enumerate(steps):
+            args, kwargs = (), {}
+            if not isinstance(step, str):
+                if len(step) == 2:
+                    step, kwargs = step
+                else:
+                    step, args, kwargs = step
+            collection, name = self._parse_extension_name(step)
+            if name not in self.extension_collections.get(collection, {}):
+                raise KeyError('{} is not an installed extension'.format(step))
+            ext, enabled = self._resolve_extension(collection, name)
+            if not enabled:
+                continue
+            stream_step = PipelineStep(collection, name, ext, self, args, kwargs)
+            last = position == len(steps) - 1
+            if stream_step.partition != __partition_rows__ and \
+                    not (last and stream_step.partition == __partition_reduce__):
+                raise ValueError('{} can\'t be streamed as it needs all the rows '
+                                 'at once; only extensions with the {} partition, '
+                                 'or a last extension with the {} partition, can '
+                                 'be'.format(step, __partition_rows__, 
+                                             __partition_reduce__))
+            stream_steps.append(stream_step)
+        return stream_steps
+
+
+def _map_results(make_pool, key, frames, args, kwargs, ordered, max_in_flight):
+    """
+    Keeps up to max_in_flight dataframes submitted to the pool, and
+    yields the results in order or as they complete
+    """
+    pool = make_pool()
+    frames = iter(frames)
+    pending = deque()
+    def submit():
+        for frame in frames:
+            pending.append(pool.submit(_map_frame, key, frame, args, kwargs))
+            if len(pending) >= max_in_flight:
+                break
+    try:
+        submit()
+        while pending:
+            if ordered:
+                done = [pending.popleft()]
+            else:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    pending.remove(future)
+            for future in done:
+                yield future.result()
+            submit()
+    finally:
+        # the caller may stop early, or an extension may fail
+        for future in pending:
+            future.cancel()
+        pool.shutdown()
+
+
+# The extensions resolved in each map worker by _init_map_worker, 
+# keyed by (collection, name) as thread workers of different maps
+# share the same process
+_map_extensions = {}
+
+def _init_map_worker(collection, name):
+    _map_extensions[(collection, name)] = \
+                    repository()._resolve_extension(collection, name)
+
+def _map_frame(key, frame, args, kwargs):
+    ext, enabled = _map_extensions[key]
+    result = ext(frame, *args, **kwargs) if enabled else None
+    return frame if result is None else result
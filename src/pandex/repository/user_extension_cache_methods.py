@@ -0,0 +1,203 @@
+import os
+
+from ..symbols import __default_collection__, __result_store__
+from .result_cache import ResultCache
+from .result_store import ResultStore
+
+class user_extension_cache_methods_mixin(object):
+    """
+    Methods which a user can call to cache the results of
+    extensions
+    """
+    def memoize(self, *names, max_entries=1024, max_bytes=256 * 1024 * 1024,
+                sample_rows=None):
+        """
+        Cache the results of extensions in memory, so that calling a
+        pure extension again with the same dataframe and arguments
+        returns the earlier result without running it again.
+
+        Only results other than ``None`` are cached, so extensions
+        which change the dataframe they are given still run every time.
+        The cached results of an extension are discarded when it is
+        reinstalled or reloaded.
+
+        *Input Parameters:*
+
+            **names:**
+
+                Names of extensions (including collection if there is
+                one) or of collections whose results are cached.  All
+                extensions are cached if no names are given.
+
+            **max_entries:**
+
+                The maximum number of results to keep.  The least
+                recently used results are discarded first.
+
+            **max_bytes:**
+
+                The maximum total size of the results to keep.
+
+            **sample_rows:**
+
+                If set, dataframes with more rows than this are
+                recognised from a sample of this many rows (and their
+                shape, columns and dtypes) rather than all of them.
+                This is faster for big dataframes, but a change to a
+                row which isn't sampled won't be noticed.
+        """
+        if self._result_cache is None:
+            self._result_cache = ResultCache()
+        cache = self._result_cache
+        cache.set_limits(max_entries, max_bytes)
+        cache.sample_rows = sample_rows
+        cache.select(self._extension_targets(names))
+        self._invalidate_extension_cache()
+
+    def unmemoize(self, *names):
+        """
+        Stop caching the results of extensions and discard any
+        results already cached
+
+        *Input Parameters:*
+
+            **names:**
+
+                Names of extensions or collections to stop caching,
+                as given to ``memoize()``.  If no names are given,
+                caching is turned off completely.
+        """
+        cache = self._result_cache
+        if cache is None:
+            return
+        if names:
+            targets = self._extension_targets(names)
+            cache.deselect(targets)
+            for target in targets:
+                cache.clear(*target)
+        else:
+            self._result_cache = None
+        self._invalidate_extension_cache()
+
+    def memo_info(self):
+        """
+        Returns a dictionary of statistics about the in-memory cache
+        of extension results: the number of ``hits``, ``misses`` and
+        ``uncacheable`` calls, and the number of ``entries`` and
+        ``bytes`` cached, along with the limits set by ``memoize()``.
+        Returns ``None`` if results aren't being cached.
+        """
+        if self._result_cache is None:
+            return None
+        return self._result_cache.info()
+
+    def persist(self, *names, location=None, max_bytes=2 * 1024 ** 3):
+        """
+        Store the results of extensions on disk, so that calling an
+        extension with the same dataframe and arguments in another
+        process, or a later session, loads the earlier result rather
+        than running the extension again.  Columns with numeric, 
+        boolean or datetime values are memory mapped when a result
+        is loaded, so they aren't read from disk until they are used.
+
+        As with ``memoize()``, only results other than ``None`` are
+        stored.  The stored results of an extension are discarded when
+        it is reinstalled.
+
+        *Input Parameters:*
+
+            **names:**
+
+                Names of extensions (including collection if there is
+                one) or of collections whose results are stored.  All
+                extensions are stored if no names are given.
+
+            **location:**
+
+                Directory to store the results in.  Defaults to the
+                ``result_store`` setting in the repository config file
+                if there is one, otherwise a directory named 
+                ``.pdext_results`` next to the default repository.
+
+            **max_bytes:**
+
+                The maximum total size of the stored results.  The
+                least recently used results are removed first.
+        """
+        location = location or self._result_store_path()
+        if self._result_store is None or self._result_store.location != \
+                                            os.path.expanduser(location):
+            self._result_store = ResultStore(location)
+        self._result_store.max_bytes = max_bytes
+        self._result_store.select(self._extension_targets(names))
+        self._invalidate_extension_cache()
+
+    def unpersist(self, *names, clear=False):
+        """
+        Stop storing the results of extensions on disk
+
+        *Input Parameters:*
+
+            **names:**
+
+                Names of extensions or collections to stop storing,
+                as given to ``persist()``.  If no names are given,
+                storing is turned off completely.
+
+            **clear:**
+
+                If ``True`` the results already stored for the 
+                extensions (or all results, if no names are given)
+                are removed from disk.
+        """
+        store = self._result_store
+        if store is None:
+            return
+        targets = self._extension_targets(names)
+        if clear:
+            for target in targets or [(None, None)]:
+                store.clear(*target)
+        if names:
+            store.deselect(targets)
+        else:
+            self._result_store = None
+        self._invalidate_extension_cache()
+
+    def cache_info(self):
+        """
+        Returns a dictionary describing the caches of extension 
+        results:
+
+            * ``'memory'``: the statistics of the in-memory cache,
+              as returned by ``memo_info()``
+            * ``'disk'``: the location and size limit of the results
+              stored on disk, the number of ``entries`` and ``bytes``
+              stored in total and for each extension, and the number
+              of ``hits``, ``misses`` and ``uncacheable`` calls in
+              this session
+
+        Either is ``None`` if it isn't turned on.
+        """
+        return {'memory': self.memo_info(),
+                'disk': None if self._result_store is None \
+                            else self._result_store.info()}
+
+    def _result_store_path(self):
+        if self.result_store_location is not None:
+            return self.result_store_location
+        default = os.path.normpath(self._repository_path(self.default_repository))
+        return os.path.join(os.path.dirname(default), __result_store__)
+
+    def _extension_targets(self, names):
+        """
+        Returns (collection, name) for each extension name, with name
+        None if it is the name of a collection
+        """
+        targets = []
+        for name in names:
+            if '.' not in name and name != __default_collection__ and \
+                    name in self.extension_collections:
+                targets.append((name, None))
+            else:
+                targets.append(self._parse_extension_name(name))
+        return targets
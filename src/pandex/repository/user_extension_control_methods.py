@@ -15,14 +15,16 @@ class user_extension_control_methods_mixin(object):
     def show_extensions(self):
         info = '{} v{}\n'.format(__pdext__, __version__)
 
-        # Get the extension names under each collection
+        # Get the extension names under each collection.  The usage
+        # and the libraries imported by each one are recorded when it
+        # is installed, so nothing is imported unless it was installed
+        # by an earlier version
         def ext_info(x):
-            x.get_extension()
-            if x.imported_ok:
-                sig = x.extension_signature
-            else:
+            sig = x.extension_signature
+            advice = x.dependency_advice()
+            if advice is not None:
                 sig = "{}  - Currently doesn't work because {}"\
-                        .format(x.extension_signature,x.pdext_fix_advice)
+                        .format(sig,advice)
             return (x.ext_info.name, sig)
         extensions = {c:[ext_info(ext[e]) for e in ext] \
                         for c, ext in self.extension_collections.items()}
@@ -63,8 +65,11 @@ class user_extension_control_methods_mixin(object):
         # locate extension to be enabled/disabled
         collection, name=self._parse_extension_name(name)
         ext = self._get_extension_object(name, collection)
-        ext.enabled = _enabled
+        with self._repository_lock(ext):
+            ext.enabled = _enabled
+            self._update_repository_index(ext)
         ext.reload()
+        self._invalidate_extension_cache()
     
     def enable_extension(self, name):
         """
@@ -91,5 +96,8 @@ class user_extension_control_methods_mixin(object):
         # locate extension to be removed
         collection, name=self._parse_extension_name(name)
         ext = self._get_extension_object(name, collection)
-        ext.remove()
-        del(self.extension_collections[collection][name])
\ No newline at end of file
+        with self._repository_lock(ext):
+            ext.remove()
+            self._update_repository_index(ext)
+        del(self.extension_collections[collection][name])
+        self._invalidate_extension_cache()
\ No newline at end of file
@@ -1,9 +1,10 @@
-import os
+import os, time
 import logging
 
-from ..symbols import __default_collection__, __import_file_sep__
+from ..symbols import __default_collection__, __import_file_sep__, \
+                       __reserved_names__, __df_ext__
 from ..extensions import Extension
-from .extension_spec import ExtensionSpecification
+from .extension_spec import ExtensionSpecification, ImportReport
 
 class user_extension_install_methods_mixin(object):
     """
@@ -15,7 +16,7 @@ class user_extension_install_methods_mixin(object):
     namespace clashes are resolved using the repository search order
     which can also be specified by the user.
     """
-    def import_extension(self, extension_spec):
+    def import_extension(self, extension_spec, workers=None, link='copy'):
         """
         Imports extensions that don't already exist into the default repo
         
@@ -48,32 +49,108 @@ class user_extension_install_methods_mixin(object):
                     ``name:``
                         string name of extension 
                         (including collection if required)
-                        to be installed              
+                        to be installed.  ``parallel`` and ``pipe_lazy``
+                        are methods of ``df.ext``, so they can't be 
+                        used as the name of a collection or of an
+                        extension outside a collection
+
+            **workers:**
+
+                Maximum number of threads used to fetch and install 
+                the extensions concurrently.  Defaults to a number 
+                based on the CPUs available.
+
+            **link:**
+
+                How files from a local directory or ``.py`` file are 
+                put into the repository:
+
+                    *   ``'copy'`` - copy the files (the default)
+                    *   ``'hard'`` - hard link the files, falling back to 
+                        a copy if they are on a different filesystem
+                    *   ``'sym'`` - symbolically link the files, so any 
+                        changes to the originals are picked up
+
+                Files from GitHub are always extracted from the archive.
+
+        The outcome of each line and the time taken are available 
+        afterwards from ``last_import_report``.  If any line fails to
+        install, the others are still installed and the first error 
+        is then raised.
+        """
+        self._import_extension(extension_spec, workers, link)
+
+    def _import_extension(self, extension_spec, workers=None, link='copy',
+                          replace=False):
+        """
+        Imports the extensions in a spec, as import_extension()
+        Input:
+            replace -- if True, extensions which are already installed
+                       are installed again, and the new files replace
+                       the old ones in one step (see Extension.swap_in)
+                       so the extension is never missing
         """
         repo = os.path.join(self._repository_path(self.default_repository))
+        start = time.perf_counter()
         parsed_spec = ExtensionSpecification(extension_spec, repo)
+        lines = list(parsed_spec.get_lines())
+
+        # only extensions that don't already exist in the default
+        # repo are installed, unless they are being replaced (once 
+        # each, if repeated in the spec)
+        to_install = {}
+        for line in lines:
+            ext_path = os.path.join(repo, line.collection, line.ext_name)
+            reserved = line.ext_name if line.collection == __default_collection__ \
+                            else line.collection
+            if reserved in __reserved_names__:
+                line.failed(ValueError('{} is a method of df.{} and cannot be '
+                                       'the name of an extension or collection'\
+                                            .format(reserved, __df_ext__)))
+            elif ext_path in to_install:
+                line.status = 'duplicate'
+            elif os.path.isdir(ext_path) and not replace:
+                line.status = 'already installed'
+            else:
+                to_install[ext_path] = line
+
+        parsed_spec.install(list(to_install.values()), workers, link)
 
-        for line in parsed_spec.get_lines():
+        # update the indexes and rebuild the collections once for
+        # the whole batch
+        installed = [l for l in to_install.values() if l.status == 'installed']
+        for line in installed:
+            self._update_repository_index(line.extension)
+        if installed:
+            self._build_extension_collections()
+
+        # Check if there are any dependencies in the extension
+        # code and warn the user if so
+        for line in lines:
+            if line.status not in ('installed', 'already installed'):
+                continue
             try:
-                # if it doesn't exist in the default repo then install
-                ext_path = os.path.join(repo, line.collection, line.ext_name)
-                if not os.path.isdir(ext_path):
-                    raise KeyError
-                # check if it imports cleanly
-                ext = self._get_extension_object(line.ext_name, line.collection)
-            except KeyError:
-                # Now we know we need to install
-                line.install()
-                self._build_extension_collections()
-                # check if there are any dependency warnings by importing again
-                self.import_extension(line.ext_spec)
-            
-            # Check if there are any dependencies in the extension
-            # code and warn the user if so
+                self._get_extension_object(line.ext_name, line.collection)
             except ModuleNotFoundError as e:
+                line.status = 'missing dependency'
+                line.error = e
                 logging.warning(getattr(e, 'pdext_err')) 
-        
-        parsed_spec.import_completed()
+            except KeyError:
+                # the directory is in the repository, but not a whole
+                # extension, for example one left by a failed install
+                line.status = 'failed'
+                name = line.ext_name if line.collection == __default_collection__ \
+                            else '{}.{}'.format(line.collection, line.ext_name)
+                line.error = ValueError('Extension {} is in the repository but '
+                                        'cannot be loaded, remove it and import '
+                                        'it again'.format(name))
+
+        self.last_import_report = ImportReport(lines, 
+                                               time.perf_counter() - start)
+        logging.debug('Import extension report:\n%s', self.last_import_report)
+        failed = self.last_import_report.failed
+        if failed:
+            raise failed[0]['error']
             
     def reinstall_extension(self, name):
         """
@@ -85,8 +162,8 @@ class user_extension_install_methods_mixin(object):
                 string name of extension (including collection if there is one)
         """
         # locate extension to be removed
-        collection, name=self._parse_extension_name(name)
-        ext = self._get_extension_object(name, collection)
+        collection, ext_name=self._parse_extension_name(name)
+        ext = self._get_extension_object(ext_name, collection)
         install_args = ext.install_args
         self.remove_extension(name)
         self.import_extension(**install_args)
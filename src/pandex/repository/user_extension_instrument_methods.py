@@ -0,0 +1,193 @@
+from .call_stats import CallStats
+from .call_profiler import CallProfiler
+
+class user_extension_instrument_methods_mixin(object):
+    """
+    Methods which a user can call to measure how extensions
+    perform
+    """
+    def instrument(self, *names, memory=False):
+        """
+        Record statistics about each call of extensions: the number
+        of calls, the time they take (in total and as percentiles),
+        and the rows and bytes of the dataframes they are given and
+        return.  The statistics are available from ``stats()``.
+
+        Extensions which aren't instrumented are called exactly as
+        before, so there is no cost when this is turned off.
+
+        *Input Parameters:*
+
+            **names:**
+
+                Names of extensions (including collection if there is
+                one) or of collections to instrument.  All extensions
+                are instrumented if no names are given.
+
+            **memory:**
+
+                If ``True`` the peak memory allocated during each call
+                is recorded too, using ``tracemalloc``.  This slows
+                down all python code while it is turned on.
+        """
+        if self._call_stats is None:
+            self._call_stats = CallStats()
+        self._call_stats.memory = memory
+        if memory:
+            self._call_stats.start_tracing()
+        else:
+            self._call_stats.stop_tracing()
+        self._call_stats.select(self._extension_targets(names))
+        self._invalidate_extension_cache()
+
+    def uninstrument(self, *names):
+        """
+        Stop recording statistics about calls of extensions
+
+        *Input Parameters:*
+
+            **names:**
+
+                Names of extensions or collections, as given to
+                ``instrument()``.  If no names are given, all the
+                statistics are discarded.
+        """
+        if self._call_stats is None:
+            return
+        if names:
+            self._call_stats.deselect(self._extension_targets(names))
+        else:
+            self._call_stats.stop_tracing()
+            self._call_stats = None
+        self._invalidate_extension_cache()
+
+    def stats(self, reset=False):
+        """
+        Returns a dataframe of the statistics recorded for each
+        instrumented extension which has been called, with columns:
+
+            * ``calls``: number of calls
+            * ``errors``: number of the calls which raised an exception
+            * ``total_ms``, ``mean_ms``: total and mean time taken
+            * ``p50_ms``, ``p90_ms``, ``p99_ms``, ``max_ms``:
+              percentiles of the time taken, accurate to about 6%
+            * ``rows_in``, ``bytes_in``: total rows and bytes of the
+              dataframes passed to the extension
+            * ``rows_out``, ``bytes_out``: total rows and bytes of the
+              dataframes or series returned
+            * ``peak_memory_bytes``: the most memory allocated during
+              a call, if memory is being recorded
+
+        *Input Parameters:*
+
+            **reset:**
+
+                If ``True`` the statistics are cleared after they are
+                returned.
+        """
+        if self._call_stats is None:
+            return CallStats().to_frame()
+        stats = self._call_stats.to_frame()
+        if reset:
+            self._call_stats.reset()
+        return stats
+
+    def reset_stats(self):
+        """
+        Clear the statistics recorded so far
+        """
+        if self._call_stats is not None:
+            self._call_stats.reset()
+
+    def export_stats(self, path):
+        """
+        Write the statistics to a file in the Prometheus text format,
+        for example for the node exporter textfile collector.  The file
+        is replaced in one step, so it can be written regularly while
+        the collector is reading it.
+
+        *Input Parameters:*
+
+            **path:**
+
+                The file to write, usually ending in ``.prom``
+        """
+        stats = self._call_stats if self._call_stats is not None else CallStats()
+        stats.export(path)
+
+    def profile(self, *names, mode='deterministic', interval=0.001, output=None):
+        """
+        Profile the calls of extensions, to find out where a slow
+        extension spends its time.  The profile of each extension is
+        aggregated across all its calls until profiling is stopped.
+        Only the extension itself is profiled, not the caching of
+        its results or the collection of statistics.
+
+        Returns the profiler, which can be used as a context manager
+        to profile the calls made inside a ``with`` block:
+
+        .. code-block:: python
+
+            with pd.ext.profile('my_collection', output='slow') as profile:
+                df.ext.my_collection.slow_extension()
+            # the profile is in slow.pstats and slow.collapsed
+
+        Otherwise profiling continues until the ``stop()`` method of
+        the profiler or ``unprofile()`` is called.  The profile is
+        available from the profiler as a ``pstats.Stats`` object from
+        its ``stats()`` method, and as collapsed stacks which
+        flamegraph tools read from its ``collapsed()`` method, and
+        ``write(path)`` writes both to files.
+
+        Only one profiler is active at a time, so a new one replaces
+        the one before.
+
+        *Input Parameters:*
+
+            **names:**
+
+                Names of extensions (including collection if there is
+                one) or of collections to profile.  All extensions
+                are profiled if no names are given.
+
+            **mode:**
+
+                ``'deterministic'`` records every function call with
+                ``cProfile``.  This is exact, but slows the extension
+                down and only profiles one call at a time.
+                ``'sampling'`` records the stack of the extension 
+                every ``interval`` seconds, which costs much less and
+                profiles concurrent calls from threads.
+
+            **interval:**
+
+                Seconds between samples in sampling mode.
+
+            **output:**
+
+                If given, the profile is written to ``<output>.pstats``
+                and ``<output>.collapsed`` when profiling stops.
+        """
+        if self._call_profiler is not None:
+            self._call_profiler.stop()
+        profiler = CallProfiler(self, mode, interval, output)
+        profiler.select(self._extension_targets(names))
+        self._call_profiler = profiler
+        self._invalidate_extension_cache()
+        return profiler
+
+    def unprofile(self):
+        """
+        Stop profiling extensions, writing the profile if an output
+        path was given to ``profile()``.  Returns the profiler, or 
+        ``None`` if there wasn't one.
+        """
+        profiler = self._call_profiler
+        if profiler is not None:
+            profiler.stop()
+        return profiler
+
+    def _remove_call_profiler(self, profiler):
+        if self._call_profiler is profiler:
+            self._call_profiler = None
+            self._invalidate_extension_cache()
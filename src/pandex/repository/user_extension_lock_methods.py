@@ -0,0 +1,191 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from ..symbols import __import_file_line_spec__, __lock_file_ext__
+from ..extensions import Extension
+from .extension_location import ExtensionLocation
+from .extension_spec import parse_spec_lines
+from .lock_file import LockFile, tree_hash
+
+class user_extension_lock_methods_mixin(object):
+    """
+    Methods which a user can call to pin the extensions installed
+    from a spec, so that they can be checked and restored quickly
+    """
+    def lock(self, extension_spec, lock_file=None, workers=None):
+        """
+        Installs the extensions in a spec and writes a lock file
+        recording where each one was installed from (the GitHub
+        commit, or a hash of the local files), a hash of the installed
+        files and when it was installed.
+
+        Lines which are already installed from the same files are
+        left alone.  Lines whose files have changed since they were
+        installed, or which aren't installed, are installed again
+        (concurrently).
+
+        When an extension file with a lock file next to it is imported
+        with the ``import`` statement, nothing is checked apart from
+        the lock file if the spec and the installs are unchanged.
+        Otherwise only the lines which differ from the lock file are
+        installed again, and the lock file is updated.
+
+        *Input Parameters:*
+
+            **extension_spec:**
+
+                The path of an extension file, or a string with one
+                or more extension spec lines as for ``import_extension``
+
+            **lock_file:**
+
+                Path of the lock file.  Defaults to the extension file
+                name with ``.lock`` added, and must be given if
+                ``extension_spec`` isn't a file.
+
+            **workers:**
+
+                Maximum number of threads used to check and install
+                the extensions.
+        """
+        spec, lock_file = self._read_lock_spec(extension_spec, lock_file)
+        lock = LockFile(lock_file)
+        repo = self._repository_path(self.default_repository)
+        lines = self._lock_lines(spec)
+
+        # find out where the files of each location are from now
+        locations = {}
+        for line, location, collection, name in lines:
+            locations.setdefault(location, ExtensionLocation(location))
+        with ThreadPoolExecutor(workers) as pool:
+            sources = dict(zip(locations, pool.map(lambda l: l.source_hash(),
+                                                   locations.values())))
+
+        installs = self._lock_installs(repo, lines)
+        changed = []
+        for line, location, collection, name in lines:
+            entry = lock.lines.get(line)
+            install_time = installs[line]
+            if install_time is None:
+                changed.append(line)
+                continue
+            module = tree_hash(self._lock_module_path(repo, collection, name))
+            if entry is not None and entry['source'] == sources[location] and \
+                    entry['install_time'] == install_time and \
+                    entry['module'] == module:
+                continue
+            if module == sources[location]:
+                continue
+            changed.append(line)
+        self._lock_reinstall(changed, workers)
+        self._write_lock(lock, spec, repo, lines,
+                         {line: sources[location] \
+                            for line, location, _, _ in lines})
+
+    def _import_locked(self, extension_spec, lock_file, workers=None):
+        """
+        Makes the installed extensions match a lock file written by
+        lock().  Only the lines which have changed since the lock file
+        was written are installed, and the lock file is then updated.
+        The sources of the lines aren't checked, so nothing is
+        downloaded unless a line has to be installed
+        """
+        lock = LockFile(lock_file)
+        repo = self._repository_path(self.default_repository)
+        lines = self._lock_lines(extension_spec)
+        installs = self._lock_installs(repo, lines)
+        if lock.matches(extension_spec, self.default_repository, installs):
+            return
+
+        # the install time is only to the second, so an install made
+        # in the same second is told apart by the hash of its files
+        changed = [line for line, _, collection, name in lines \
+                        if installs[line] is None or line not in lock.lines or \
+                            lock.lines[line]['install_time'] != installs[line] or \
+                            lock.lines[line]['module'] != \
+                                tree_hash(self._lock_module_path(repo, collection, name))]
+        self._lock_reinstall(changed, workers)
+        sources = {line: lock.lines[line]['source'] \
+                        for line, _, _, _ in lines if line not in changed}
+        for line, location, _, _ in lines:
+            if line in changed:
+                sources[line] = ExtensionLocation(location).source_hash()
+        self._write_lock(lock, extension_spec, repo, lines, sources)
+
+    @staticmethod
+    def _read_lock_spec(extension_spec, lock_file):
+        """
+        Returns the spec and the lock file path
+        """
+        if os.path.isfile(extension_spec):
+            if lock_file is None:
+                lock_file = extension_spec + __lock_file_ext__
+            with open(extension_spec) as f:
+                return f.read(), lock_file
+        if lock_file is None:
+            raise ValueError('A lock_file must be given when the extension '
+                             'spec is not a file')
+        return extension_spec, lock_file
+
+    def _lock_lines(self, spec):
+        """
+        Returns a tuple of (spec line, location, collection, name) for
+        each distinct line of the spec
+        """
+        lines = {}
+        for location, name in parse_spec_lines(spec):
+            collection, ext_name = self._parse_extension_name(name)
+            line = __import_file_line_spec__.format(location, name)
+            lines.setdefault(line, (line, location, collection, ext_name))
+        return list(lines.values())
+
+    @staticmethod
+    def _lock_module_path(repo, collection, name):
+        return Extension(os.path.join(repo, collection, name)).ext_info.module_path
+
+    def _lock_installs(self, repo, lines):
+        """
+        Returns a dictionary of the install time of each line in the
+        repo, or None if the extension isn't installed from that line.
+        This comes from the extension collections, so no files are read
+        unless an extension is hidden by another repository
+        """
+        installs = {}
+        for line, location, collection, name in lines:
+            ext = self.extension_collections.get(collection, {}).get(name)
+            if ext is None or ext.ext_info.path != os.path.join(repo, collection, name):
+                # not installed, or hidden by the same extension in
+                # a repository earlier in the search order
+                ext = Extension(os.path.join(repo, collection, name))
+                init_values = ext.ext_info.read_init_values()
+                if init_values is None:
+                    installs[line] = None
+                    continue
+                ext.ext_info.initialise_from_init_values(init_values)
+            installs[line] = ext.ext_info.install_time \
+                                if ext.ext_info.install_location == line else None
+        return installs
+
+    def _lock_reinstall(self, changed, workers=None):
+        """
+        Installs the extensions of the changed lines again
+        concurrently.  Each new install replaces the old one in one
+        step, so if it fails the old one is left as it was
+        """
+        if changed:
+            self._import_extension('\n'.join(changed), workers=workers,
+                                   replace=True)
+
+    def _write_lock(self, lock, spec, repo, lines, sources):
+        installs = self._lock_installs(repo, lines)
+        for line, location, collection, name in lines:
+            entry = lock.lines.get(line)
+            module = tree_hash(self._lock_module_path(repo, collection, name))
+            if entry is None or entry['install_time'] != installs[line] or \
+                    entry['source'] != sources[line] or entry['module'] != module:
+                lock.lines[line] = {
+                    'extension': line,
+                    'source': sources[line],
+                    'module': module,
+                    'install_time': installs[line]}
+        lock.write(spec, self.default_repository, installs)
@@ -1,4 +1,5 @@
-import os
+import os, copy
+from contextlib import contextmanager
 
 class user_repository_methods_mixin(object):
     """
@@ -72,4 +73,41 @@ class user_repository_methods_mixin(object):
 
     def set_default_repository(self, value):
         self.default_repository = value    
-        self._write_config_file()
\ No newline at end of file
+        self._write_config_file()
+
+    @contextmanager
+    def transaction(self):
+        """
+        Groups changes to the repositories so that the config file is
+        written once, and the extension collections rebuilt once, at
+        the end:
+
+            with pd.ext.transaction():
+                pd.ext.add_repository('team', '/opt/team/.pdext')
+                pd.ext.set_default_repository('team')
+
+        If an exception is raised inside the transaction, none of the
+        changes are kept.  Transactions can be nested, and only the
+        outermost one writes the changes
+        """
+        saved = (copy.deepcopy(self.repositories), self.default_repository,
+                 self.result_store_location)
+        outermost = not self._config_transaction
+        if outermost:
+            self._config_changed = False
+        self._config_transaction += 1
+        try:
+            yield self
+        except BaseException:
+            self.repositories, self.default_repository, \
+                self.result_store_location = saved
+            self._config_transaction -= 1
+            if outermost and self._config_changed:
+                self._config_changed = False
+                # the collections may have been built with the changes
+                self._build_extension_collections()
+            raise
+        self._config_transaction -= 1
+        if outermost and self._config_changed:
+            self._config_changed = False
+            self._write_config_file()
\ No newline at end of file
@@ -11,6 +11,10 @@ __pdext__ = 'pandex'
 # extensions are managed
 __pd_ext__ = 'ext'
 
+# Environment variable which, when set to anything other than 0,
+# defers building the repository until it is first used
+__lazy_env__ = 'PANDEX_LAZY'
+
 # Namespace at the dataframe level where the extension
 # functions are called
 __df_ext__ = 'ext'
@@ -33,10 +37,65 @@ __import_file_ext__ = '.pdext'
 __import_file_sep__ = '->'
 # extension spec line format
 __import_file_line_spec__ = '{}{}{}'.format('{}',__import_file_sep__,'{}')
+# suffix added to an import extension file (or spec) for the lock
+# file written by pd.ext.lock(), and the version of its format
+__lock_file_ext__ = '.lock'
+__lock_file_version__ = 1
 
 # format of install timestamp in __init__.py
 __install_timestamp_fmt__ = '%Y-%m-%dT%H:%M:%SZ'
 
+# directory where archives downloaded from GitHub are cached, which
+# can be overridden with an environment variable
+__download_cache_env__ = 'PANDEX_CACHE_DIR'
+__download_cache__ = os.path.join('~', '.cache', __pdext__, 'downloads')
+
+# server that github: locations are downloaded from, which can be
+# overridden to use a mirror
+__github_url_env__ = 'PANDEX_GITHUB_URL'
+__github_url__ = 'https://github.com'
+
+# location of the index file kept in each repository (a hidden
+# directory so that writing it doesn't change the modification
+# time of the repository directory) and the version of its format
+__repository_index__ = os.path.join('.pdext_index', 'index.json')
+__repository_index_version__ = 1
+# advisory lock file taken by anything which changes the files in a
+# repository, kept in the same hidden directory as the index
+__repository_lock__ = os.path.join('.pdext_index', 'lock')
+# directory that new extension files are put in until they are
+# complete, so that nothing half installed is seen in a collection
+__repository_staging__ = os.path.join('.pdext_index', 'staging')
+# seconds that a replaced version of an installed module is kept for,
+# so that a process still importing it can finish
+__replaced_version_lifetime__ = 60
+
+# directory that extension results are stored in by pd.ext.persist(),
+# next to the default repository unless result_store is set in the
+# repository config file
+__result_store__ = '.pdext_results'
+
+# attributes an extension function can set to declare how it may be
+# split up when run with df.ext.parallel().  The partition is one of
+#   'rows'   -- can be run on any slice of rows independently
+#   'frame'  -- needs the whole dataframe (the default)
+#   'reduce' -- can be run on slices of rows, and the results are then
+#               combined by the function set as the combine attribute
+__partition_attr__ = 'pdext_partition'
+__combine_attr__ = 'pdext_combine'
+__partition_rows__ = 'rows'
+__partition_frame__ = 'frame'
+__partition_reduce__ = 'reduce'
+
+# methods of the dataframe namespace, which can't be used as the name
+# of a collection or of an extension in the default collection
+__reserved_names__ = ('parallel', 'pipe_lazy')
+
+# top level package that installed extension modules are imported
+# under, as _pandex_ext.<hash of extension path>.  It can't be a sub
+# package of pandex, as that name is given to the pandas module
+__extension_modules__ = '_{}_ext'.format(__pdext__)
+
 
 # return the pandas level reference where the repository is stored
 def repository():
@@ -8,8 +8,10 @@ __exports = {
 '.testextensions' : ['testpackage1', 'testpackage2', 'testpackage3'],
 '.helpers' : ['temp_session_directory', 'temp_module_directory',
               'temp_function_directory', 
-              'save_current_installed_extensions', 'make_test_repos'],
-'.symbols': ['sym',]
+              'save_current_installed_extensions', 'make_test_repos',
+              'pdext_with_sources'],
+'.symbols': ['sym',],
+'.testgithub': ['local_github'],
 }
 
 from importlib import import_module
@@ -79,3 +79,34 @@ def make_test_repos(repo, root_dir):
 
     return test_dirs
 
+
+
+@contextmanager
+def pdext_with_sources(root_dir, sources, collection=None, names=()):
+    """
+    Configures the test repos (see make_test_repos) and writes the
+    source files of test extensions, restoring the current repository
+    definition afterwards.  The names given are imported from the
+    first source file
+    Input:
+        root_dir -- directory for the repos and the source files
+        sources -- dictionary of file name -> content
+        collection -- collection to import the extensions into
+        names -- names of the extensions to import
+    Yields the repository and a dictionary of file name -> path
+    """
+    with save_current_installed_extensions():
+        pdext = sym.pd_ext()
+        make_test_repos(pdext, root_dir)
+        paths = {}
+        for name, content in sources.items():
+            paths[name] = os.path.join(root_dir, name)
+            with open(paths[name], 'w') as f:
+                f.write(content)
+        if names:
+            prefix = '' if collection is None else collection + '.'
+            source = paths[next(iter(sources))]
+            pdext.import_extension('\n'.join(
+                    sym.__import_file_line_spec__.format(source, prefix + name) \
+                        for name in names))
+        yield pdext, paths
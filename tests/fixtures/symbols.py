@@ -15,9 +15,14 @@ def sym():
         __import_file_sep__ = _sym.__import_file_sep__
         __import_file_line_spec__ = _sym.__import_file_line_spec__
         __install_timestamp_fmt__ = _sym.__install_timestamp_fmt__
+        __repository_index__ = _sym.__repository_index__
+        __repository_index_version__ = _sym.__repository_index_version__
+        __lock_file_ext__ = _sym.__lock_file_ext__
+        __extension_modules__ = _sym.__extension_modules__
 
         __pdext__ = _sym.__pdext__
         __pd_ext__ = _sym.__pd_ext__
+        __lazy_env__ = _sym.__lazy_env__
         __df_ext__ = _sym.__df_ext__
         __default_collection__ = _sym.__default_collection__
         __installed_extensions__ = _sym.__installed_extensions__
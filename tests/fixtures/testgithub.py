@@ -0,0 +1,101 @@
+"""
+A local stand in for GitHub which serves zip archives of the
+test packages, so that installs from github: locations can be
+tested without a network connection
+"""
+import os, io, hashlib, threading, zipfile
+from http.server import HTTPServer, BaseHTTPRequestHandler
+
+import pytest
+
+from .testextensions import test_package_dir
+from .helpers import temp_module_directory, sym
+
+
+def make_archive(repo, ref):
+    """
+    Returns the bytes of a zip file laid out like a GitHub archive,
+    containing the test packages directory
+    """
+    buffer = io.BytesIO()
+    root = '{}-{}'.format(repo, ref)
+    with zipfile.ZipFile(buffer, 'w') as zip:
+        for dirpath, _, files in os.walk(test_package_dir):
+            for file in files:
+                if file.endswith('.py'):
+                    path = os.path.join(dirpath, file)
+                    name = os.path.relpath(path, test_package_dir)
+                    zip.write(path, '/'.join([root] + name.split(os.sep)))
+    return buffer.getvalue()
+
+
+class LocalGitHub(object):
+    """
+    Serves /<username>/<repo>/archive/<ref>.zip from the archives
+    dictionary and counts the requests made, and the archives sent
+    """
+    def __init__(self):
+        self.archives = {}
+        self.requests = []
+        self.downloads = []
+        github = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                github.requests.append(self.path)
+                archive = github.archives.get(self.path)
+                if archive is None:
+                    self.send_error(404)
+                    return
+                etag = '"{}"'.format(hashlib.sha1(archive).hexdigest())
+                if self.headers.get('If-None-Match') == etag:
+                    self.send_response(304)
+                    self.end_headers()
+                    return
+                github.downloads.append(self.path)
+                self.send_response(200)
+                self.send_header('ETag', etag)
+                self.send_header('Content-Length', str(len(archive)))
+                self.end_headers()
+                self.wfile.write(archive)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = HTTPServer(('127.0.0.1', 0), Handler)
+        self.url = 'http://127.0.0.1:{}'.format(self.server.server_port)
+        self.thread = threading.Thread(target=self.server.serve_forever,
+                                       daemon=True)
+        self.thread.start()
+
+    def add_archive(self, username, repo, ref, archive=None):
+        if archive is None:
+            archive = make_archive(repo, ref)
+        self.archives['/{}/{}/archive/{}.zip'.format(username, repo, ref)] = archive
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture(scope='module')
+def local_github(temp_module_directory):
+    """
+    Points github: locations at a local server with an archive of
+    the test packages available as testuser/testpackages at master,
+    and uses a download cache in a temporary directory
+    """
+    github = LocalGitHub()
+    github.add_archive('testuser', 'testpackages', 'master')
+    env = {sym.__github_url_env__: github.url,
+           sym.__download_cache_env__: os.path.join(temp_module_directory, 
+                                                    'download_cache')}
+    saved = {k: os.environ.get(k) for k in env}
+    os.environ.update(env)
+    yield github
+    for k, v in saved.items():
+        if v is None:
+            del os.environ[k]
+        else:
+            os.environ[k] = v
+    github.close()
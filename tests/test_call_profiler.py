@@ -0,0 +1,86 @@
+"""
+Calls of extensions can be profiled, and the profile written as
+pstats and collapsed stacks for flamegraphs
+"""
+import os, pstats
+import pandas as pd
+import pytest
+
+from fixtures.helpers import pdext_with_sources, sym
+
+profiled_extensions = '''
+import time
+
+def square(value):
+    return value * value
+
+def sum_of_squares(df, column):
+    return sum(square(v) for v in df[column].tolist())
+
+def wait(df, seconds):
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        square(2)
+    return len(df)
+
+def not_profiled(df):
+    return square(len(df))
+'''
+
+@pytest.fixture(scope='module')
+def profile_pdext(temp_module_directory):
+    with pdext_with_sources(temp_module_directory,
+                            {'profiled_exts.py': profiled_extensions}, 'prof',
+                            ['sum_of_squares', 'wait', 'not_profiled']) as (pdext, _):
+        yield pdext
+        pdext.unprofile()
+
+@pytest.fixture
+def df_numbers():
+    return pd.DataFrame({'a': range(100)})
+
+def test_deterministic_profile(profile_pdext, df_numbers, temp_function_directory):
+    output = os.path.join(temp_function_directory, 'profile')
+    with profile_pdext.profile('prof.sum_of_squares', output=output) as profiler:
+        for _ in range(3):
+            assert df_numbers.ext.prof.sum_of_squares('a') == 328350
+        df_numbers.ext.prof.not_profiled()
+    assert profiler.calls == {('prof', 'sum_of_squares'): 3}
+    # profiling has stopped
+    df_numbers.ext.prof.sum_of_squares('a')
+    assert profiler.calls[('prof', 'sum_of_squares')] == 3
+
+    stats = pstats.Stats(output + '.pstats')
+    calls = {func[2]: stat[1] for func, stat in stats.stats.items()}
+    assert calls['square'] == 300
+    assert calls['sum_of_squares'] == 3
+    assert 'not_profiled' not in calls
+
+    with open(output + '.collapsed') as f:
+        lines = f.read().splitlines()
+    stacks = [line.rsplit(' ', 1)[0].split(';') for line in lines]
+    assert all(stack[0] == 'prof.sum_of_squares' for stack in stacks)
+    assert all(int(line.rsplit(' ', 1)[1]) > 0 for line in lines)
+    square_stacks = [s for s in stacks if s[-1].startswith('square ')]
+    assert square_stacks
+    assert square_stacks[0][1].startswith('sum_of_squares (profiled_exts.py:')
+
+def test_sampling_profile(profile_pdext, df_numbers):
+    profiler = profile_pdext.profile('prof', mode='sampling', interval=0.001)
+    try:
+        df_numbers.ext.prof.wait(0.2)
+    finally:
+        profile_pdext.unprofile()
+    assert profiler.calls == {('prof', 'wait'): 1}
+    lines = profiler.collapsed().splitlines()
+    assert lines
+    assert sum(int(line.rsplit(' ', 1)[1]) for line in lines) > 10
+    assert all(line.startswith('prof.wait;wait (profiled_exts.py:') for line in lines)
+    stats = profiler.stats()
+    wait_stats = [stat for func, stat in stats.stats.items() if func[2] == 'wait']
+    assert wait_stats[0][3] > 0.02
+
+def test_profile_mode(profile_pdext):
+    with pytest.raises(ValueError):
+        profile_pdext.profile(mode='statistical')
+    assert profile_pdext.unprofile() is None
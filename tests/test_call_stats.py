@@ -0,0 +1,99 @@
+"""
+Calls of extensions can be instrumented, and the statistics
+returned as a dataframe or exported for Prometheus
+"""
+import os, stat, importlib, tracemalloc
+import pytest
+import pandas as pd
+
+LatencyHistogram = importlib.import_module('_pandex.repository.call_stats')\
+                        .LatencyHistogram
+default_file_mode = importlib.import_module('_pandex.repository.file_mode')\
+                        .default_file_mode
+
+def test_histogram_percentiles():
+    histogram = LatencyHistogram()
+    for value in range(1, 100001):
+        histogram.record(value)
+    for percent in [1, 50, 90, 99, 100]:
+        expected = percent * 1000
+        assert abs(histogram.percentile(percent) - expected) <= expected / 16
+    # only a few buckets are needed for a wide range of values
+    assert len(histogram.counts) < 250
+
+    small = LatencyHistogram()
+    for value in [3, 3, 7]:
+        small.record(value)
+    assert small.percentile(50) == 3
+    assert small.percentile(100) == 7
+    assert LatencyHistogram().percentile(50) is None
+
+def test_instrumented_calls(pdext_with_loaded_testpackages, temp_function_directory):
+    pd_ext, _ = pdext_with_loaded_testpackages
+    name = 'singlepy.calculate_circumference_from_radius'
+    df = pd.DataFrame({'numbers': range(10)})
+    try:
+        pd_ext.instrument('singlepy', memory=True)
+        for _ in range(3):
+            df.ext.singlepy.calculate_circumference_from_radius('numbers')
+        # not instrumented
+        df.ext.calculate_circumference_from_radius('numbers')
+
+        stats = pd_ext.stats()
+        assert list(stats.index) == [name]
+        row = stats.loc[name]
+        assert row['calls'] == 3
+        assert row['rows_in'] == 30
+        assert row['rows_out'] == 0
+        assert 0 < row['p50_ms'] <= row['max_ms'] <= row['total_ms']
+        assert row['peak_memory_bytes'] > 0
+
+        path = os.path.join(temp_function_directory, 'pandex.prom')
+        pd_ext.export_stats(path)
+        with open(path) as f:
+            exported = f.read()
+        assert 'pandex_extension_calls_total{{extension="{}"}} 3'.format(name) \
+                    in exported
+        assert 'pandex_extension_latency_seconds{{extension="{}",quantile="0.5"}}'\
+                    .format(name) in exported
+
+        assert len(pd_ext.stats(reset=True)) == 1
+        assert len(pd_ext.stats()) == 0
+    finally:
+        pd_ext.uninstrument()
+    df.ext.singlepy.calculate_circumference_from_radius('numbers')
+    assert len(pd_ext.stats()) == 0
+
+def test_failed_calls_recorded(pdext_with_loaded_testpackages, temp_function_directory):
+    pd_ext, _ = pdext_with_loaded_testpackages
+    name = 'singlepy.calculate_circumference_from_radius'
+    df = pd.DataFrame({'numbers': range(10)})
+    try:
+        pd_ext.instrument('singlepy')
+        df.ext.singlepy.calculate_circumference_from_radius('numbers')
+        with pytest.raises(KeyError):
+            df.ext.singlepy.calculate_circumference_from_radius('missing')
+        row = pd_ext.stats().loc[name]
+        assert (row['calls'], row['errors']) == (2, 1)
+
+        path = os.path.join(temp_function_directory, 'pandex.prom')
+        pd_ext.export_stats(path)
+        with open(path) as f:
+            assert 'pandex_extension_errors_total{{extension="{}"}} 1'\
+                        .format(name) in f.read()
+        assert stat.S_IMODE(os.stat(path).st_mode) == default_file_mode()
+    finally:
+        pd_ext.uninstrument()
+
+def test_memory_tracing_stopped(pdext_with_loaded_testpackages):
+    pd_ext, _ = pdext_with_loaded_testpackages
+    if tracemalloc.is_tracing():
+        pytest.skip('tracemalloc was started outside the tests')
+    try:
+        pd_ext.instrument(memory=True)
+        assert tracemalloc.is_tracing()
+        # still instrumented, but without tracing memory
+        pd_ext.instrument()
+        assert not tracemalloc.is_tracing()
+    finally:
+        pd_ext.uninstrument()
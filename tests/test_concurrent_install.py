@@ -0,0 +1,126 @@
+"""
+Processes sharing a repository can install and call the same
+extension at the same time.  Installers take the repository lock
+and swap in a complete new version of the module, so callers, which
+don't take the lock, only ever see a whole version
+"""
+import os, importlib, multiprocessing
+import pytest
+
+from fixtures.helpers import sym
+
+Extension = importlib.import_module('_pandex.extensions').Extension
+ExtensionSpecification = importlib.import_module('_pandex.repository.extension_spec')\
+                                .ExtensionSpecification
+RepositoryIndex = importlib.import_module('_pandex.repository.repository_index')\
+                        .RepositoryIndex
+repository_lock = importlib.import_module('_pandex.repository.repository_lock')
+
+pytestmark = pytest.mark.skipif(
+                repository_lock.fcntl is None or \
+                    'fork' not in multiprocessing.get_all_start_methods(),
+                reason='needs fcntl locks and forked processes')
+
+installers = 3
+callers = 3
+rounds = 15
+
+def install_extension(repo, sources, errors):
+    try:
+        for i in range(rounds):
+            spec = ExtensionSpecification(sym.__import_file_line_spec__\
+                        .format(sources[i % len(sources)], 'stress.value'), repo)
+            line, = spec.get_lines()
+            spec.install([line])
+            if line.status != 'installed':
+                raise line.error
+            RepositoryIndex(repo).update_extension('stress', 'value')
+    except Exception as e:
+        errors.put('installer: {!r}'.format(e))
+
+def call_extension(repo, done, errors):
+    try:
+        path = os.path.join(repo, 'stress', 'value')
+        calls = 0
+        while not done.is_set() or calls == 0:
+            ext = Extension(path)
+            ext._unload_module()
+            value = getattr(ext.imported_module, 'value')(None)
+            if value not in (1, 2):
+                raise ValueError('unexpected value {}'.format(value))
+            entry = RepositoryIndex(repo).collections['stress']['value']
+            if entry['init_values'] is None:
+                raise ValueError('index has a partly installed extension')
+            calls += 1
+    except Exception as e:
+        errors.put('caller: {!r}'.format(e))
+
+def test_concurrent_installs_and_calls(tmp_path):
+    repo = os.path.join(str(tmp_path), 'repo')
+    os.makedirs(repo)
+    sources = []
+    for value in (1, 2):
+        source = os.path.join(str(tmp_path), 'v{}'.format(value))
+        os.makedirs(source)
+        with open(os.path.join(source, 'value.py'), 'w') as f:
+            f.write('def value(df):\n    return {}\n'.format(value))
+        sources.append(source)
+    # installed once first so that callers have something to call
+    spec = ExtensionSpecification(sym.__import_file_line_spec__\
+                                    .format(sources[0], 'stress.value'), repo)
+    spec.install(list(spec.get_lines()))
+    RepositoryIndex(repo).update_extension('stress', 'value')
+
+    context = multiprocessing.get_context('fork')
+    errors = context.Queue()
+    done = context.Event()
+    writers = [context.Process(target=install_extension,
+                               args=(repo, sources[i:] + sources[:i], errors)) \
+                    for i in range(installers)]
+    readers = [context.Process(target=call_extension, args=(repo, done, errors)) \
+                    for _ in range(callers)]
+    for process in writers + readers:
+        process.start()
+    for process in writers:
+        process.join(120)
+    done.set()
+    for process in readers:
+        process.join(120)
+
+    reported = []
+    while not errors.empty():
+        reported.append(errors.get())
+    assert reported == []
+    assert all(p.exitcode == 0 for p in writers + readers)
+
+    # nothing is left half installed, and the replaced versions of
+    # the module go once they have expired
+    ext = Extension(os.path.join(repo, 'stress', 'value'))
+    assert not [name for name in os.listdir(ext.ext_info.path) \
+                    if '.link.' in name]
+    assert os.listdir(os.path.join(repo, sym.__repository_staging__)) == []
+    current = os.path.realpath(ext.ext_info.module_path)
+    ext._remove_versions(keep=current, lifetime=0)
+    assert [name for name in os.listdir(ext.ext_info.path) \
+                if '.version.' in name] == [os.path.basename(current)]
+    init_values = RepositoryIndex(repo).collections['stress']['value']['init_values']
+    assert init_values['install_location'].split(sym.__import_file_sep__)[0] \
+                in sources
+
+def test_staged_outside_the_collection(tmp_path):
+    repo = os.path.join(str(tmp_path), 'repo')
+    source = os.path.join(str(tmp_path), 'value.py')
+    with open(source, 'w') as f:
+        f.write('def value(df):\n    return 1\n')
+    spec = ExtensionSpecification(sym.__import_file_line_spec__\
+                                    .format(source, 'staging.value'), repo)
+    line, = spec.get_lines()
+    staged = line.extension.stage(line.extension_location)
+    # an importer or an index rebuild doesn't see a half installed
+    # extension in the collection
+    assert not os.path.exists(line.extension.ext_info.path)
+    assert 'staging' not in RepositoryIndex(repo).rebuild()
+    with repository_lock.RepositoryLock(repo):
+        line.extension.swap_in(staged)
+    assert not os.path.exists(staged)
+    assert Extension(line.extension.ext_info.path).imported_module.value(None) == 1
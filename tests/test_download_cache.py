@@ -0,0 +1,100 @@
+"""
+Archives from github: locations are downloaded once into a local
+cache and shared between installs.  A local server stands in 
+for GitHub (see fixtures/testgithub.py)
+"""
+import os, importlib
+import pytest
+
+from fixtures.helpers import save_current_installed_extensions, make_test_repos
+
+DownloadCache = importlib.import_module('_pandex.repository.download_cache')\
+                        .DownloadCache
+
+def test_archive_downloaded_once(local_github, temp_function_directory):
+    cache = DownloadCache(os.path.join(temp_function_directory, 'cache'))
+    local_github.requests.clear()
+    local_github.downloads.clear()
+
+    archive = cache.github_archive('testuser', 'testpackages', 'master')
+    assert os.path.isfile(archive)
+    assert len(local_github.downloads) == 1
+    # a branch is revalidated each time, but not downloaded again
+    assert cache.github_archive('testuser', 'testpackages', 'master') == archive
+    assert len(local_github.requests) == 2
+    assert len(local_github.downloads) == 1
+
+    # a changed archive on the server is downloaded
+    local_github.add_archive('testuser', 'testpackages', 'master', b'changed')
+    changed = cache.github_archive('testuser', 'testpackages', 'master')
+    assert changed != archive
+    with open(changed, 'rb') as f:
+        assert f.read() == b'changed'
+    local_github.add_archive('testuser', 'testpackages', 'master')
+
+def test_commit_refs_never_revalidated(local_github, temp_function_directory):
+    cache = DownloadCache(os.path.join(temp_function_directory, 'cache'))
+    commit = 'a' * 40
+    local_github.add_archive('testuser', 'testpackages', commit)
+    local_github.requests.clear()
+    cache.github_archive('testuser', 'testpackages', commit)
+    cache.github_archive('testuser', 'testpackages', commit)
+    assert len(local_github.requests) == 1
+
+def test_unreachable_server_uses_cache(local_github, temp_function_directory):
+    cache = DownloadCache(os.path.join(temp_function_directory, 'cache'))
+    archive = cache.github_archive('testuser', 'testpackages', 'master')
+    offline = DownloadCache(cache.cache_dir, github_url='http://127.0.0.1:1')
+    assert offline.github_archive('testuser', 'testpackages', 'master') == archive
+
+    with pytest.raises(Exception):
+        offline.github_archive('testuser', 'testpackages', 'not_cached')
+
+def test_least_recently_used_evicted(local_github, temp_function_directory):
+    cache = DownloadCache(os.path.join(temp_function_directory, 'cache'))
+    for ref in ['v1', 'v2', 'v3']:
+        local_github.add_archive('testuser', 'testpackages', ref, 
+                                 ref.encode() * 1000)
+    v1 = cache.github_archive('testuser', 'testpackages', 'v1')
+    os.utime(v1, (1, 1))
+    v2 = cache.github_archive('testuser', 'testpackages', 'v2')
+    os.utime(v2, (2, 2))
+    cache.max_bytes = 4500
+    v3 = cache.github_archive('testuser', 'testpackages', 'v3')
+    assert not os.path.exists(v1)
+    assert os.path.exists(v2) and os.path.exists(v3)
+
+    # an evicted archive is downloaded again
+    local_github.downloads.clear()
+    cache.github_archive('testuser', 'testpackages', 'v1')
+    assert len(local_github.downloads) == 1
+
+def test_install_from_local_github(local_github, temp_function_directory, 
+                                   df_X, sym):
+    with save_current_installed_extensions():
+        pdext = sym.pd_ext()
+        dfext = sym.df_ext(df_X)
+        make_test_repos(pdext, temp_function_directory)
+        local_github.downloads.clear()
+
+        # two extensions from different directories of the same archive
+        spec = '\n'.join([
+            sym.__import_file_line_spec__.format('github:testuser/testpackages/package1',
+                                'gh.calculate_circumference_from_radius'),
+            sym.__import_file_line_spec__.format('github:testuser/testpackages@master/package2',
+                                'gh.calculate_circumference_from_diameter'),
+        ])
+        pdext.import_extension(spec)
+        assert len(local_github.downloads) == 1
+
+        dfext.gh.calculate_circumference_from_radius('numbers')
+        dfext.gh.calculate_circumference_from_diameter('numbers')
+        assert 'circumference1_from_radius' in df_X
+        assert 'circumference2_from_diameter' in df_X
+
+        # reinstalling only checks that the branch hasn't moved
+        local_github.requests.clear()
+        pdext.reinstall_extension('gh.calculate_circumference_from_radius')
+        assert len(local_github.requests) == 1
+        assert len(local_github.downloads) == 1
+
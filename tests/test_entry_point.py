@@ -0,0 +1,64 @@
+"""
+The function an extension is named after is found by parsing the
+extension files rather than searching their text
+"""
+import os, importlib
+import pytest
+
+entry_point_module = importlib.import_module('_pandex.extensions.entry_point')
+find_entry_point = entry_point_module.find_entry_point
+
+def write_files(directory, files):
+    for name, content in files.items():
+        path = os.path.join(directory, *name.split('/'))
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w') as f:
+            f.write(content)
+
+def test_only_top_level_definitions_match(temp_function_directory):
+    write_files(temp_function_directory, {
+        'a_comment.py': '# def extension(df) is in b\n',
+        'b_string.py': 'doc = """def extension(df)"""\n',
+        'c_suffix.py': 'def extension_suffix(df):\n    pass\n',
+        'd_nested.py': 'def outer(df):\n    def extension(df):\n        pass\n',
+        'e_broken.py': 'def extension(df:\n',
+        'sub/real.py': '"""module"""\n\nasync def other(): pass\n'
+                       'def extension(df, column, *args, scale=1, **kwargs):\n'
+                       '    "Docstring"\n',
+    })
+    entry_point = find_entry_point(temp_function_directory, 'extension')
+    assert entry_point == {'file': 'sub.real', 'line': 4,
+                           'params': ['df', 'column', '*args', 
+                                      'scale', '**kwargs']}
+
+    with pytest.raises(ValueError):
+        find_entry_point(temp_function_directory, 'extension_suffi')
+
+def test_entry_point_recorded_at_install(pdext_with_loaded_testpackages):
+    pd_ext, _ = pdext_with_loaded_testpackages
+    ext = pd_ext.extension_collections['singlepy']\
+                                      ['calculate_circumference_from_radius']
+    init_values = ext.ext_info.read_init_values()
+    assert init_values['extension_file'] == 'package3'
+    assert init_values['extension_params'] == ['df', 'radius']
+    assert isinstance(init_values['extension_line'], int)
+
+def test_imported_libraries(temp_function_directory):
+    write_files(temp_function_directory, {
+        'a.py': 'import os.path, numpy as np\nfrom pandas import api\n'
+                'from . import b\nimport b\n',
+        'b.py': 'try:\n    import optional\nexcept ImportError:\n    pass\n'
+                'def f():\n    import lazy\n'
+                'from .sub.c import norm\n',
+        'sub/__init__.py': 'import yaml\n',
+        'sub/c.py': 'from scipy.stats import norm\nfrom .. import a\n',
+        'unused.py': 'import requests\n',
+    })
+    # only the modules imported from the entry file are followed
+    assert entry_point_module.imported_libraries(temp_function_directory, 'a') == \
+                ['numpy', 'os', 'pandas', 'scipy', 'yaml']
+    assert entry_point_module.imported_libraries(temp_function_directory, 
+                                                 'sub.c') == \
+                ['numpy', 'os', 'pandas', 'scipy', 'yaml']
+    assert entry_point_module.imported_libraries(temp_function_directory, 
+                                                 'unused') == ['requests']
@@ -0,0 +1,60 @@
+"""
+Check that resolved extensions are cached between calls
+and that the cache is invalidated when the repository changes
+"""
+
+def test_resolved_extension_is_cached(pdext_with_loaded_testpackages, df_X, sym):
+    pd_ext, df_ext = pdext_with_loaded_testpackages
+    pd_ext.new_search_order(['test1', 'test2'])
+
+    ext = df_ext(df_X)
+    first = ext.calculate_circumference_from_radius
+    assert ext.calculate_circumference_from_radius is first
+    assert ext.circle1.calculate_circumference_from_radius is \
+                ext.circle1.calculate_circumference_from_radius
+    usage = 'USAGE: df.{}.calculate_circumference_from_radius(radius)'\
+                .format(sym.__df_ext__)
+    assert usage in first.__doc__
+
+    # the underlying function is only resolved once per generation
+    generation = pd_ext._generation
+    func, enabled = pd_ext._resolve_extension(sym.__default_collection__,
+                                     'calculate_circumference_from_radius')
+    assert pd_ext._resolve_extension(sym.__default_collection__,
+                        'calculate_circumference_from_radius')[0] is func
+    assert pd_ext._generation == generation
+
+def test_cache_invalidated_by_repository_changes(pdext_with_loaded_testpackages,
+                                                 df_X):
+    pd_ext, df_ext = pdext_with_loaded_testpackages
+    pd_ext.new_search_order(['test1', 'test2'])
+    ext = df_ext(df_X)
+    
+    generation = pd_ext._generation
+    pd_ext.disable_extension('calculate_circumference_from_radius')
+    assert pd_ext._generation != generation
+    assert ext.calculate_circumference_from_radius('numbers') is None
+    assert 'circumference1_from_radius' not in df_X
+
+    generation = pd_ext._generation
+    pd_ext.enable_extension('calculate_circumference_from_radius')
+    assert pd_ext._generation != generation
+    ext.calculate_circumference_from_radius('numbers')
+    assert 'circumference1_from_radius' in df_X
+
+    # switching search order resolves to the other repository
+    pd_ext.new_search_order(['test2', 'test1'])
+    ext.calculate_circumference_from_radius('numbers')
+    assert 'circumference2_from_radius' in df_X
+
+def test_cache_doesnt_grow_with_changes(pdext_with_loaded_testpackages, df_X):
+    pd_ext, df_ext = pdext_with_loaded_testpackages
+    ext = df_ext(df_X)
+    collection = ext.circle1
+    for _ in range(5):
+        pd_ext._invalidate_extension_cache()
+        ext.calculate_circumference_from_radius
+        collection.calculate_circumference_from_radius
+    # only what was looked up in the current generation is kept
+    assert list(ext._resolved) == ['calculate_circumference_from_radius']
+    assert list(collection._bound) == ['calculate_circumference_from_radius']
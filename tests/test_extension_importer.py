@@ -0,0 +1,104 @@
+"""
+Extension files are imported with the import statement, and only
+installed again when they have changed
+"""
+import os, sys, importlib
+import pytest
+
+from fixtures.helpers import pdext_with_sources, sym
+
+ExtensionImporter = importlib.import_module('_pandex.extensions.extension_importer')\
+                        .ExtensionImporter
+
+@pytest.fixture(scope='module')
+def importer_pdext(temp_module_directory):
+    with pdext_with_sources(temp_module_directory,
+                            {'importer_exts.py': 'def first(df):\n    return 1\n\n'
+                                                 'def second(df):\n    return 2\n'}) \
+            as (pdext, sources):
+        yield pdext, sources['importer_exts.py']
+
+def import_file(module, lines):
+    with open(module + sym.__import_file_ext__, 'w') as f:
+        f.write('# extensions\n' + '\n'.join(lines) + '\n')
+
+def test_import_only_installs_changes(importer_pdext, tmp_path, monkeypatch):
+    pdext, source = importer_pdext
+    monkeypatch.chdir(tmp_path)
+    imports = []
+    import_extension = pdext._import_extension
+    def counted(spec, *args, **kwargs):
+        imports.append(spec)
+        return import_extension(spec, *args, **kwargs)
+    monkeypatch.setattr(pdext, '_import_extension', counted)
+
+    import_file('importer_spec', [sym.__import_file_line_spec__\
+                                    .format(source, 'imp.first')])
+    module = importlib.import_module('importer_spec')
+    assert len(imports) == 1
+    assert pdext._get_extension_from_collection('imp.first')(None) == 1
+
+    # the file hasn't changed and its extension is installed
+    del sys.modules['importer_spec']
+    module = importlib.import_module('importer_spec')
+    assert len(imports) == 1
+
+    # a new line is installed
+    import_file('importer_spec', [sym.__import_file_line_spec__\
+                                    .format(source, 'imp.' + name) \
+                                        for name in ('first', 'second')])
+    importlib.reload(module)
+    assert len(imports) == 2
+    assert pdext._get_extension_from_collection('imp.second')(None) == 2
+
+    # a line changed to a new location is installed again, even when
+    # the file isn't parsed again (as in a new process)
+    moved = os.path.join(os.path.dirname(source), 'importer_moved')
+    os.makedirs(moved, exist_ok=True)
+    with open(os.path.join(moved, 'first.py'), 'w') as f:
+        f.write('def first(df):\n    return 10\n')
+    import_file('importer_spec', [sym.__import_file_line_spec__\
+                                    .format(moved, 'imp.first')])
+    importer = ExtensionImporter()
+    content, lines = importer._read_import_file(str(tmp_path.joinpath(
+                                    'importer_spec' + sym.__import_file_ext__)))
+    assert importer._changed_lines(pdext, lines) == \
+                [sym.__import_file_line_spec__.format(moved, 'imp.first')]
+    importlib.reload(module)
+    assert len(imports) == 3
+    assert pdext._get_extension_from_collection('imp.first')(None) == 10
+    assert importer._changed_lines(pdext, lines) == []
+
+    # a failed install leaves the installed extension as it was
+    broken = os.path.join(os.path.dirname(source), 'importer_broken')
+    os.makedirs(broken, exist_ok=True)
+    with open(os.path.join(broken, 'first.py'), 'w') as f:
+        f.write('def not_first(df):\n    return 20\n')
+    import_file('importer_spec', [sym.__import_file_line_spec__\
+                                    .format(broken, 'imp.first')])
+    with pytest.raises(Exception):
+        importlib.reload(module)
+    assert pdext._get_extension_from_collection('imp.first')(None) == 10
+    del sys.modules['importer_spec']
+
+def test_missing_imports_remembered(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    importer = ExtensionImporter()
+    assert importer.find_spec('not_an_extension_file') is None
+    assert (str(tmp_path), 'not_an_extension_file') in importer._missing
+
+    # not looked for again until the caches are invalidated
+    import_file('not_an_extension_file', [])
+    assert importer.find_spec('not_an_extension_file') is None
+    importer.invalidate_caches()
+    spec = importer.find_spec('not_an_extension_file')
+    assert spec.origin == os.path.join(str(tmp_path), 'not_an_extension_file' + \
+                                                      sym.__import_file_ext__)
+
+def test_parsed_file_reused(tmp_path):
+    importer = ExtensionImporter()
+    path = os.path.join(str(tmp_path), 'spec')
+    import_file(path, ['/some/location -> coll.ext'])
+    content, lines = importer._read_import_file(path + sym.__import_file_ext__)
+    assert lines == [('/some/location', 'coll.ext')]
+    assert importer._read_import_file(path + sym.__import_file_ext__)[1] is lines
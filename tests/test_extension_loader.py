@@ -0,0 +1,63 @@
+"""
+Installed extension modules are imported under their own namespace
+without changing sys.path
+"""
+import os, sys, importlib, threading
+
+def test_imported_under_namespace(pdext_with_loaded_testpackages, sym):
+    pd_ext, df_ext = pdext_with_loaded_testpackages
+    sys_path = list(sys.path)
+
+    ext = pd_ext._get_extension_object('calculate_circumference_from_radius',
+                                       'singlepy')
+    ext._unload_module()
+    ext._imported_module = None
+    module = ext.imported_module
+    assert module.__name__ == '{}.{}'.format(sym.__extension_modules__,
+                                             ext.ext_info.module)
+    assert sys.modules[module.__name__] is module
+    assert module.__path__ == [os.path.realpath(ext.ext_info.module_path)]
+    assert sys.path == sys_path
+
+    # unloading removes the module and its sub modules
+    ext._unload_module()
+    assert not [name for name in sys.modules \
+                    if name.startswith(module.__name__)]
+
+def test_found_from_repository(pdext_with_loaded_testpackages, sym):
+    pd_ext, df_ext = pdext_with_loaded_testpackages
+    finder = importlib.import_module('_pandex.extensions.extension_loader')\
+                        .ExtensionModuleFinder()
+
+    # a module which hasn't been registered is looked up in the
+    # extensions of the repository
+    ext = pd_ext._get_extension_object('calculate_circumference_from_diameter',
+                                       'singlepy')
+    spec = finder.find_spec('{}.{}'.format(sym.__extension_modules__,
+                                           ext.ext_info.module))
+    assert spec.submodule_search_locations == [os.path.realpath(ext.ext_info.module_path)]
+
+    assert finder.find_spec(sym.__extension_modules__ + '.not_installed') is None
+    assert finder.find_spec('os') is None
+
+def test_import_in_threads(pdext_with_loaded_testpackages):
+    pd_ext, df_ext = pdext_with_loaded_testpackages
+    exts = [ext for extensions in pd_ext.extension_collections.values() \
+                for ext in extensions.values()]
+    for ext in exts:
+        ext._unload_module()
+        ext._imported_module = None
+
+    errors = []
+    def load(ext):
+        try:
+            ext.imported_module
+        except Exception as e:
+            errors.append(e)
+    threads = [threading.Thread(target=load, args=(ext,)) for ext in exts]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert errors == []
+    assert all(ext._imported_module is not None for ext in exts)
@@ -0,0 +1,111 @@
+"""
+Extension files are extracted from GitHub archives by directory,
+straight into the install location
+"""
+import os, io, zipfile, importlib
+import pytest
+
+ExtensionLocation = importlib.import_module('_pandex.repository.extension_location')\
+                        .ExtensionLocation
+
+def zip_bytes(files):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w') as zip:
+        for name, content in files.items():
+            zip.writestr(name, content)
+    return buffer.getvalue()
+
+def installed_files(directory):
+    return sorted(os.path.relpath(os.path.join(root, f), directory)\
+                        .replace(os.sep, '/')
+                  for root, _, files in os.walk(directory) for f in files)
+
+def test_only_requested_directory_extracted(local_github, temp_function_directory):
+    # the tag name doesn't match the archive's top level directory
+    local_github.add_archive('testuser', 'mono', 'v1.0', zip_bytes({
+        'mono-1.0/': '',
+        'mono-1.0/ext/': '',
+        'mono-1.0/ext/a.py': 'def a(df): pass',
+        'mono-1.0/ext/sub/b.py': 'def b(df): pass',
+        'mono-1.0/ext_other/c.py': 'def c(df): pass',
+        'mono-1.0/other/ext/d.py': 'def d(df): pass',
+        'mono-1.0/single.py': 'def single(df): pass',
+    }))
+
+    location = ExtensionLocation('github:testuser/mono@v1.0/ext')
+    target = os.path.join(temp_function_directory, 'ext')
+    location.install_into(target)
+    assert installed_files(target) == ['a.py', 'sub/b.py']
+    
+    # the archive was only listed once, and is reused
+    members = location._archive_members
+    target2 = os.path.join(temp_function_directory, 'ext2')
+    location.install_into(target2)
+    assert location._archive_members is members
+    assert installed_files(target2) == ['a.py', 'sub/b.py']
+
+    location = ExtensionLocation('github:testuser/mono@v1.0/single.py')
+    target = os.path.join(temp_function_directory, 'single')
+    location.install_into(target)
+    assert installed_files(target) == ['single.py']
+
+    location = ExtensionLocation('github:testuser/mono@v1.0/ex')
+    with pytest.raises(ValueError):
+        location.install_into(os.path.join(temp_function_directory, 'ex'))
+
+def test_unsafe_archive_paths_rejected(local_github, temp_function_directory):
+    local_github.add_archive('testuser', 'unsafe', 'master', zip_bytes({
+        'unsafe-master/ext/../../escaped.py': 'def a(df): pass',
+    }))
+    location = ExtensionLocation('github:testuser/unsafe/ext')
+    with pytest.raises(ValueError):
+        location.install_into(os.path.join(temp_function_directory, 'ext'))
+    assert not os.path.exists(os.path.join(temp_function_directory, 
+                                           'escaped.py'))
+
+def make_source(directory):
+    os.makedirs(os.path.join(directory, 'sub'))
+    for name, content in {'__init__.py': '# original\n',
+                          'ext.py': 'def ext(df): pass\n',
+                          'sub/helper.py': 'x = 1\n'}.items():
+        with open(os.path.join(directory, name), 'w') as f:
+            f.write(content)
+    os.makedirs(os.path.join(directory, '__pycache__'))
+    return directory
+
+@pytest.mark.parametrize('link', ['copy', 'hard', 'sym'])
+def test_local_install_link_modes(temp_function_directory, link):
+    source = make_source(os.path.join(temp_function_directory, 'source'))
+    target = os.path.join(temp_function_directory, 'target')
+    ExtensionLocation(source).install_into(target, link)
+    assert installed_files(target) == ['__init__.py', 'ext.py', 'sub/helper.py']
+
+    for name in ['ext.py', 'sub/helper.py']:
+        installed = os.path.join(target, name)
+        original = os.path.join(source, name)
+        assert os.path.islink(installed) == (link == 'sym')
+        assert os.path.samefile(installed, original) == (link != 'copy')
+
+    # __init__.py is rewritten during the install so is always a copy
+    init_py = os.path.join(target, '__init__.py')
+    assert not os.path.islink(init_py)
+    assert not os.path.samefile(init_py, os.path.join(source, '__init__.py'))
+
+def test_linked_sub_directories_installed(temp_function_directory):
+    source = make_source(os.path.join(temp_function_directory, 'source'))
+    shared = make_source(os.path.join(temp_function_directory, 'shared'))
+    os.symlink(shared, os.path.join(source, 'linked'))
+    # a link back up the tree is not followed forever
+    os.symlink(source, os.path.join(source, 'sub', 'loop'))
+    target = os.path.join(temp_function_directory, 'target')
+    ExtensionLocation(source).install_into(target)
+    assert installed_files(target) == ['__init__.py', 'ext.py', 
+                                       'linked/__init__.py', 'linked/ext.py',
+                                       'linked/sub/helper.py', 'sub/helper.py']
+
+def test_invalid_link_mode(temp_function_directory):
+    source = make_source(os.path.join(temp_function_directory, 'source'))
+    with pytest.raises(ValueError):
+        ExtensionLocation(source).install_into(
+                            os.path.join(temp_function_directory, 'target'), 
+                            'junction')
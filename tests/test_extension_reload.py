@@ -0,0 +1,60 @@
+"""
+Extension modules are only imported again from disk when
+the installed files have changed
+"""
+import os
+
+def test_reload_only_when_changed(pdext_with_loaded_testpackages, df_X, sym):
+    pd_ext, df_ext = pdext_with_loaded_testpackages
+    pd_ext.new_search_order(['test1', 'test2'])
+
+    ext = pd_ext._get_extension_object('calculate_circumference_from_radius',
+                                       'singlepy')
+    module = ext.imported_module
+    assert ext.is_stale == False
+
+    # nothing has changed so the same module is kept
+    pd_ext._get_extension_object('calculate_circumference_from_radius',
+                                 'singlepy')
+    assert ext.imported_module is module
+
+    # change the extension file on disk
+    extension_file = os.path.join(ext.ext_info.module_path,
+                                  ext.ext_info.matched_file + '.py')
+    with open(extension_file) as f:
+        original = f.read()
+    with open(extension_file, 'a') as f:
+        f.write('\ndef calculate_circumference_from_radius(df, radius):\n'
+                '    """Changed"""\n'
+                '    df["changed"] = df[radius]\n')
+    assert ext.is_stale == True
+
+    pd_ext._get_extension_object('calculate_circumference_from_radius',
+                                 'singlepy')
+    assert ext.imported_module is not module
+    assert ext.is_stale == False
+
+    f = pd_ext._get_extension_from_collection('singlepy.calculate_circumference_from_radius')
+    f(df_X, 'numbers')
+    assert 'changed' in df_X
+    assert 'Changed' in f.__doc__
+
+    # restoring the original file is also picked up
+    with open(extension_file, 'w') as f:
+        f.write(original)
+    f = pd_ext._get_extension_from_collection('singlepy.calculate_circumference_from_radius')
+    f(df_X, 'numbers')
+    assert 'circumference3_from_radius' in df_X
+    assert 'Changed' not in f.__doc__
+
+def test_enabled_flag_change_reloads(pdext_with_loaded_testpackages):
+    pd_ext, df_ext = pdext_with_loaded_testpackages
+
+    ext = pd_ext._get_extension_object('calculate_circumference_from_diameter',
+                                       'singlepy')
+    module = ext.imported_module
+    pd_ext.disable_extension('singlepy.calculate_circumference_from_diameter')
+    assert ext.imported_module is not module
+    assert ext.imported_module.init_values['enabled'] == False
+    pd_ext.enable_extension('singlepy.calculate_circumference_from_diameter')
+    assert ext.imported_module.init_values['enabled'] == True
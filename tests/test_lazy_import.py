@@ -0,0 +1,43 @@
+"""
+In lazy mode the repository is only built when it is first used
+"""
+import os, sys, subprocess
+
+lazy_script = """
+import sys
+import {pdext} as pd
+assert type(pd.{pd_ext}).__name__ == 'LazyExtensionRepository'
+# nothing has been read from the config file yet
+assert 'yaml' not in sys.modules
+assert '{pdext}.repository.ExtensionRepository' not in sys.modules
+
+df = pd.DataFrame({{'x': [1, 2]}})
+assert hasattr(df.{df_ext}, 'not_an_extension') == False
+
+# the real repository has now replaced the proxy
+assert type(pd.{pd_ext}).__name__ == 'ExtensionRepository'
+assert 'yaml' in sys.modules
+"""
+
+def test_lazy_repository(sym):
+    env = dict(os.environ)
+    env[sym.__lazy_env__] = '1'
+    script = lazy_script.format(pdext=sym.__pdext__, pd_ext=sym.__pd_ext__,
+                                df_ext=sym.__df_ext__)
+    result = subprocess.run([sys.executable, '-c', script], env=env,
+                            stderr=subprocess.PIPE, universal_newlines=True)
+    assert result.returncode == 0, result.stderr
+
+def test_lazy_proxy_passes_through(sym):
+    LazyExtensionRepository = __import__('_pandex.repository', 
+                    fromlist=['LazyExtensionRepository']).LazyExtensionRepository
+    import pandas as pd
+    real = sym.pd_ext()
+    try:
+        proxy = LazyExtensionRepository()
+        setattr(pd, sym.__pd_ext__, proxy)
+        assert 'not yet loaded' in repr(proxy)
+        assert proxy.default_repository == real.default_repository
+        assert sym.pd_ext() is not proxy
+    finally:
+        setattr(pd, sym.__pd_ext__, real)
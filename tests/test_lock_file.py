@@ -0,0 +1,111 @@
+"""
+A lock file records what was installed for each line of a spec,
+so that unchanged specs aren't installed again
+"""
+import os, json
+import pytest
+
+from fixtures.helpers import pdext_with_sources, sym
+
+@pytest.fixture(scope='module')
+def lock_pdext(temp_module_directory):
+    names = {'first': 1, 'second': 2, 'third': 3}
+    with pdext_with_sources(temp_module_directory,
+                            {name + '.py': 'def {}(df):\n    return {}\n'.format(name, value) \
+                                for name, value in names.items()}) as (pdext, sources):
+        yield pdext, {name: sources[name + '.py'] for name in names}
+
+def write_spec(path, sources, names):
+    with open(path, 'w') as f:
+        f.write('\n'.join(sym.__import_file_line_spec__\
+                            .format(sources[name], 'lock.' + name) \
+                                for name in names) + '\n')
+
+def read_lock(path):
+    with open(path + sym.__lock_file_ext__) as f:
+        return json.load(f)
+
+@pytest.fixture
+def counted_imports(lock_pdext, monkeypatch):
+    pdext, sources = lock_pdext
+    imports = []
+    import_extension = pdext._import_extension
+    def counted(spec, *args, **kwargs):
+        imports.append(spec)
+        return import_extension(spec, *args, **kwargs)
+    monkeypatch.setattr(pdext, '_import_extension', counted)
+    return imports
+
+def test_lock_and_import(lock_pdext, counted_imports, tmp_path):
+    pdext, sources = lock_pdext
+    spec_file = os.path.join(str(tmp_path), 'exts' + sym.__import_file_ext__)
+    write_spec(spec_file, sources, ['first', 'second'])
+
+    umask = os.umask(0o022)
+    try:
+        pdext.lock(spec_file)
+    finally:
+        os.umask(umask)
+    assert len(counted_imports) == 1
+    assert os.stat(spec_file + sym.__lock_file_ext__).st_mode & 0o777 == 0o644
+    lock = read_lock(spec_file)
+    assert [line['extension'] for line in lock['lines']] == \
+                [sym.__import_file_line_spec__.format(sources[name], 'lock.' + name) \
+                    for name in ('first', 'second')]
+    # installed from local files, so the module has the same files
+    assert all(line['source'] == line['module'] for line in lock['lines'])
+    assert pdext._get_extension_from_collection('lock.second')(None) == 2
+
+    # nothing has changed
+    with open(spec_file) as f:
+        spec = f.read()
+    pdext._import_locked(spec, spec_file + sym.__lock_file_ext__)
+    pdext.lock(spec_file)
+    assert len(counted_imports) == 1
+    assert read_lock(spec_file) == lock
+
+    # a new line is installed on its own
+    write_spec(spec_file, sources, ['first', 'second', 'third'])
+    with open(spec_file) as f:
+        spec = f.read()
+    pdext._import_locked(spec, spec_file + sym.__lock_file_ext__)
+    assert counted_imports[-1] == sym.__import_file_line_spec__\
+                                        .format(sources['third'], 'lock.third')
+    assert len(read_lock(spec_file)['lines']) == 3
+    pdext._import_locked(spec, spec_file + sym.__lock_file_ext__)
+    assert len(counted_imports) == 2
+
+    # only the line whose files have changed is installed again
+    with open(sources['first'], 'w') as f:
+        f.write('def first(df):\n    return 10\n')
+    pdext.lock(spec_file)
+    assert counted_imports[-1] == sym.__import_file_line_spec__\
+                                        .format(sources['first'], 'lock.first')
+    assert pdext._get_extension_from_collection('lock.first')(None) == 10
+
+def test_lock_spec_needs_lock_file(lock_pdext):
+    pdext, sources = lock_pdext
+    spec = sym.__import_file_line_spec__.format(sources['first'], 'lock.first')
+    with pytest.raises(ValueError):
+        pdext.lock(spec)
+
+def test_install_in_same_second_detected(lock_pdext, counted_imports, tmp_path):
+    pdext, sources = lock_pdext
+    spec_file = os.path.join(str(tmp_path), 'same' + sym.__import_file_ext__)
+    write_spec(spec_file, sources, ['second'])
+    pdext.lock(spec_file)
+    lock_file = spec_file + sym.__lock_file_ext__
+    installed = len(counted_imports)
+
+    # as if the lock was written for another install made in the
+    # same second, which has the same install time
+    lock = read_lock(spec_file)
+    lock['lines'][0]['module'] = 'another install'
+    lock['state'] = 'another state'
+    with open(lock_file, 'w') as f:
+        json.dump(lock, f)
+    with open(spec_file) as f:
+        pdext._import_locked(f.read(), lock_file)
+    assert len(counted_imports) == installed + 1
+    assert read_lock(spec_file)['lines'][0]['module'] == \
+                read_lock(spec_file)['lines'][0]['source']
@@ -0,0 +1,176 @@
+"""
+Extensions which declare a partitioning contract can be run on
+chunks of the dataframe in a pool of threads or processes
+"""
+import os, pickle, importlib
+from concurrent.futures import ProcessPoolExecutor
+import pandas as pd
+import pytest
+
+from fixtures.helpers import pdext_with_sources, sym
+
+parallel_extensions = '''
+import os
+
+def add_total(df, a, b):
+    """Adds a total column"""
+    df['total'] = df[a] + df[b]
+    df['chunk_rows'] = len(df)
+add_total.pdext_partition = 'rows'
+
+def doubled(df, column):
+    return df[column] * 2
+doubled.pdext_partition = 'rows'
+
+def worker_pids(df):
+    return [os.getpid()]
+worker_pids.pdext_partition = 'rows'
+
+def column_sum(df, column):
+    return df[column].sum()
+column_sum.pdext_partition = 'reduce'
+column_sum.pdext_combine = sum
+
+def no_combine(df):
+    return len(df)
+no_combine.pdext_partition = 'reduce'
+
+def whole_frame(df):
+    return len(df)
+
+def repo(df):
+    return 'repo extension'
+
+def collection(df):
+    return 'collection extension'
+'''
+
+@pytest.fixture(scope='module')
+def parallel_pdext(temp_module_directory):
+    with pdext_with_sources(temp_module_directory,
+                            {'parallel_exts.py': parallel_extensions}, 'par',
+                            ['add_total', 'doubled', 'worker_pids', 
+                             'column_sum', 'no_combine', 'whole_frame',
+                             'repo', 'collection']) as (pdext, _):
+        yield pdext
+
+@pytest.fixture
+def df_numbers():
+    return pd.DataFrame({'a': range(100), 'b': range(100, 200)},
+                        index=range(1000, 1100))
+
+@pytest.mark.parametrize('executor', ['thread', 'process'])
+def test_row_wise_changes_copied_back(parallel_pdext, df_numbers, executor):
+    par = df_numbers.ext.parallel(workers=2, chunks=4, executor=executor).par
+    assert par.add_total('a', 'b') is None
+    assert list(df_numbers['total']) == list(range(100, 300, 2))
+    assert set(df_numbers['chunk_rows']) == {25}
+    assert 'Adds a total column' in par.add_total.__doc__
+
+@pytest.mark.parametrize('executor', ['thread', 'process'])
+def test_row_wise_results_concatenated(parallel_pdext, df_numbers, executor):
+    par = df_numbers.ext.parallel(workers=3, executor=executor).par
+    result = par.doubled('a')
+    assert result.equals(df_numbers['a'] * 2)
+
+    # results that can't be concatenated are returned in chunk order
+    pids = par.worker_pids()
+    assert len(pids) == 3
+    if executor == 'process':
+        assert os.getpid() not in [p[0] for p in pids]
+
+def test_reduce_and_whole_frame(parallel_pdext, df_numbers):
+    par = df_numbers.ext.parallel(workers=2, chunks=10).par
+    assert par.column_sum('b') == df_numbers['b'].sum()
+    # no partition declared, so the whole frame is used
+    assert par.whole_frame() == 100
+    with pytest.raises(ValueError):
+        par.no_combine
+    with pytest.raises(AttributeError):
+        par.not_an_extension
+
+def test_invalid_parallel_options(parallel_pdext, df_numbers):
+    with pytest.raises(ValueError):
+        df_numbers.ext.parallel(executor='gpu')
+    with pytest.raises(ValueError):
+        df_numbers.ext.parallel(chunks=0)
+
+@pytest.mark.parametrize('executor', ['thread', 'process'])
+def test_map_over_frames(parallel_pdext, executor):
+    frames = (pd.DataFrame({'a': [i] * 3, 'b': [1] * 3}) for i in range(20))
+    results = list(parallel_pdext.map('par.add_total', frames, workers=2,
+                                      args=('a', 'b'), executor=executor,
+                                      max_in_flight=3))
+    # the extension changes each frame, so the frames are returned
+    assert [r['total'][0] for r in results] == [i + 1 for i in range(20)]
+
+    frames = [pd.DataFrame({'a': [i]}) for i in range(20)]
+    results = parallel_pdext.map('par.doubled', frames, workers=2, 
+                                 ordered=False, kwargs={'column': 'a'},
+                                 executor=executor)
+    assert sorted(r[0] for r in results) == [2 * i for i in range(20)]
+
+def test_map_bounded_and_stoppable(parallel_pdext):
+    taken = []
+    def frames():
+        for i in range(100):
+            taken.append(i)
+            yield pd.DataFrame({'a': [i]})
+    results = parallel_pdext.map('par.doubled', frames(), workers=2, 
+                                 args=('a',), executor='thread',
+                                 max_in_flight=4)
+    assert next(results)[0] == 0
+    assert len(taken) <= 5
+    results.close()
+
+    with pytest.raises(KeyError):
+        parallel_pdext.map('par.not_an_extension', [])
+
+def test_bound_extension_pickles(parallel_pdext, df_numbers):
+    doubled = df_numbers.ext.par.doubled
+    copy = pickle.loads(pickle.dumps(doubled))
+    assert copy is not doubled
+    assert copy('a').equals(df_numbers['a'] * 2)
+    assert copy.__doc__ == doubled.__doc__
+
+    with ProcessPoolExecutor(max_workers=1) as pool:
+        assert pool.submit(doubled, 'b').result().equals(df_numbers['b'] * 2)
+        pid = pool.submit(df_numbers.ext.par.worker_pids).result()
+    assert pid != [os.getpid()]
+
+    # a different install of the extension isn't used
+    rebind = importlib.import_module('_pandex.extensions.collection')\
+                        ._rebind_extension
+    _, args = doubled.__reduce__()
+    with pytest.raises(ValueError):
+        rebind(*args[:-1], 'different install hash')
+    with pytest.raises(ValueError):
+        rebind(args[0], 'par', 'not_installed', *args[3:])
+
+def test_extension_names_not_shadowed(parallel_pdext, df_numbers):
+    # the collection keeps its own state in private attributes
+    par = df_numbers.ext.par
+    assert par.repo() == 'repo extension'
+    assert par.collection() == 'collection extension'
+
+def test_reserved_names_rejected(parallel_pdext, temp_module_directory):
+    source = os.path.join(temp_module_directory, 'parallel_exts.py')
+    spec = '\n'.join(sym.__import_file_line_spec__.format(source, name) \
+                        for name in ['parallel', 'pipe_lazy', 'parallel.doubled'])
+    with pytest.raises(ValueError, match='is a method of df.ext'):
+        parallel_pdext.import_extension(spec)
+    report = parallel_pdext.last_import_report
+    assert len(report.failed) == 3
+    assert 'parallel' not in parallel_pdext.extension_collections
+    assert isinstance(pd.DataFrame().ext.parallel(), 
+                      importlib.import_module('_pandex.extensions.parallel')\
+                            .ParallelExtensionManager)
+
+def test_single_chunk_is_wrapped(parallel_pdext, df_numbers):
+    try:
+        parallel_pdext.instrument('par')
+        result = df_numbers.ext.parallel(chunks=1).par.doubled('a')
+        assert list(result) == list(range(0, 200, 2))
+        assert parallel_pdext.stats().loc['par.doubled', 'calls'] == 1
+    finally:
+        parallel_pdext.uninstrument()
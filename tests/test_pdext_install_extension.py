@@ -1,3 +1,4 @@
+import os
 from datetime import datetime
 import pytest
 
@@ -115,3 +116,84 @@ def test_nested_extension_install(temp_function_directory, sym,df_X,testpackage1
         # Test execution of the nested radius extension
         dfext.calculate_circumference_from_radius_nested('numbers')
         assert 'circumference1_from_radius_nested' in df_X.columns
+
+def test_batch_install_report(temp_function_directory, sym, df_X, 
+                              testpackage1, testpackage3):
+    with save_current_installed_extensions():
+        pdext = sym.pd_ext()
+        dfext = sym.df_ext(df_X)
+        make_test_repos(pdext, temp_function_directory)
+
+        spec = '\n'.join([
+            sym.__import_file_line_spec__.format(testpackage1, 
+                                    'batch.calculate_circumference_from_radius'),
+            sym.__import_file_line_spec__.format(testpackage3, 
+                                    'batch.calculate_circumference_from_diameter'),
+            sym.__import_file_line_spec__.format('/path/does/not/exist', 
+                                    'batch.no_extension'),
+            sym.__import_file_line_spec__.format(testpackage1, 
+                                    'batch.calculate_circumference_from_radius'),
+        ])
+        # the bad location is reported, but doesn't stop the others
+        with pytest.raises(ValueError):
+            pdext.import_extension(spec, workers=4)
+        report = pdext.last_import_report
+        assert [l['status'] for l in report.lines] == \
+                    ['installed', 'installed', 'failed', 'duplicate']
+        assert 'Invalid location' in str(report.lines[2]['error'])
+        assert report.seconds >= max(l['seconds'] for l in report.lines)
+        assert '4 lines imported' in str(report)
+
+        dfext.batch.calculate_circumference_from_radius('numbers')
+        dfext.batch.calculate_circumference_from_diameter('numbers')
+        assert 'circumference1_from_radius' in df_X.columns
+        assert 'circumference3_from_diameter' in df_X.columns
+        assert hasattr(dfext.batch, 'no_extension') == False
+
+        # nothing to do the second time
+        pdext.import_extension(spec.splitlines()[0])
+        assert pdext.last_import_report.lines[0]['status'] == 'already installed'
+
+        # a directory left in the repository which isn't a whole
+        # extension is reported on its line
+        repo = pdext._repository_path(pdext.default_repository)
+        os.makedirs(os.path.join(repo, 'batch', 'leftover'))
+        spec = '\n'.join([
+            sym.__import_file_line_spec__.format(testpackage1, 'batch.leftover'),
+            sym.__import_file_line_spec__.format(testpackage1, 
+                                    'batch.calculate_circumference_from_radius'),
+        ])
+        with pytest.raises(ValueError):
+            pdext.import_extension(spec)
+        report = pdext.last_import_report
+        assert [l['status'] for l in report.lines] == ['failed', 'already installed']
+        assert 'batch.leftover' in str(report.lines[0]['error'])
+
+def test_symlinked_install_follows_source(temp_function_directory, sym, df_X):
+    with save_current_installed_extensions():
+        pdext = sym.pd_ext()
+        dfext = sym.df_ext(df_X)
+        make_test_repos(pdext, temp_function_directory)
+
+        source = os.path.join(temp_function_directory, 'linked_source.py')
+        with open(source, 'w') as f:
+            f.write('def linked(df):\n'
+                    '    """Linked extension"""\n'
+                    '    df["linked"] = 1\n')
+        pdext.import_extension(sym.__import_file_line_spec__.format(source, 
+                                                    'linked.linked'), link='sym')
+        dfext.linked.linked()
+        assert 'linked' in df_X.columns
+        
+        # the original file is untouched by the install
+        with open(source) as f:
+            assert 'init_values' not in f.read()
+
+        # edits to the source are picked up without reinstalling
+        with open(source, 'a') as f:
+            f.write('\ndef linked(df):\n'
+                    '    """Edited"""\n'
+                    '    df["edited"] = 1\n')
+        f = pdext._get_extension_from_collection('linked.linked')
+        f(df_X)
+        assert 'edited' in df_X.columns
@@ -0,0 +1,91 @@
+"""
+Chains of extension calls can be recorded with pipe_lazy() and
+run chunk by chunk when they are collected
+"""
+import os
+import pandas as pd
+import pytest
+
+from fixtures.helpers import pdext_with_sources, sym
+
+pipeline_extensions = '''
+def add_one(df, column):
+    return df.assign(**{column: df[column] + 1})
+add_one.pdext_partition = 'rows'
+
+def chunk_rows(df):
+    """Changes the dataframe it is given"""
+    df['chunk_rows'] = len(df)
+chunk_rows.pdext_partition = 'rows'
+
+def share(df, column):
+    return df.assign(share=df[column] / df[column].sum())
+
+def total(df, column):
+    return df[column].sum()
+total.pdext_partition = 'reduce'
+total.pdext_combine = sum
+
+def not_combined(df):
+    return len(df)
+not_combined.pdext_partition = 'reduce'
+'''
+
+@pytest.fixture(scope='module')
+def pipeline_pdext(temp_module_directory):
+    with pdext_with_sources(temp_module_directory,
+                            {'pipeline_exts.py': pipeline_extensions}, 'lazy',
+                            ['add_one', 'chunk_rows', 'share', 'total',
+                             'not_combined']) as (pdext, _):
+        yield pdext
+
+@pytest.fixture
+def df_numbers():
+    return pd.DataFrame({'a': range(10)}, index=range(100, 110))
+
+def test_rows_steps_run_in_chunks(pipeline_pdext, df_numbers):
+    pipeline = df_numbers.ext.pipe_lazy(chunk_rows=4)\
+                    .lazy.add_one('a').lazy.chunk_rows().lazy.add_one('a')
+    assert repr(pipeline) == \
+            '<lazy pipeline: lazy.add_one -> lazy.chunk_rows -> lazy.add_one>'
+    # nothing runs until the pipeline is collected
+    assert 'chunk_rows' not in df_numbers.columns
+    result = pipeline.collect()
+    assert list(result['a']) == list(range(2, 12))
+    assert list(result['chunk_rows']) == [4, 4, 4, 4, 4, 4, 4, 4, 2, 2]
+    assert list(result.index) == list(df_numbers.index)
+    # the original dataframe isn't changed
+    assert list(df_numbers.columns) == ['a']
+    assert list(df_numbers['a']) == list(range(10))
+
+def test_frame_step_sees_whole_dataframe(pipeline_pdext, df_numbers):
+    result = df_numbers.ext.pipe_lazy(chunk_rows=3)\
+                .lazy.add_one('a').lazy.share('a').lazy.chunk_rows().collect()
+    assert result['share'].sum() == pytest.approx(1)
+    assert result['share'].iloc[0] == pytest.approx(1 / 55)
+    assert list(result['chunk_rows']) == [3] * 9 + [1]
+
+def test_reduce_as_last_step(pipeline_pdext, df_numbers):
+    assert df_numbers.ext.pipe_lazy(chunk_rows=3)\
+                .lazy.add_one('a').lazy.total('a').collect() == 55
+    # in the middle of the pipeline it is run on the whole dataframe
+    assert df_numbers.ext.pipe_lazy().lazy.total('a').collect() == 45
+    with pytest.raises(ValueError):
+        df_numbers.ext.pipe_lazy().lazy.not_combined()
+
+def test_disabled_steps_are_skipped(pipeline_pdext, df_numbers):
+    pipeline_pdext.disable_extension('lazy.chunk_rows')
+    try:
+        result = df_numbers.ext.pipe_lazy(chunk_rows=4)\
+                    .lazy.chunk_rows().lazy.add_one('a').collect()
+    finally:
+        pipeline_pdext.enable_extension('lazy.chunk_rows')
+    assert list(result.columns) == ['a']
+    assert list(result['a']) == list(range(1, 11))
+
+def test_invalid_pipelines(pipeline_pdext, df_numbers):
+    with pytest.raises(AttributeError):
+        df_numbers.ext.pipe_lazy().lazy.not_an_extension
+    with pytest.raises(ValueError):
+        df_numbers.ext.pipe_lazy(chunk_rows=0)
+    assert df_numbers.ext.pipe_lazy().collect() is df_numbers
@@ -0,0 +1,99 @@
+"""
+Check that the index file kept in each repository is written
+when extensions change and rebuilt when the directories change
+"""
+import os, json, importlib, threading
+import pytest
+
+RepositoryIndex = importlib.import_module('_pandex.repository.repository_index')\
+                        .RepositoryIndex
+RepositoryLock = importlib.import_module('_pandex.repository.repository_lock')\
+                        .RepositoryLock
+
+def read_index(repo_dir, sym):
+    with open(os.path.join(repo_dir, sym.__repository_index__)) as f:
+        return json.load(f)
+
+def test_index_written_on_changes(two_test_session_repos, testpackage1, sym):
+    repo = two_test_session_repos
+    repo_dir = repo._repository_path('test1')
+    repo.import_extension(sym.__import_file_line_spec__\
+                    .format(testpackage1, 'idx.calculate_circumference_from_radius'))
+    
+    index = read_index(repo_dir, sym)
+    assert index['version'] == sym.__repository_index_version__
+    entry = index['collections']['idx']['calculate_circumference_from_radius']
+    assert entry['init_values']['enabled'] == True
+    assert entry['init_values']['extension_file'] == 'function1'
+
+    repo.disable_extension('idx.calculate_circumference_from_radius')
+    entry = read_index(repo_dir, sym)['collections']['idx']\
+                    ['calculate_circumference_from_radius']
+    assert entry['init_values']['enabled'] == False
+    repo.enable_extension('idx.calculate_circumference_from_radius')
+
+    repo.remove_extension('idx.calculate_circumference_from_radius')
+    assert 'calculate_circumference_from_radius' not in \
+                read_index(repo_dir, sym)['collections']['idx']
+
+def test_index_rebuilt_when_directories_change(temp_function_directory, sym):
+    os.makedirs(os.path.join(temp_function_directory, 'coll', 'ext1'))
+    index = RepositoryIndex(temp_function_directory)
+    # allow the directory times to be trusted straight away
+    index.racy_seconds = -1
+    assert list(index.collections) == ['coll']
+    assert list(index.collections['coll']) == ['ext1']
+    assert index._is_valid(index._read())
+
+    # a directory created outside pandex is detected
+    os.makedirs(os.path.join(temp_function_directory, 'coll', 'ext2'))
+    os.utime(os.path.join(temp_function_directory, 'coll'), (0, 1))
+    assert not index._is_valid(index._read())
+    assert sorted(index.collections['coll']) == ['ext1', 'ext2']
+
+    # an index written by a different version is ignored
+    with open(index.index_file, 'w') as f:
+        json.dump({'version': -1}, f)
+    assert index._read() is None
+    assert sorted(index.collections['coll']) == ['ext1', 'ext2']
+    assert read_index(temp_function_directory, sym)['version'] == \
+                sym.__repository_index_version__
+
+def test_index_shared_with_other_users(temp_function_directory, sym, monkeypatch):
+    os.makedirs(os.path.join(temp_function_directory, 'coll', 'ext1'))
+    index = RepositoryIndex(temp_function_directory)
+    umask = os.umask(0o022)
+    try:
+        index.rebuild()
+    finally:
+        os.umask(umask)
+    assert os.stat(index.index_file).st_mode & 0o777 == 0o644
+
+    # a user who can't read or write the index scans the directories
+    def unwritable(*args):
+        raise PermissionError(13, 'Permission denied')
+    monkeypatch.setattr(index, '_read', lambda: None)
+    monkeypatch.setattr(index, '_write', unwritable)
+    assert list(index.collections['coll']) == ['ext1']
+
+def test_readers_dont_wait_for_writers(temp_function_directory):
+    os.makedirs(os.path.join(temp_function_directory, 'coll', 'ext1'))
+    index = RepositoryIndex(temp_function_directory)
+    locked, release = threading.Event(), threading.Event()
+    def writer():
+        with RepositoryLock(temp_function_directory):
+            locked.set()
+            release.wait(10)
+    thread = threading.Thread(target=writer)
+    thread.start()
+    try:
+        locked.wait(10)
+        # scanned while the writer holds the lock, and not written
+        assert list(index.collections['coll']) == ['ext1']
+        assert index._read() is None
+        with pytest.raises(BlockingIOError):
+            with RepositoryLock(temp_function_directory, blocking=False):
+                pass
+    finally:
+        release.set()
+        thread.join()
@@ -13,9 +13,12 @@ Means that each test has to instantiate test_repo before any
 of the methods can be tested
 """
 
-import os,shutil
+import os,shutil,sys,stat,importlib
 import pytest
 
+default_file_mode = importlib.import_module('_pandex.repository.file_mode')\
+                        .default_file_mode
+
 def test_create_default(no_repo_defined, sym):
     # no yaml file should exist when tests start
     assert os.path.isfile(sym.__installed_extensions__) == False
@@ -24,6 +27,9 @@ def test_create_default(no_repo_defined, sym):
     # and then the yaml should after the repo is instantiated
     assert os.path.isfile(sym.__installed_extensions__) == True
     assert repo.default_repository=='user'
+    # a new file gets the mode allowed by the umask
+    assert stat.S_IMODE(os.stat(sym.__installed_extensions__).st_mode) == \
+                default_file_mode()
 
 def test_adding_and_changing_default(no_repo_defined):
     repo, test_dir = no_repo_defined
@@ -61,4 +67,74 @@ def test_error_cases(no_repo_defined):
          repo.new_search_order(['test'])
     with pytest.raises(ValueError):
          repo.new_search_order(['test','user', 'xxx'])
-    
\ No newline at end of file
+    
+def test_transaction(no_repo_defined, sym, monkeypatch):
+    repo, test_dir = no_repo_defined
+    repo = repo()
+    builds = []
+    build = repo._build_extension_collections
+    def counted():
+        builds.append(1)
+        build()
+    monkeypatch.setattr(repo, '_build_extension_collections', counted)
+    with open(sym.__installed_extensions__) as f:
+        before = f.read()
+
+    # nothing is written until the end of the transaction
+    with repo.transaction():
+        repo.add_repository('test_tx', os.path.join(test_dir, 'tx'))
+        repo.set_default_repository('test_tx')
+        with open(sym.__installed_extensions__) as f:
+            assert f.read() == before
+    assert len(builds) == 1
+    repo = type(repo)()
+    assert repo._search_order[0] == 'test_tx'
+    assert repo.default_repository == 'test_tx'
+
+    # and nothing is kept if it fails
+    with pytest.raises(RuntimeError):
+        with repo.transaction():
+            repo.set_default_repository('user')
+            raise RuntimeError
+    assert repo.default_repository == 'test_tx'
+    repo.set_default_repository('user')
+    repo.remove_repository('test_tx')
+
+def test_config_file_cached(no_repo_defined, monkeypatch):
+    import yaml
+    repo, test_dir = no_repo_defined
+    repo = repo()
+    loads = []
+    load = yaml.load
+    def counted(*args, **kwargs):
+        loads.append(1)
+        return load(*args, **kwargs)
+    monkeypatch.setattr(yaml, 'load', counted)
+
+    config = repo._load_config_file()
+    repo._build_extension_collections()
+    assert loads == []
+    # a copy is returned each time
+    config['repositories'].append({'name': 'changed', 'location': test_dir})
+    assert 'changed' not in repo._search_order
+    assert repo._load_config_file() != config
+
+def test_config_replaced_by_another_process(no_repo_defined, sym, monkeypatch):
+    repo, test_dir = no_repo_defined
+    repo = repo()
+    config_module = sys.modules[type(repo)._load_config_file.__module__]
+    replace = os.replace
+    def replaced_straight_after(src, dst):
+        replace(src, dst)
+        if dst == sym.__installed_extensions__:
+            # another process writes its own config as soon as this
+            # one has been renamed into place
+            other = dst + '.other'
+            with open(other, 'w') as f:
+                f.write('repositories:\n- name: other\n  location: {}\n'
+                        'default_repository: other\n'.format(test_dir))
+            replace(other, dst)
+    monkeypatch.setattr(config_module.os, 'replace', replaced_straight_after)
+    repo.set_default_repository('user')
+    monkeypatch.undo()
+    assert repo._load_config_file()['default_repository'] == 'other'
@@ -0,0 +1,216 @@
+"""
+Results of extensions can be cached in memory, keyed by the
+content of the dataframe and the arguments
+"""
+import os, importlib
+from decimal import Decimal
+import numpy as np
+import pandas as pd
+import pytest
+
+from fixtures.helpers import pdext_with_sources, sym
+
+memo_extensions = '''
+calls = []
+
+def scaled(df, column, factor=2):
+    """Scales a column"""
+    calls.append(column)
+    return df[column] * factor
+
+def described(df, column):
+    calls.append(column)
+    return df.assign(half=df[column] / 2, label=df[column].astype(str))
+
+def add_scaled(df, column):
+    calls.append(column)
+    df['scaled'] = df[column] * 2
+'''
+
+@pytest.fixture(scope='module')
+def memo_pdext(temp_module_directory):
+    with pdext_with_sources(temp_module_directory,
+                            {'memo_exts.py': memo_extensions}, 'memo',
+                            ['scaled', 'described', 'add_scaled']) as (pdext, _):
+        yield pdext
+        pdext.unmemoize()
+
+def calls(df, name='scaled'):
+    # each extension is installed as its own module, with its own list
+    return len(getattr(df.ext.memo, name).__wrapped__.__globals__['calls'])
+
+def test_results_cached_by_content(memo_pdext):
+    df = pd.DataFrame({'a': range(10)})
+    memo_pdext.memoize('memo.scaled')
+    start = calls(df)
+    first = df.ext.memo.scaled('a')
+    assert df.ext.memo.scaled('a').equals(first)
+    assert calls(df) == start + 1
+
+    # the same content in a different dataframe is a hit
+    assert pd.DataFrame({'a': range(10)}).ext.memo.scaled('a').equals(first)
+    # different arguments or content are not
+    df.ext.memo.scaled('a', factor=3)
+    pd.DataFrame({'a': range(1, 11)}).ext.memo.scaled('a')
+    assert calls(df) == start + 3
+    info = memo_pdext.memo_info()
+    assert (info['hits'], info['misses'], info['entries']) == (2, 3, 3)
+
+    # extensions which change the dataframe always run
+    memo_pdext.memoize('memo')
+    start_add = calls(df, 'add_scaled')
+    df.ext.memo.add_scaled('a')
+    df.ext.memo.add_scaled('a')
+    assert calls(df, 'add_scaled') == start_add + 2
+
+    memo_pdext.unmemoize()
+    assert memo_pdext.memo_info() is None
+    df.ext.memo.scaled('a')
+    assert calls(df) == start + 4
+
+def test_lru_eviction_and_invalidation(memo_pdext):
+    memo_pdext.memoize('memo.scaled', max_entries=2)
+    frames = [pd.DataFrame({'a': [i] * 5}) for i in range(3)]
+    for df in frames:
+        df.ext.memo.scaled('a')
+    assert memo_pdext.memo_info()['entries'] == 2
+    start = calls(frames[0])
+    # the first was evicted, the last is still cached
+    frames[2].ext.memo.scaled('a')
+    frames[0].ext.memo.scaled('a')
+    assert calls(frames[0]) == start + 1
+
+    # reinstalling discards the cached results
+    memo_pdext.reinstall_extension('memo.scaled')
+    frames[0].ext.memo.scaled('a')
+    assert memo_pdext.memo_info()['entries'] == 1
+
+    # results larger than the byte limit aren't kept
+    memo_pdext.memoize('memo.scaled', max_bytes=100)
+    pd.DataFrame({'a': range(1000)}).ext.memo.scaled('a')
+    assert memo_pdext.memo_info()['bytes'] <= 100
+    memo_pdext.unmemoize()
+
+def test_sampled_hash(memo_pdext):
+    memo_pdext.memoize('memo.scaled', sample_rows=10)
+    df = pd.DataFrame({'a': range(1000)})
+    df.ext.memo.scaled('a')
+    info = memo_pdext.memo_info()
+    changed = df.copy()
+    changed.loc[1, 'a'] = -1
+    # row 1 isn't in the sample, so it's treated as the same dataframe
+    changed.ext.memo.scaled('a')
+    assert memo_pdext.memo_info()['hits'] == info['hits'] + 1
+    memo_pdext.unmemoize()
+
+def is_memory_mapped(values):
+    while values is not None:
+        if isinstance(values, np.memmap):
+            return True
+        values = values.base
+    return False
+
+def test_results_stored_on_disk(memo_pdext, temp_function_directory):
+    store = os.path.join(temp_function_directory, 'results')
+    memo_pdext.persist('memo', location=store)
+    df = pd.DataFrame({'a': [1, 2, 3]}, index=['x', 'x', 'y'])
+    start = calls(df, 'described')
+    first = df.ext.memo.described('a')
+    series = df.ext.memo.scaled('a')
+
+    # a new store, as it would be in another process
+    memo_pdext.unpersist()
+    memo_pdext.persist('memo', location=store)
+    stored = df.ext.memo.described('a')
+    assert calls(df, 'described') == start + 1
+    assert stored.equals(first)
+    assert list(stored.index) == ['x', 'x', 'y']
+    assert is_memory_mapped(stored['half'].to_numpy())
+    # memory mapped columns can be changed without changing the store
+    stored.loc['y', 'half'] = 100
+    assert df.ext.memo.described('a')['half'].iloc[-1] == 1.5
+    assert df.ext.memo.scaled('a').equals(series)
+
+    info = memo_pdext.cache_info()
+    assert info['memory'] is None
+    disk = info['disk']
+    assert (disk['hits'], disk['misses'], disk['entries']) == (3, 0, 2)
+    assert disk['extensions']['memo.described']['entries'] == 1
+
+    # the least recently used are removed to keep within the size
+    memo_pdext.persist('memo', location=store, max_bytes=disk['bytes'] + 10)
+    pd.DataFrame({'a': [5]}).ext.memo.scaled('a')
+    disk = memo_pdext.cache_info()['disk']
+    assert disk['bytes'] <= disk['max_bytes']
+    assert disk['entries'] < 3
+
+    memo_pdext.unpersist(clear=True)
+    assert memo_pdext.cache_info()['disk'] is None
+    assert not os.path.exists(store)
+
+def test_store_only_walked_when_full(tmp_path, monkeypatch):
+    store = importlib.import_module('_pandex.repository.result_store')\
+                    .ResultStore(str(tmp_path), max_bytes=1000)
+    walks = []
+    entries = store._entries
+    def counted():
+        walks.append(1)
+        return entries()
+    monkeypatch.setattr(store, '_entries', counted)
+    # walked once to find the size of what is already stored
+    store._evict(100)
+    assert len(walks) == 1
+    for _ in range(8):
+        store._evict(100)
+    assert len(walks) == 1
+    # and again when the running total goes over max_bytes
+    store._evict(500)
+    assert len(walks) == 2
+    assert store._stored_bytes == 0
+
+def test_stored_results_keyed_by_module_files(memo_pdext, temp_function_directory):
+    # a linked extension runs the changed files without being
+    # installed again, so results from the old files aren't used
+    source = os.path.join(temp_function_directory, 'linked_exts.py')
+    with open(source, 'w') as f:
+        f.write('def linked(df):\n    return df["a"] * 2\n')
+    memo_pdext.import_extension(sym.__import_file_line_spec__\
+                                    .format(source, 'memo.linked'), link='sym')
+    store = os.path.join(temp_function_directory, 'results')
+    try:
+        memo_pdext.persist('memo.linked', location=store)
+        df = pd.DataFrame({'a': [1, 2, 3]})
+        df.ext.memo.linked()
+        df.ext.memo.linked()
+        with open(source, 'w') as f:
+            f.write('def linked(df):\n    return df["a"] * 20\n')
+        df.ext.memo.linked()
+        disk = memo_pdext.cache_info()['disk']
+        assert (disk['hits'], disk['misses'], disk['entries']) == (1, 2, 1)
+    finally:
+        memo_pdext.unpersist(clear=True)
+        memo_pdext.remove_extension('memo.linked')
+
+def test_results_stored_without_pickle(memo_pdext, temp_function_directory):
+    store = os.path.join(temp_function_directory, 'results')
+    memo_pdext.persist('memo', location=store)
+    try:
+        df = pd.DataFrame({'a': [1.5, 2.5]}, 
+                          index=pd.MultiIndex.from_tuples([('x', 1), ('y', 2)],
+                                                          names=['k', 'n']))
+        df.ext.memo.described('a')
+        # python objects other than strings, numbers and bools aren't stored
+        objects = pd.DataFrame({'a': [Decimal('1.5'), Decimal('2.5')]})
+        objects.ext.memo.scaled('a', factor=1)
+        assert memo_pdext.cache_info()['disk']['entries'] == 1
+        for path, dirs, files in os.walk(store):
+            assert not any(f.endswith('.pkl') for f in files)
+
+        memo_pdext.unpersist()
+        memo_pdext.persist('memo', location=store)
+        stored = df.ext.memo.described('a')
+        assert memo_pdext.cache_info()['disk']['hits'] == 1
+        assert stored.equals(df.assign(half=df['a'] / 2, label=df['a'].astype(str)))
+        assert list(stored.index.names) == ['k', 'n']
+    finally:
+        memo_pdext.unpersist(clear=True)
@@ -46,4 +46,29 @@ def test_show_extension(temp_module_directory, testpackage1, capsys, sym):
         assert 'df.{}.test.calculate_circumference_from_radius(radius)'\
                 .format(sym.__df_ext__) in out
         assert 'For help on individual extensions, use help(df.{}.<extension name>)'\
-                .format(sym.__df_ext__) in out
\ No newline at end of file
+                .format(sym.__df_ext__) in out
+
+        # a missing dependency is reported without importing anything
+        pdext.import_extension(spec('function_uses_external_package_not_installed'))
+        pdext._build_extension_collections()
+        pdext.show_extensions()
+        out, _ = capsys.readouterr()
+        assert "df.{}.function_uses_external_package_not_installed()  - Currently "\
+               "doesn't work because module:  pkg_doesnt_exist  needs to be installed"\
+                    .format(sym.__df_ext__) in out
+        for collection in pdext.extension_collections.values():
+            for ext in collection.values():
+                assert ext._imported_module is None
+
+
+def test_show_extensions_imports_nothing(pdext_with_loaded_testpackages, capsys, sym):
+    pd_ext, _ = pdext_with_loaded_testpackages
+    # rebuilding gives new extension objects which haven't been imported
+    pd_ext._build_extension_collections()
+    pd_ext.show_extensions()
+    out, _ = capsys.readouterr()
+    assert 'df.{}.singlepy.calculate_circumference_from_radius(radius)'\
+                .format(sym.__df_ext__) in out
+    for collection in pd_ext.extension_collections.values():
+        for ext in collection.values():
+            assert ext._imported_module is None
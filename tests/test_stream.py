@@ -0,0 +1,124 @@
+"""
+Extensions can be applied to files too big for memory by streaming
+them in chunks of rows
+"""
+import os, gzip
+import pandas as pd
+import pytest
+
+from fixtures.helpers import pdext_with_sources, sym
+
+stream_extensions = '''
+def add_total(df, a, b):
+    df['total'] = df[a] + df[b]
+add_total.pdext_partition = 'rows'
+
+def scaled(df, column, factor=2):
+    return df.assign(**{column: df[column] * factor})
+scaled.pdext_partition = 'rows'
+
+def fails_after(df, rows):
+    if df.index.max() >= rows:
+        raise RuntimeError('failed')
+fails_after.pdext_partition = 'rows'
+
+def column_sum(df, column):
+    return df[column].sum()
+column_sum.pdext_partition = 'reduce'
+column_sum.pdext_combine = sum
+
+def whole_frame(df):
+    return df
+'''
+
+@pytest.fixture(scope='module')
+def stream_pdext(temp_module_directory):
+    with pdext_with_sources(temp_module_directory, 
+                            {'stream_exts.py': stream_extensions}, 'stream',
+                            ['add_total', 'scaled', 'fails_after', 
+                             'column_sum', 'whole_frame']) as (pdext, _):
+        yield pdext
+
+@pytest.fixture
+def csv_source(temp_function_directory):
+    path = os.path.join(temp_function_directory, 'source.csv')
+    pd.DataFrame({'a': range(25), 'b': range(100, 125)}).to_csv(path, index=False)
+    return path
+
+def expected():
+    return pd.DataFrame({'a': [2 * a for a in range(25)], 'b': range(100, 125),
+                         'total': [3 * a + 100 for a in range(25)]})
+
+steps = [('stream.scaled', {'column': 'a'}),
+         ('stream.add_total', ('a', 'b'), {})]
+
+def test_stream_to_generator(stream_pdext, csv_source):
+    chunks = stream_pdext.stream(csv_source, steps, chunksize=10)
+    chunks = list(chunks)
+    assert [len(chunk) for chunk in chunks] == [10, 10, 5]
+    pd.testing.assert_frame_equal(pd.concat(chunks, ignore_index=True), expected())
+
+@pytest.mark.parametrize('name', ['result.csv', 'result.csv.gz', 'result.jsonl',
+                                  'result.tsv'])
+def test_stream_to_file(stream_pdext, csv_source, temp_function_directory, name):
+    sink = os.path.join(temp_function_directory, name)
+    assert stream_pdext.stream(csv_source, steps, chunksize=10, sink=sink) == 25
+    if name.endswith('.jsonl'):
+        result = pd.read_json(sink, lines=True)
+    else:
+        result = pd.read_csv(sink, sep='\t' if name.endswith('.tsv') else ',')
+    pd.testing.assert_frame_equal(result, expected())
+    # the result can be streamed again
+    assert stream_pdext.stream(sink, [('stream.column_sum', {'column': 'total'})],
+                               chunksize=10) == expected()['total'].sum()
+    assert sorted(os.listdir(temp_function_directory)) == sorted(['source.csv', name])
+
+def test_stream_file_mode(stream_pdext, csv_source, temp_function_directory):
+    sink = os.path.join(temp_function_directory, 'result.csv')
+    umask = os.umask(0o022)
+    try:
+        stream_pdext.stream(csv_source, steps, chunksize=10, sink=sink)
+    finally:
+        os.umask(umask)
+    # readable by other users, like a file written by open()
+    assert os.stat(sink).st_mode & 0o777 == 0o644
+
+def test_stream_parquet(stream_pdext, csv_source, temp_function_directory):
+    pytest.importorskip('pyarrow')
+    sink = os.path.join(temp_function_directory, 'result.parquet')
+    assert stream_pdext.stream(csv_source, steps, chunksize=10, sink=sink) == 25
+    chunks = list(stream_pdext.stream(sink, [], chunksize=10))
+    pd.testing.assert_frame_equal(pd.concat(chunks, ignore_index=True), expected())
+
+def test_stream_aggregate(stream_pdext, csv_source):
+    total = stream_pdext.stream(csv_source, steps + [('stream.column_sum', 
+                                                      {'column': 'total'})],
+                                chunksize=7)
+    assert total == expected()['total'].sum()
+    with pytest.raises(ValueError):
+        stream_pdext.stream(csv_source, 'stream.column_sum', sink=print)
+
+def test_stream_other_sources_and_sinks(stream_pdext):
+    frames = [pd.DataFrame({'a': [1, 2]}), pd.DataFrame({'a': [3]})]
+    written = []
+    assert stream_pdext.stream(frames, [('stream.scaled', ('a', 10), {})],
+                               sink=written.append) == 3
+    assert [list(chunk['a']) for chunk in written] == [[10, 20], [30]]
+
+def test_failed_stream_leaves_no_file(stream_pdext, csv_source, temp_function_directory):
+    sink = os.path.join(temp_function_directory, 'result.csv')
+    with pytest.raises(RuntimeError):
+        stream_pdext.stream(csv_source, [('stream.fails_after', {'rows': 15})],
+                            chunksize=10, sink=sink)
+    assert os.listdir(temp_function_directory) == ['source.csv']
+
+def test_invalid_streams(stream_pdext, csv_source):
+    with pytest.raises(ValueError):
+        stream_pdext.stream(csv_source, ['stream.whole_frame'])
+    with pytest.raises(ValueError):
+        stream_pdext.stream(csv_source, [('stream.column_sum', {'column': 'a'}),
+                                         'stream.add_total'])
+    with pytest.raises(KeyError):
+        stream_pdext.stream(csv_source, ['stream.not_an_extension'])
+    with pytest.raises(ValueError):
+        stream_pdext.stream('source.xlsx', [])